@@ -0,0 +1,183 @@
+import hashlib, json
+
+from pathlib import Path
+
+from toolchain import Toolchain, discover
+
+
+ANALYSIS_CACHE_VARIABLE = "UPB_ANALYSIS_CACHE"  # Tells a PyInstaller process which cache file to use
+ANALYSIS_DIRECTORY = "analysis"     # In the user cache: one <interpreter>-<environment>.json per build environment
+CACHE_FORMAT = 1    # Bump whenever the shim stores something new, so older files are ignored
+
+# Installed into the PyInstaller process (a cold `python -c` run or a warm worker) before a build: loads the results
+# of earlier builds from the same environment, serves hook scripts' outputs and binary dependency scans from them, and
+# writes what was new back when the build ends. Only hooks of installed modules are cached, and only when both the hook
+# and the module live in the environment (project-local code is not covered by the environment fingerprint); a hook
+# file is keyed by its size and modification time, a binary by its own plus the library search path.
+CACHE_SHIM = (
+    "import json as _json, os as _os, site as _site, sys as _sys, threading as _threading\n"
+    "_upb_cache = {'path': None, 'hooks': {}, 'imports': {}, 'new': {'hooks': {}, 'imports': {}}, 'hits': 0}\n"
+    "_UPB_DECODE = {'datas': lambda v: {tuple(i) for i in v}, 'binaries': lambda v: {tuple(i) for i in v},\n"
+    "    'excludedimports': set, 'hiddenimports': list, 'warn_on_missing_hiddenimports': bool,\n"
+    "    'module_collection_mode': dict, 'bindepend_symlink_suppression': set}\n"
+    "_UPB_LIBRARY_PATH = 'PATH' if _os.name == 'nt' else 'DYLD_LIBRARY_PATH' if _sys.platform == 'darwin' \\\n"
+    "    else 'LD_LIBRARY_PATH'\n"
+    "def _upb_roots():\n"
+    "    roots = {_sys.prefix, _sys.base_prefix, _sys.exec_prefix, _site.getusersitepackages()}\n"
+    "    roots.update(getattr(_site, 'getsitepackages', list)())\n"
+    "    return [_os.path.normcase(_os.path.realpath(root)) for root in roots]\n"
+    "def _upb_installed(path):\n"
+    "    path = _os.path.normcase(_os.path.realpath(path))\n"
+    "    return any(path == root or path.startswith(root.rstrip(_os.sep) + _os.sep)\n"
+    "               for root in _upb_cache['roots'])\n"
+    "def _upb_install():\n"
+    "    from PyInstaller.depend import bindepend, imphook\n"
+    "    if getattr(imphook.ModuleHook, '_upb_cached', False):\n"
+    "        return\n"
+    "    load, get_imports = imphook.ModuleHook._load_hook_module, bindepend.get_imports\n"
+    "    def hook_key(hook):\n"
+    "        if _upb_cache['path'] is None or not set(imphook._MAGIC_MODULE_HOOK_ATTRS) <= set(_UPB_DECODE):\n"
+    "            return None\n"
+    "        node = hook.module_graph.find_node(hook.module_name)\n"
+    "        filename = getattr(node, 'filename', None)\n"
+    "        if not filename or not _upb_installed(filename) or not _upb_installed(hook.hook_filename):\n"
+    "            return None\n"
+    "        status = _os.stat(hook.hook_filename)\n"
+    "        return _json.dumps([hook.module_name, hook.hook_filename, status.st_size, status.st_mtime_ns])\n"
+    "    def cached_load(self, keep_module_ref=False):\n"
+    "        if keep_module_ref or (self._loaded and (self._hook_module is not None or not keep_module_ref)):\n"
+    "            return load(self, keep_module_ref)\n"
+    "        try:\n"
+    "            key = hook_key(self)\n"
+    "        except Exception:\n"
+    "            key = None\n"
+    "        entry = _upb_cache['hooks'].get(key)\n"
+    "        if entry is not None:\n"
+    "            imphook.logger.info('Processing standard module hook %r (cached)',\n"
+    "                                _os.path.basename(self.hook_filename))\n"
+    "            self._loaded, self._has_hook_function = True, entry['hook']\n"
+    "            for name, value in entry['attrs'].items():\n"
+    "                setattr(self, name, _UPB_DECODE[name](value))\n"
+    "            _upb_cache['hits'] += 1\n"
+    "            return\n"
+    "        load(self, keep_module_ref)\n"
+    "        if key is not None:\n"
+    "            values = ((name, getattr(self, name)) for name in imphook._MAGIC_MODULE_HOOK_ATTRS)\n"
+    "            attrs = {name: list(value) if isinstance(value, set) else value for name, value in values}\n"
+    "            try:\n"
+    "                _upb_cache['new']['hooks'][key] = _json.loads(_json.dumps({'hook': self._has_hook_function,\n"
+    "                                                                          'attrs': attrs}))\n"
+    "            except (TypeError, ValueError):\n"
+    "                pass\n"
+    "    def cached_get_imports(filename, search_paths=None):\n"
+    "        if _upb_cache['path'] is None:\n"
+    "            return get_imports(filename, search_paths)\n"
+    "        try:\n"
+    "            status = _os.stat(filename)\n"
+    "        except OSError:\n"
+    "            return get_imports(filename, search_paths)\n"
+    "        key = _json.dumps([str(filename), status.st_size, status.st_mtime_ns,\n"
+    "                           [str(path) for path in search_paths or ()], _os.environ.get(_UPB_LIBRARY_PATH, '')])\n"
+    "        entry = _upb_cache['imports'].get(key)\n"
+    "        if entry is not None:\n"
+    "            _upb_cache['hits'] += 1\n"
+    "            return {tuple(item) for item in entry}\n"
+    "        result = get_imports(filename, search_paths)\n"
+    "        _upb_cache['new']['imports'][key] = [list(item) for item in result]\n"
+    "        return result\n"
+    "    imphook.ModuleHook._load_hook_module, bindepend.get_imports = cached_load, cached_get_imports\n"
+    "    imphook.ModuleHook._upb_cached = True\n"
+    "def _upb_read(path):\n"
+    "    try:\n"
+    "        with open(path, encoding='utf-8') as file:\n"
+    "            data = _json.load(file)\n"
+    f"        if data.get('format') == {CACHE_FORMAT}:\n"
+    "            return data['hooks'], data['imports']\n"
+    "    except (OSError, ValueError, KeyError, TypeError, AttributeError):\n"
+    "        pass\n"
+    "    return {}, {}\n"
+    "def _upb_cache_begin():\n"
+    f"    path = _os.environ.get({ANALYSIS_CACHE_VARIABLE!r})\n"
+    "    _upb_cache.update(path=path, hits=0, new={'hooks': {}, 'imports': {}})\n"
+    "    if path:\n"
+    "        _upb_cache['hooks'], _upb_cache['imports'] = _upb_read(path)\n"
+    "        _upb_cache['roots'] = _upb_roots()\n"
+    "        _upb_install()\n"
+    "def _upb_cache_end():\n"
+    "    path, new = _upb_cache['path'], _upb_cache['new']\n"
+    "    if not path:\n"
+    "        return\n"
+    "    from PyInstaller.depend import imphook\n"
+    "    imphook.logger.info('Analysis cache: %d hook/binary results reused, %d hook and %d binary results stored',\n"
+    "                        _upb_cache['hits'], len(new['hooks']), len(new['imports']))\n"
+    "    if new['hooks'] or new['imports']:\n"
+    "        hooks, imports = _upb_read(path)\n"
+    "        hooks.update(new['hooks']); imports.update(new['imports'])\n"
+    "        temporary = f'{path}.{_os.getpid()}-{_threading.get_ident()}.tmp'\n"
+    "        try:\n"
+    "            with open(temporary, 'w', encoding='utf-8') as file:\n"
+    f"                _json.dump({{'format': {CACHE_FORMAT}, 'hooks': hooks, 'imports': imports}}, file)\n"
+    "            _os.replace(temporary, path)\n"
+    "        except OSError:\n"
+    "            if _os.path.exists(temporary): _os.remove(temporary)\n"
+    "    _upb_cache['path'] = None\n"
+)
+
+# A cold build: `python -c <shim + this> <PyInstaller arguments>` instead of `python -m PyInstaller <arguments>`
+_RUN = (
+    "import PyInstaller.__main__\n"
+    "_upb_cache_begin()\n"
+    "try:\n"
+    "    PyInstaller.__main__.run(_sys.argv[1:])\n"
+    "finally:\n"
+    "    _upb_cache_end()\n"
+)
+
+
+def environment_fingerprint(toolchain: Toolchain) -> str:
+    """
+        Return a digest of what PyInstaller's hooks and dependency scans depend on in a build environment.
+
+        It covers the interpreter (path, version and modification time), PyInstaller's version, every
+        installed distribution with its version and the modification times of the site-packages folders,
+        so ``pip install``/``uninstall`` (even of an editable or same-version package) changes it.
+    """
+    material = json.dumps([toolchain.python, toolchain.python_version, toolchain.python_mtime,
+                           toolchain.pyinstaller_version, toolchain.distributions,
+                           sorted(toolchain.site_packages_stamp.items())], separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def analysis_cache_file(command: list[str]) -> Path | None:
+    """
+        Return the cache file of the environment a ``python -m PyInstaller`` command runs in, or ``None``
+        for a bare ``pyinstaller`` (whose environment is not probed).
+
+        The file is named after the interpreter and the environment fingerprint; files of an earlier
+        state of the same interpreter are removed, since their results can no longer be reused.
+
+        Raises
+        ------
+        RuntimeError
+            If the interpreter cannot be run.
+    """
+    from build_cache import cache_directory  # Imported here: build_cache depends on build_engine, which uses us
+
+    toolchain = discover(command)
+    if toolchain.python is None:
+        return None
+    interpreter = hashlib.sha256(toolchain.python.encode("utf-8")).hexdigest()[:12]
+    folder = cache_directory() / ANALYSIS_DIRECTORY
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{interpreter}-{environment_fingerprint(toolchain)[:24]}.json"
+    for stale in folder.glob(f"{interpreter}-*.json"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
+
+
+def cached_analysis_command(command: list[str]) -> list[str]:
+    """
+        Turn ``python -m PyInstaller <arguments>`` into a command that runs the same build with the cache shim.
+    """
+    return [command[0], "-c", CACHE_SHIM + _RUN, *command[3:]]
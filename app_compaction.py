@@ -0,0 +1,189 @@
+import hashlib, os, shutil, subprocess, sys, time
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from build_engine import BuildTarget
+
+
+MINIMUM_DUPLICATE_BYTES = 16 * 1024    # Smaller duplicates are not worth a link
+HASH_CHUNK = 1024 * 1024
+UPX_MAGIC = b"UPX!"     # Found near the start of UPX-packed binaries, which must not be stripped
+MACH_O_MAGICS = (b"\xfe\xed\xfa\xce", b"\xfe\xed\xfa\xcf", b"\xce\xfa\xed\xfe", b"\xcf\xfa\xed\xfe")
+FAT_MAGIC = b"\xca\xfe\xba\xbe"     # Universal Mach-O, but also Java class files: only trusted with a library suffix
+
+
+@dataclass
+class CompactionReport:
+    """
+        What compacting a one-dir app did.
+    """
+    binaries: int = 0   # Shared libraries, extensions and executables examined
+    linked: int = 0     # Duplicates replaced by links to an identical copy
+    linked_bytes: int = 0
+    stripped: int = 0
+    stripped_bytes: int = 0
+    seconds: float = 0
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.linked_bytes + self.stripped_bytes
+
+
+def binary_kind(path: Path) -> str | None:
+    """
+        Return ``"elf"``, ``"mach-o"`` or ``"pe"`` for a native binary, judged by its first bytes, else ``None``.
+    """
+    try:
+        with open(path, "rb") as file:
+            magic = file.read(4)
+    except OSError:
+        return None
+    if magic == b"\x7fELF":
+        return "elf"
+    if magic in MACH_O_MAGICS or magic == FAT_MAGIC and path.suffix in (".so", ".dylib"):
+        return "mach-o"
+    return "pe" if magic[:2] == b"MZ" and path.suffix.lower() in (".dll", ".pyd", ".exe") else None
+
+
+def _digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_packed(path: Path) -> bool:
+    with open(path, "rb") as file:
+        return UPX_MAGIC in file.read(4096)
+
+
+def _strip(strip: str, path: Path) -> int:
+    """
+        Strip the debug symbols of one binary; return the bytes saved (0 if stripping did not pay off or failed).
+
+        ``strip -o`` writes a separate file that replaces the original only when it is smaller, so a failed
+        strip never leaves a damaged binary behind.
+    """
+    if path.stat().st_nlink > 1 or _is_packed(path):
+        return 0    # Shared with another folder (staged data, object store) or compressed by UPX
+    stripped = path.with_name(path.name + ".upb-strip")
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    try:
+        result = subprocess.run([strip, "-S", "-o", str(stripped), str(path)], stdin=subprocess.DEVNULL,
+                                capture_output=True, timeout=300, creationflags=creationflags)
+        before = path.stat().st_size
+        if result.returncode != 0 or not stripped.is_file() or stripped.stat().st_size >= before:
+            return 0
+        shutil.copymode(path, stripped)
+        os.replace(stripped, path)
+        return before - path.stat().st_size
+    except (OSError, subprocess.SubprocessError):
+        return 0
+    finally:
+        stripped.unlink(missing_ok=True)
+
+
+def strip_binaries(paths: list[Path], jobs: int | None = None) -> tuple[int, int]:
+    """
+        Strip debug symbols from ELF binaries in parallel; return how many shrank and the bytes saved.
+
+        Nothing happens when no ``strip`` is on PATH. Mach-O binaries are left alone: PyInstaller has
+        code-signed them, stripping would invalidate the signature and macOS on arm64 refuses to run them.
+        Windows binaries are left alone too.
+    """
+    strip = shutil.which("strip")
+    candidates = [path for path in paths if binary_kind(path) == "elf"]
+    if strip is None or not candidates:
+        return 0, 0
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        saved = list(pool.map(lambda path: _strip(strip, path), candidates))
+    return sum(1 for size in saved if size), sum(saved)
+
+
+def _replace_with_link(original: Path, duplicate: Path) -> bool:
+    """
+        Make *duplicate* a hard link to *original*; fall back to a relative symbolic link outside Windows.
+    """
+    temporary = duplicate.with_name(duplicate.name + ".upb-link")
+    temporary.unlink(missing_ok=True)
+    try:
+        os.link(original, temporary)
+    except OSError:
+        if os.name == "nt":
+            return False
+        try:
+            os.symlink(os.path.relpath(original, duplicate.parent), temporary)
+        except OSError:
+            return False
+    os.replace(temporary, duplicate)
+    return True
+
+
+def link_duplicates(paths: list[Path], jobs: int | None = None) -> tuple[int, int]:
+    """
+        Replace byte-identical copies among *paths* by links to one of them; return how many and the bytes saved.
+
+        Only files of equal size are hashed, in parallel. Files that already are one file (hard links)
+        count once. The copy that sorts first is kept, so repeated runs link the same way.
+    """
+    by_size: dict[int, dict[tuple[int, int], Path]] = defaultdict(dict)
+    for path in sorted(paths):
+        status = path.stat()
+        if status.st_size >= MINIMUM_DUPLICATE_BYTES:
+            by_size[status.st_size].setdefault((status.st_dev, status.st_ino), path)
+    candidates = [path for files in by_size.values() if len(files) > 1 for path in files.values()]
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        digests = dict(zip(candidates, pool.map(_digest, candidates)))
+
+    groups: dict[str, list[Path]] = defaultdict(list)
+    for path in sorted(candidates):
+        groups[digests[path]].append(path)
+    linked = saved = 0
+    for original, *duplicates in groups.values():
+        for duplicate in duplicates:
+            size = duplicate.stat().st_size
+            if _replace_with_link(original, duplicate):
+                linked, saved = linked + 1, saved + size
+    return linked, saved
+
+
+def compact_app(target: BuildTarget, log: Callable[[str], object], jobs: int | None = None) -> CompactionReport:
+    """
+        Shrink a freshly built one-dir app: strip debug symbols from its ELF shared libraries and extensions
+        (not from code-signed Mach-O ones), then replace identical copies of a binary by links to one of them.
+
+        Only binaries below the contents directory (``_internal``) are touched. The executables next to it
+        carry PyInstaller's archive appended to the bootloader, which stripping would cut off. Data files are
+        left alone too: an app may change them, and a link would carry the change to every copy. Binaries
+        compressed by UPX or linked from elsewhere are not stripped. Run it after any other step that
+        rewrites binaries in place (selective UPX), since writing to one link changes all of them.
+
+        Raises
+        ------
+        OSError
+            If the app folder cannot be read or a duplicate cannot be replaced.
+    """
+    started = time.perf_counter()
+    folder = target.artifact
+    contents = folder / "_internal"
+    if not contents.is_dir():
+        contents = folder   # Pre-6.0 layout: everything next to the executable, which is skipped by name
+    executable = folder / (target.name + (".exe" if os.name == "nt" else ""))
+    binaries = [path for path in contents.rglob("*")
+                if path.is_file() and not path.is_symlink() and path != executable and binary_kind(path)]
+
+    report = CompactionReport(binaries=len(binaries))
+    if sys.platform != "win32":
+        report.stripped, report.stripped_bytes = strip_binaries(binaries, jobs)
+    report.linked, report.linked_bytes = link_duplicates(binaries, jobs)
+    report.seconds = time.perf_counter() - started
+    log(f"Compaction: {report.binaries} binaries, {report.stripped} stripped "
+        f"({report.stripped_bytes / (1024 * 1024):.2f} MB), {report.linked} duplicates linked "
+        f"({report.linked_bytes / (1024 * 1024):.2f} MB); {report.saved_bytes / (1024 * 1024):.2f} MB saved "
+        f"in {report.seconds:.2f} s.\n")
+    return report
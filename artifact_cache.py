@@ -0,0 +1,138 @@
+import json, os, shutil, time
+
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable
+
+from build_cache import cache_directory
+from build_engine import BuildTarget
+from build_fingerprint import compute_fingerprint
+
+
+ARTIFACTS_DIRECTORY = "artifacts"
+ARTIFACT_METADATA = "artifact.json"
+ARTIFACT_CACHE_BYTES = 4 * 1024 ** 3    # Least recently used artifacts are removed beyond this total size
+KEY_OUTPUT_DIRECTORY = "<output>"   # Stands in for the output folder, which does not change what is built
+
+
+def artifact_key(target: BuildTarget) -> str:
+    """
+        Return the cache key of what *target* builds: its input fingerprint with the output folder left out.
+
+        Two requests for the same sources, data, icon, options and build environment share one key
+        wherever they want the result put and however they package it.
+
+        Raises
+        ------
+        OSError, RuntimeError
+            See :func:`build_fingerprint.compute_fingerprint`.
+    """
+    return compute_fingerprint(replace(target, output_directory=KEY_OUTPUT_DIRECTORY, package=""))
+
+
+def _entry(key: str) -> Path:
+    return cache_directory() / ARTIFACTS_DIRECTORY / key
+
+
+def _copy(source: Path, destination: Path) -> None:
+    if source.is_dir():
+        shutil.copytree(source, destination, symlinks=True)
+    else:
+        shutil.copy2(source, destination)
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+
+def restore_artifact(target: BuildTarget, key: str, log: Callable[[str], object]) -> bool:
+    """
+        Put the cached artifact for *key* where *target* builds it; return ``False`` if there is none.
+
+        Raises
+        ------
+        OSError
+            If the cached artifact cannot be copied out.
+    """
+    entry = _entry(key)
+    try:
+        metadata = json.loads((entry / ARTIFACT_METADATA).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    cached = entry / metadata["name"]
+    if not cached.exists():
+        return False
+
+    started = time.perf_counter()
+    artifact = target.artifact
+    artifact.parent.mkdir(parents=True, exist_ok=True)
+    temporary = artifact.with_name(f".{artifact.name}.{os.getpid()}.restoring")
+    _remove(temporary)
+    _copy(cached, temporary)
+    _remove(artifact)
+    os.replace(temporary, artifact)
+    os.utime(entry / ARTIFACT_METADATA)     # Most recently used
+    log(f"Restored {artifact} from the artifact cache (built {metadata['built']}) "
+        f"in {time.perf_counter() - started:.2f} s.\n")
+    return True
+
+
+def store_artifact(target: BuildTarget, key: str, log: Callable[[str], object]) -> None:
+    """
+        Keep a copy of a freshly built artifact under *key*, then trim the cache to :data:`ARTIFACT_CACHE_BYTES`.
+
+        The copy is assembled next to its final place and renamed into it, so concurrent builds of the
+        same key and readers never see half an artifact.
+
+        Raises
+        ------
+        OSError
+            If the artifact cannot be copied.
+    """
+    entry = _entry(key)
+    if (entry / ARTIFACT_METADATA).is_file():
+        return
+    temporary = entry.with_name(f"{key}.{os.getpid()}.storing")
+    _remove(temporary)
+    temporary.mkdir(parents=True)
+    try:
+        artifact = target.artifact
+        _copy(artifact, temporary / artifact.name)
+        size = _size(temporary)
+        (temporary / ARTIFACT_METADATA).write_text(json.dumps({
+            "name": artifact.name, "bytes": size, "built": time.strftime("%Y-%m-%dT%H:%M:%S")}), encoding="utf-8")
+        try:
+            os.rename(temporary, entry)
+        except OSError:
+            return  # Another build stored the same key first
+        log(f"Stored the artifact in the cache ({size / (1024 * 1024):.1f} MB).\n")
+    finally:
+        shutil.rmtree(temporary, ignore_errors=True)
+    prune_artifacts()
+
+
+def _size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file() and not item.is_symlink())
+
+
+def prune_artifacts(limit: int = ARTIFACT_CACHE_BYTES) -> int:
+    """
+        Remove the least recently used artifacts until the cache fits in *limit* bytes; return how many were removed.
+    """
+    entries = []
+    for metadata_file in (cache_directory() / ARTIFACTS_DIRECTORY).glob(f"*/{ARTIFACT_METADATA}"):
+        try:
+            entries.append((metadata_file.stat().st_mtime, json.loads(metadata_file.read_text(encoding="utf-8"))
+                            ["bytes"], metadata_file.parent))
+        except (OSError, ValueError, KeyError):
+            continue
+    total, removed = sum(size for _, size, _ in entries), 0
+    for _, size, folder in sorted(entries, key=lambda item: item[0]):
+        if total <= limit:
+            break
+        shutil.rmtree(folder, ignore_errors=True)
+        total, removed = total - size, removed + 1
+    return removed
@@ -0,0 +1,378 @@
+import argparse, json, os, sys, time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+from build_engine import BuildTarget, parse_data_specification
+from build_pipeline import BuildOptions, execute_build
+from build_queue import BuildQueue
+from launch_benchmark import benchmark_artifact, compare_variants, format_startup_report
+from suite_build import build_suite
+from watch_mode import BuildWatcher
+
+
+@dataclass
+class BuildResult:
+    """
+        Outcome of one target in a batch run.
+    """
+    target: BuildTarget
+    exit_code: int
+    seconds: float
+    log_file: Path
+    error: str = ""
+    skipped: bool = False   # The artifact was already up to date
+
+    @property
+    def succeeded(self) -> bool:
+        return self.exit_code == 0 and not self.error
+
+
+def load_manifest(manifest_path: Path) -> list[BuildTarget]:
+    """
+        Read a JSON build manifest.
+
+        The manifest is either a list of target objects or an object with a ``"targets"`` list.
+        Each target object uses the field names of :class:`build_engine.BuildTarget`. Relative
+        paths (entry point, icon, output directory and data sources) are resolved against the
+        manifest's own directory so a manifest can be run from anywhere.
+
+        Parameters
+        ----------
+        manifest_path : Path
+            Path to the manifest file.
+
+        Returns
+        -------
+        list[BuildTarget]
+            The targets, in manifest order.
+
+        Raises
+        ------
+        ValueError
+            If the manifest is malformed.
+    """
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    entries = manifest.get("targets") if isinstance(manifest, dict) else manifest
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{manifest_path}: expected a non-empty list of targets.")
+
+    base = manifest_path.resolve().parent
+
+    def resolve(path: str) -> str:
+        """
+            Resolve *path* against the manifest directory unless it is already absolute.
+        """
+        return str(base / path) if path and not os.path.isabs(path) else path
+
+    targets = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"{manifest_path}: target #{index + 1} is not an object.")
+        try:
+            target = BuildTarget.from_mapping(entry)
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"{manifest_path}: target #{index + 1}: {error}") from error
+
+        target.entry_point = resolve(target.entry_point)
+        target.icon = resolve(target.icon)
+        target.output_directory = resolve(target.output_directory)
+        data_files = []
+        for specification in target.data_files:
+            entry = parse_data_specification(specification)
+            entry.source = resolve(entry.source)
+            data_files.append(entry.specification())
+        target.data_files = data_files
+        targets.append(target)
+
+    return targets
+
+
+def build_one(target: BuildTarget, log_directory: Path, options: BuildOptions) -> BuildResult:
+    """
+        Build a single target and write its log to *log_directory*.
+
+        Builds in a batch run concurrently, so *options* must not use the shared ``./build`` directory;
+        :func:`build_all` asks for private (or incremental) work directories.
+    """
+    log_file = log_directory / f"{target.name}.log"
+    started = time.perf_counter()
+
+    try:
+        with open(log_file, "w", encoding="utf-8") as log:
+            outcome = execute_build(target, options, log.write)
+        return BuildResult(target, outcome.exit_code, time.perf_counter() - started, log_file,
+                           skipped=outcome.skipped)
+
+    except Exception as e:
+        return BuildResult(target, -1, time.perf_counter() - started, log_file, error=str(e))
+
+
+def build_all(targets: list[BuildTarget], log_directory: Path, jobs: int | None = None,
+              on_result=None, incremental: bool = False, force: bool = False, warm: bool = False,
+              limits: dict | None = None, analysis_cache: bool = False) -> list[BuildResult]:
+    """
+        Build *targets* concurrently on a bounded pool.
+
+        Each worker only supervises its own PyInstaller child process, so a thread pool is used; the
+        pool size bounds how many PyInstaller processes run at once.
+
+        Parameters
+        ----------
+        targets : list[BuildTarget]
+            The targets to build.
+        log_directory : Path
+            Where one ``<name>.log`` per target is written.
+        jobs : int | None
+            Maximum number of simultaneous builds; the CPU count when ``None``.
+        on_result : Callable[[BuildResult], object] | None
+            Called as each build finishes (in completion order).
+        incremental : bool
+            Keep and reuse each target's PyInstaller work directory between runs.
+        force : bool
+            Build even the targets whose artifacts are already up to date.
+        warm : bool
+            Run PyInstaller in long-lived workers that already have it imported (see :mod:`build_worker`).
+        limits : dict | None
+            Resource limits of every build, as :class:`build_pipeline.BuildOptions` fields
+            (``memory_limit_mb``, ``cpu_limit_seconds``, ``time_limit_seconds``).
+        analysis_cache : bool
+            Share hook results and binary dependency scans between builds from the same environment
+            (see :mod:`analysis_cache`).
+
+        Returns
+        -------
+        list[BuildResult]
+            Results in the same order as *targets*.
+    """
+    names = [target.name for target in targets]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate executable names in one batch: {', '.join(duplicates)}")
+
+    log_directory.mkdir(parents=True, exist_ok=True)
+    options = BuildOptions(incremental=incremental, skip_up_to_date=not force, isolated=True, warm_worker=warm,
+                           analysis_cache=analysis_cache, **(limits or {}))
+    workers = max(1, min(jobs or os.cpu_count() or 1, len(targets)))
+    results: dict[int, BuildResult] = {}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="build") as pool:
+        futures = {pool.submit(build_one, target, log_directory, options): index for index, target in enumerate(targets)}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if on_result:
+                on_result(result)
+
+    return [results[index] for index in range(len(targets))]
+
+
+def benchmark_all(results: list[BuildResult], runs: int, ready_marker: str = "") -> None:
+    """
+        Benchmark the startup of every successfully built target, one at a time.
+
+        This runs after the parallel builds have finished, so the measurements are not distorted by
+        builds competing for the CPU and disk.
+    """
+    for result in results:
+        if not result.succeeded:
+            continue
+        try:
+            print(format_startup_report(benchmark_artifact(result.target, runs, ready_marker)), end="", flush=True)
+        except OSError as error:
+            print(f"{result.target.name}: startup benchmark failed: {error}", file=sys.stderr)
+
+
+def compare_all(targets: list[BuildTarget], log_directory: Path, runs: int, ready_marker: str = "",
+                warm: bool = False, analysis_cache: bool = False) -> int:
+    """
+        Build and benchmark the one-file/one-dir and UPX on/off variants of every target, one target at a time.
+
+        Returns the number of variants that failed to build.
+    """
+    log_directory.mkdir(parents=True, exist_ok=True)
+    options = BuildOptions(skip_up_to_date=True, isolated=True, warm_worker=warm, analysis_cache=analysis_cache)
+    failed = 0
+
+    for target in targets:
+        log_file = log_directory / f"{target.name}.variants.log"
+        with open(log_file, "w", encoding="utf-8") as log:
+            def build(variant: BuildTarget) -> bool:
+                """
+                    Build one variant into the shared log file.
+                """
+                nonlocal failed
+                try:
+                    succeeded = execute_build(variant, options, log.write).succeeded
+                except ValueError as error:
+                    log.write(f"Build failed: {error}\n")
+                    succeeded = False
+                failed += not succeeded
+                return succeeded
+
+            def progress(text: str) -> None:
+                """
+                    Show variant progress and results on the console as well as in the log file.
+                """
+                log.write(text)
+                print(text, end="", flush=True)
+
+            progress(f"== {target.name} ==\n")
+            compare_variants(target, runs, build, progress, ready_marker)
+    return failed
+
+
+def build_suite_of(name: str, targets: list[BuildTarget], log_directory: Path, warm: bool = False,
+                   analysis_cache: bool = False, limits: dict | None = None) -> int:
+    """
+        Build *targets* as one shared one-dir suite (see :func:`suite_build.build_suite`) and return the exit status.
+    """
+    log_directory.mkdir(parents=True, exist_ok=True)
+    log_file = log_directory / f"{name}.suite.log"
+    started = time.perf_counter()
+    try:
+        with open(log_file, "w", encoding="utf-8") as log:
+            code = build_suite(name, targets, log.write, warm=warm, analysis_cache=analysis_cache,
+                               limits=BuildOptions(**(limits or {})).limits())
+    except ValueError as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+    status = "ok" if code == 0 else "FAILED"
+    print(f"[{status}] suite {name} ({len(targets)} executables) in {time.perf_counter() - started:.1f}s, "
+          f"log: {log_file}", flush=True)
+    return 0 if code == 0 else 1
+
+
+def watch_all(targets: list[BuildTarget], log_directory: Path, jobs: int | None = None, warm: bool = False,
+              polling: bool = False, limits: dict | None = None, analysis_cache: bool = False) -> int:
+    """
+        Keep rebuilding each target when its sources or data change, until interrupted with Ctrl+C.
+
+        Every build is logged to its file in *log_directory*; the log text the queue keeps for a GUI is
+        dropped and finished jobs are forgotten once a second, so a long session does not grow.
+    """
+    queue = BuildQueue(log_directory, concurrency=jobs or os.cpu_count() or 1)
+    options = BuildOptions(incremental=True, warm_worker=warm, analysis_cache=analysis_cache, **(limits or {}))
+
+    def printer(name: str):
+        return lambda status: print(f"[{time.strftime('%H:%M:%S')}] {name}: {status}", flush=True)
+
+    watchers = [BuildWatcher(queue, target, options, on_event=printer(target.name), polling=polling)
+                for target in targets]
+    for watcher in watchers:
+        watcher.start()
+    try:
+        while True:
+            time.sleep(1)
+            for job in list(queue.jobs):
+                job.log.drain(time_budget=0.05, max_chunks=1_000_000)
+            queue.clear_finished(keep=len(targets))
+    except KeyboardInterrupt:
+        print("Stopping...", flush=True)
+    finally:
+        for watcher in watchers:
+            watcher.stop()
+        queue.cancel_all()
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+        Command-line entry point: build every target in a manifest without the GUI.
+    """
+    parser = argparse.ArgumentParser(description="Build many PyInstaller targets from a JSON manifest, in parallel.")
+    parser.add_argument("manifest", type=Path, help="JSON manifest describing the targets")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="maximum number of simultaneous builds (default: CPU count)")
+    parser.add_argument("--log-dir", type=Path, default=Path("build-logs"),
+                        help="directory for per-target build logs (default: ./build-logs)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse each target's PyInstaller work directory from previous runs")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild targets even if their artifacts are already up to date")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="RUNS",
+                        help="after building, launch each executable RUNS times cold and warm and record startup time")
+    parser.add_argument("--ready-marker", default="",
+                        help="stdout text that means the app has started (default: wait for the app to exit)")
+    parser.add_argument("--compare-variants", action="store_true",
+                        help="instead of a normal build, build and benchmark one-file/one-dir with and without UPX")
+    parser.add_argument("--warm-workers", action="store_true",
+                        help="run PyInstaller in long-lived workers that keep it imported between builds")
+    parser.add_argument("--analysis-cache", action="store_true",
+                        help="reuse hook results and binary dependency scans between builds from the same environment")
+    parser.add_argument("--suite", metavar="NAME", default="",
+                        help="build all targets as one one-dir folder NAME whose executables share their dependencies")
+    parser.add_argument("--watch", action="store_true",
+                        help="stay running and rebuild a target whenever its sources or data files change")
+    parser.add_argument("--poll", action="store_true",
+                        help="with --watch, check for changes by polling instead of using inotify")
+    parser.add_argument("--memory-limit", type=int, default=0, metavar="MB",
+                        help="stop a build whose PyInstaller process tree uses more memory than this (Linux)")
+    parser.add_argument("--cpu-limit", type=float, default=0, metavar="SECONDS",
+                        help="stop a build whose PyInstaller process tree used more CPU time than this (Linux)")
+    parser.add_argument("--time-limit", type=float, default=0, metavar="SECONDS",
+                        help="stop a PyInstaller run that takes longer than this")
+    arguments = parser.parse_args(argv)
+    limits = {"memory_limit_mb": arguments.memory_limit, "cpu_limit_seconds": arguments.cpu_limit,
+              "time_limit_seconds": arguments.time_limit}
+    if arguments.suite:
+        combined = (("--incremental", arguments.incremental), ("--force", arguments.force),
+                    ("--benchmark", arguments.benchmark), ("--watch", arguments.watch),
+                    ("--compare-variants", arguments.compare_variants))
+        unsupported = [option for option, used in combined if used]
+        if unsupported:
+            parser.error(f"--suite cannot be combined with {', '.join(unsupported)} (a suite is always built in full)")
+
+    try:
+        targets = load_manifest(arguments.manifest)
+    except (OSError, ValueError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+
+    if arguments.suite:
+        return build_suite_of(arguments.suite, targets, arguments.log_dir, arguments.warm_workers,
+                              arguments.analysis_cache, limits)
+
+    if arguments.watch:
+        return watch_all(targets, arguments.log_dir, arguments.jobs, arguments.warm_workers, arguments.poll, limits,
+                         arguments.analysis_cache)
+
+    if arguments.compare_variants:
+        failed = compare_all(targets, arguments.log_dir, max(1, arguments.benchmark or 5), arguments.ready_marker,
+                             arguments.warm_workers, arguments.analysis_cache)
+        if failed:
+            print(f"\n{failed} variant(s) failed to build.")
+        return 1 if failed else 0
+
+    def report(result: BuildResult) -> None:
+        """
+            Print a one-line summary as each build finishes.
+        """
+        status = ("up to date" if result.skipped else "ok") if result.succeeded else "FAILED"
+        detail = f" ({result.error})" if result.error else ""
+        print(f"[{status}] {result.target.name} in {result.seconds:.1f}s, log: {result.log_file}{detail}",
+              flush=True)
+
+    try:
+        results = build_all(targets, arguments.log_dir, arguments.jobs, on_result=report,
+                            incremental=arguments.incremental, force=arguments.force, warm=arguments.warm_workers,
+                            limits=limits, analysis_cache=arguments.analysis_cache)
+    except ValueError as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+
+    if arguments.benchmark > 0:
+        benchmark_all(results, arguments.benchmark, arguments.ready_marker)
+
+    failed = [result.target.name for result in results if not result.succeeded]
+    print(f"\n{len(results) - len(failed)}/{len(results)} target(s) built successfully.")
+    if failed:
+        print("Failed: " + ", ".join(failed))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
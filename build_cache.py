@@ -0,0 +1,94 @@
+import hashlib, json, os
+
+from pathlib import Path
+from shutil import rmtree
+
+from build_engine import BuildTarget, assemble_command
+from toolchain import discover
+
+
+CACHE_ENVIRONMENT_VARIABLE = "UPB_CACHE_DIR"
+WORK_DIRECTORY = "work"
+INPUTS_FILE = "inputs.json"
+
+
+def cache_directory() -> Path:
+    """
+        Return the per-user cache root used for incremental builds (created on demand).
+
+        ``UPB_CACHE_DIR`` overrides the location; otherwise ``%LOCALAPPDATA%`` on Windows and
+        ``$XDG_CACHE_HOME`` (or ``~/.cache``) elsewhere.
+    """
+    override = os.environ.get(CACHE_ENVIRONMENT_VARIABLE)
+    if override:
+        root = Path(override)
+    elif os.name == "nt":
+        root = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local")) / "UniversalPyInstallerBuilder"
+    else:
+        root = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "universal-pyinstaller-builder"
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def target_key(target: BuildTarget) -> str:
+    """
+        Return a short, stable key for *target*: its resolved entry point plus every option in its command.
+    """
+    command = assemble_command(target)
+    material = json.dumps([str(Path(target.entry_point).resolve()), command], separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:24]
+
+
+def _toolchain_stamp(command: list[str]) -> dict[str, object]:
+    """
+        Describe the interpreter and PyInstaller a command runs under, so replacing or upgrading either
+        invalidates the cache.
+    """
+    toolchain = discover(command)
+    return {"python": toolchain.python, "mtime": toolchain.python_mtime,
+            "pyinstaller": toolchain.pyinstaller_version}
+
+
+def incremental_workspace(target: BuildTarget) -> Path:
+    """
+        Return the persistent work directory for *target*, wiping it first if its inputs changed.
+
+        PyInstaller re-uses what it finds in its ``--workpath`` (Analysis TOCs, compiled bytecode,
+        ``base_library.zip``, PYZ/PKG) and only redoes the steps whose inputs changed, so keeping one
+        work directory per target turns a full rebuild into an incremental one. The directory is keyed
+        by the entry point and all build options; an ``inputs.json`` stamp records the interpreter and
+        PyInstaller version, and a mismatch discards the stale work rather than risk mixing outputs of
+        two environments.
+
+        Parameters
+        ----------
+        target : BuildTarget
+            The target about to be built.
+
+        Returns
+        -------
+        Path
+            The workspace; pass ``workspace / "build"`` as ``--workpath`` and the workspace itself as ``--specpath``.
+    """
+    workspace = cache_directory() / WORK_DIRECTORY / f"{target.name}-{target_key(target)}"
+    stamp_file = workspace / INPUTS_FILE
+    stamp = _toolchain_stamp(assemble_command(target))
+
+    try:
+        previous = json.loads(stamp_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        previous = None
+
+    if previous != stamp:
+        rmtree(workspace, ignore_errors=True)
+        workspace.mkdir(parents=True, exist_ok=True)
+        stamp_file.write_text(json.dumps(stamp, indent=2), encoding="utf-8")
+
+    return workspace
+
+
+def clear_incremental_cache() -> None:
+    """
+        Remove every stored incremental work directory.
+    """
+    rmtree(cache_directory() / WORK_DIRECTORY, ignore_errors=True)
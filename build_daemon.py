@@ -0,0 +1,370 @@
+import argparse, codecs, hmac, json, os, re, secrets, sys, time, urllib.error, urllib.request
+
+from dataclasses import asdict, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Thread
+from urllib.parse import parse_qs, urlsplit
+
+from build_cache import cache_directory
+from build_engine import BuildTarget, parse_data_specification
+from build_pipeline import BuildOptions
+from build_queue import FINISHED_STATES, BuildJob, BuildQueue
+
+
+DAEMON_FILE = "daemon.json"     # Address, token and pid of the running daemon, in the user cache (owner-only)
+DAEMON_LOGS_DIRECTORY = "daemon-logs"
+DEFAULT_PORT = 8765
+LOG_WAIT = 2.0  # Seconds a log request waits for new output before answering without any
+LOG_CHUNK = 1024 * 1024     # Most log bytes returned by one request
+JOBS_KEPT = 200     # Finished jobs remembered for status requests (and log files kept)
+DAEMON_OPTIONS = {"warm_worker": True, "artifact_cache": True}  # Defaults of the daemon; requests may override them
+REQUEST_OPTIONS = tuple(option.name for option in fields(BuildOptions) if option.name != "isolated")
+
+
+def describe_job(job: BuildJob) -> dict:
+    """
+        Return the JSON form of a job, as the API reports it.
+    """
+    return {"number": job.number, "name": job.target.name, "artifact": str(job.target.artifact), "state": job.state,
+            "progress": job.progress, "seconds": round(job.seconds, 3),
+            "exit_code": job.outcome.exit_code if job.outcome else None,
+            "cached": bool(job.outcome and job.outcome.cached), "error": job.error,
+            "resources": job.resources.describe() if job.resources else None,
+            "log": str(job.log.log_path) if job.log.log_path else None}
+
+
+class BuildDaemon:
+    """
+        A long-running build service: a :class:`build_queue.BuildQueue` behind a localhost HTTP API.
+
+        Every client (CI scripts, shells, several at once) shares the daemon's warm PyInstaller workers
+        and its artifact cache (see :mod:`artifact_cache`), so a request that matches an earlier build
+        is answered with a copy of its result instead of a build. The API only listens on 127.0.0.1 and
+        requires the token the daemon writes to ``daemon.json`` in the user cache, readable by its user
+        only.
+
+        ``GET /status``, ``GET /jobs/<n>``, ``GET /jobs/<n>/log?offset=<bytes>`` (waits up to
+        :data:`LOG_WAIT` seconds for new output; ``X-Log-Offset`` and ``X-Job-State`` tell where to
+        continue and whether the job is done), ``POST /jobs`` with ``{"target": {...}, "options":
+        {...}}``, ``POST /jobs/<n>/cancel`` and ``POST /shutdown``.
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT, concurrency: int | None = None):
+        self.queue = BuildQueue(cache_directory() / DAEMON_LOGS_DIRECTORY,
+                                concurrency=concurrency or os.cpu_count() or 1, logs_kept=JOBS_KEPT)
+        self.token = secrets.token_urlsafe(32)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), type("Handler", (_Handler,), {"daemon": self}))
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def serve_forever(self) -> None:
+        """
+            Answer requests until :meth:`shutdown` (or Ctrl+C); running builds are cancelled on the way out.
+        """
+        info_file = cache_directory() / DAEMON_FILE
+        temporary = info_file.with_name(f"{DAEMON_FILE}.{os.getpid()}.tmp")
+        descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            json.dump({"url": self.url, "token": self.token, "pid": os.getpid()}, file)
+        os.replace(temporary, info_file)
+        Thread(target=self._housekeeping, daemon=True, name="daemon-housekeeping").start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.queue.cancel_all()
+            self.server.server_close()
+            try:
+                if json.loads(info_file.read_text(encoding="utf-8")).get("pid") == os.getpid():
+                    info_file.unlink()
+            except (OSError, ValueError):
+                pass
+
+    def shutdown(self) -> None:
+        Thread(target=self.server.shutdown, daemon=True).start()   # shutdown() waits for serve_forever() to return
+
+    def _housekeeping(self) -> None:
+        """
+            Drop log text queued for a GUI (nobody drains it here; clients read the log files) and old jobs.
+        """
+        while True:
+            time.sleep(1)
+            for job in list(self.queue.jobs):
+                job.log.drain(time_budget=0.05, max_chunks=1_000_000)
+            self.queue.clear_finished(keep=JOBS_KEPT)
+
+    def job(self, number: int) -> BuildJob | None:
+        return next((job for job in list(self.queue.jobs) if job.number == number), None)
+
+    def submit(self, request: dict) -> BuildJob:
+        """
+            Queue the build a ``POST /jobs`` body describes.
+
+            Raises
+            ------
+            ValueError
+                If the request is malformed, names unknown options, gives an option or path of the wrong type
+                or uses relative paths (the daemon's working folder is not the client's).
+        """
+        if not isinstance(request, dict) or not isinstance(request.get("target"), dict):
+            raise ValueError("Expected {\"target\": {...}, \"options\": {...}}.")
+        try:
+            target = BuildTarget.from_mapping(request["target"])
+        except TypeError as e:
+            raise ValueError(f"Malformed target: {e}") from e
+        if not all(isinstance(path, str) for path in (target.entry_point, target.output_directory, target.icon,
+                                                       *target.data_files)):
+            raise ValueError("Paths and data entries must be strings (data entries may also be objects).")
+        icon = target.icon.strip()
+        paths = [target.entry_point, target.output_directory, *([icon] if icon and icon != "NONE" else []),
+                 *(parse_data_specification(specification).source for specification in target.data_files)]
+        for path in paths:
+            if not os.path.isabs(path):
+                raise ValueError(f"Paths must be absolute: {path!r}")
+        options = request.get("options") or {}
+        if not isinstance(options, dict):
+            raise ValueError("Expected the options as an object.")
+        unknown = set(options) - set(REQUEST_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown build option(s): {', '.join(sorted(unknown))}")
+        for option in fields(BuildOptions):
+            value = options.get(option.name, option.default)
+            accepted = (int, float) if option.type is float else (option.type,)
+            if not isinstance(value, accepted) or (isinstance(value, bool) and option.type is not bool):
+                raise ValueError(f"Option {option.name} must be of type {option.type.__name__}, not {value!r}.")
+        return self.queue.submit(target, BuildOptions(**{**DAEMON_OPTIONS, **options}))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    daemon: BuildDaemon
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass    # Builds have their own logs
+
+    def _send(self, status: int, body: bytes | dict, headers: dict[str, str] | None = None) -> None:
+        if isinstance(body, dict):
+            body, content_type = json.dumps(body).encode("utf-8"), "application/json"
+        else:
+            content_type = "text/plain; charset=utf-8"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        supplied = self.headers.get("Authorization", "")
+        if hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {self.daemon.token}".encode("utf-8")):
+            return True
+        self._send(401, {"error": "missing or wrong token"})
+        return False
+
+    def _job(self, number: str) -> BuildJob | None:
+        job = self.daemon.job(int(number))
+        if job is None:
+            self._send(404, {"error": f"no job {number}"})
+        return job
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlsplit(self.path)
+        if url.path == "/status":
+            self._send(200, {"pid": os.getpid(), "concurrency": self.daemon.queue.concurrency,
+                             "jobs": [describe_job(job) for job in list(self.daemon.queue.jobs)]})
+        elif match := re.fullmatch(r"/jobs/(\d+)", url.path):
+            if job := self._job(match[1]):
+                self._send(200, describe_job(job))
+        elif match := re.fullmatch(r"/jobs/(\d+)/log", url.path):
+            offset = parse_qs(url.query).get("offset", ["0"])[0]
+            if not offset.isdigit():
+                self._send(400, {"error": "offset must be a byte count"})
+            elif job := self._job(match[1]):
+                self._send_log(job, int(offset))
+        else:
+            self._send(404, {"error": "unknown path"})
+
+    def _send_log(self, job: BuildJob, offset: int) -> None:
+        """
+            Send the job's log from byte *offset*, waiting up to :data:`LOG_WAIT` seconds for more if there is none.
+        """
+        deadline = time.monotonic() + LOG_WAIT
+        while True:
+            state = job.state   # Read first: output written before a job ends is in the file by the time it is done
+            job.log.flush()
+            path = job.log.log_path
+            size = path.stat().st_size if path is not None and path.exists() else 0
+            if size > offset or job.done or time.monotonic() >= deadline:
+                break
+            time.sleep(0.1)
+        data = b""
+        if size > offset:
+            with open(path, "rb") as file:
+                file.seek(offset)
+                data = file.read(LOG_CHUNK)
+        self._send(200, data, {"X-Log-Offset": str(offset + len(data)), "X-Job-State": state})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        path = urlsplit(self.path).path
+        if path == "/jobs":
+            try:
+                length = int(self.headers.get("Content-Length", "0"))
+                job = self.daemon.submit(json.loads(self.rfile.read(length) or b"null"))
+            except (TypeError, ValueError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            self._send(201, describe_job(job))
+        elif match := re.fullmatch(r"/jobs/(\d+)/cancel", path):
+            if job := self._job(match[1]):
+                self.daemon.queue.cancel(job)
+                self._send(200, describe_job(job))
+        elif path == "/shutdown":
+            self._send(200, {"stopping": True})
+            self.daemon.shutdown()
+        else:
+            self._send(404, {"error": "unknown path"})
+
+
+class DaemonClient:
+    """
+        Talks to the running daemon, found through ``daemon.json`` in the user cache.
+
+        Raises
+        ------
+        RuntimeError
+            If no daemon is running, or it rejects a request.
+    """
+
+    def __init__(self):
+        try:
+            info = json.loads((cache_directory() / DAEMON_FILE).read_text(encoding="utf-8"))
+            self.url, self.token = info["url"], info["token"]
+        except (OSError, ValueError, KeyError):
+            raise RuntimeError("No build daemon is running; start one with `python build_daemon.py serve`.")
+
+    def request(self, method: str, path: str, body: dict | None = None) -> tuple[bytes, dict[str, str]]:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"Authorization": f"Bearer {self.token}",
+                                                  "Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=LOG_WAIT + 30) as response:
+                return response.read(), dict(response.headers)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            raise RuntimeError(f"{method} {path}: {message}") from e
+        except OSError as e:
+            raise RuntimeError(f"The build daemon at {self.url} does not answer ({e}); is it still running?") from e
+
+    def call(self, method: str, path: str, body: dict | None = None) -> dict:
+        return json.loads(self.request(method, path, body)[0])
+
+    def submit(self, target: BuildTarget, options: dict | None = None) -> dict:
+        return self.call("POST", "/jobs", {"target": asdict(target), "options": options or {}})
+
+    def follow(self, number: int, write=None) -> dict:
+        """
+            Stream a job's log to *write* (nothing if ``None``) until the job is done; return the finished job.
+        """
+        offset, decoder = 0, codecs.getincrementaldecoder("utf-8")("replace")
+        while True:
+            data, headers = self.request("GET", f"/jobs/{number}/log?offset={offset}")
+            offset = int(headers["X-Log-Offset"])
+            if write is not None and data:
+                write(decoder.decode(data))
+            if not data and headers["X-Job-State"] in FINISHED_STATES:
+                return self.call("GET", f"/jobs/{number}")
+
+
+def _summary(job: dict) -> str:
+    state = "from cache" if job["cached"] else job["state"]
+    return f"[{state}] #{job['number']} {job['name']} in {job['seconds']:.1f}s -> {job['artifact']}" + \
+        (f" ({job['error']})" if job["error"] else "")
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+        Command-line entry point: run the daemon, or talk to it.
+    """
+    parser = argparse.ArgumentParser(description="Local build daemon: one warm build service for every client.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the daemon in the foreground")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port on 127.0.0.1 (default: {DEFAULT_PORT})")
+    serve.add_argument("-j", "--jobs", type=int, default=None,
+                       help="maximum number of simultaneous builds (default: CPU count)")
+    submit = commands.add_parser("submit", help="build the targets of a manifest through the daemon")
+    submit.add_argument("manifest", type=Path, help="JSON manifest, as for batch_build.py")
+    submit.add_argument("--incremental", action="store_true", help="reuse each target's work folder")
+    submit.add_argument("--force", action="store_true", help="build even if the artifact is up to date or cached")
+    submit.add_argument("--analysis-cache", action="store_true",
+                        help="reuse hook results and binary dependency scans of the environment")
+    submit.add_argument("--no-wait", action="store_true", help="print the job numbers and return at once")
+    submit.add_argument("--quiet", action="store_true", help="print one line per job instead of its log")
+    commands.add_parser("status", help="list the daemon's jobs")
+    log = commands.add_parser("log", help="stream the log of a job until it is done")
+    log.add_argument("job", type=int)
+    cancel = commands.add_parser("cancel", help="cancel a job")
+    cancel.add_argument("job", type=int)
+    commands.add_parser("stop", help="stop the daemon (running builds are cancelled)")
+    arguments = parser.parse_args(argv)
+
+    if arguments.command == "serve":
+        daemon = BuildDaemon(arguments.port, arguments.jobs)
+        print(f"Build daemon listening on {daemon.url} (pid {os.getpid()})", flush=True)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        client = DaemonClient()
+        if arguments.command == "status":
+            for job in client.call("GET", "/status")["jobs"]:
+                print(_summary(job) if job["state"] in FINISHED_STATES else
+                      f"[{job['state']}] #{job['number']} {job['name']}: {job['progress']}")
+        elif arguments.command == "cancel":
+            print(_summary(client.call("POST", f"/jobs/{arguments.job}/cancel")))
+        elif arguments.command == "stop":
+            client.call("POST", "/shutdown")
+        elif arguments.command == "log":
+            job = client.follow(arguments.job, lambda text: print(text, end="", flush=True))
+            return 0 if job["state"] in ("succeeded", "skipped") else 1
+        else:
+            from batch_build import load_manifest
+
+            targets = load_manifest(arguments.manifest)
+            options = {"incremental": arguments.incremental, "analysis_cache": arguments.analysis_cache}
+            if arguments.force:
+                options.update(skip_up_to_date=False, artifact_cache=False)
+            jobs = [client.submit(target, options) for target in targets]
+            if arguments.no_wait:
+                for job in jobs:
+                    print(f"#{job['number']} {job['name']} queued")
+                return 0
+            failed = 0
+            for job in jobs:
+                write = None if arguments.quiet else lambda text: print(text, end="", flush=True)
+                job = client.follow(job["number"], write)
+                print(_summary(job), flush=True)
+                failed += job["state"] not in ("succeeded", "skipped")
+            return 1 if failed else 0
+    except (OSError, ValueError, RuntimeError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
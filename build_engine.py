@@ -0,0 +1,478 @@
+import fnmatch, os, subprocess, sys
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from shutil import rmtree
+from typing import Callable, Iterable
+
+from analysis_cache import ANALYSIS_CACHE_VARIABLE, analysis_cache_file, cached_analysis_command
+from build_worker import run_in_worker, supports_worker
+from fast_start import fast_start_arguments
+from process_tree import (Cancellation, ProcessUsage, ResourceLimits, ResourceSample, UsageMonitor, kill_tree,
+                          new_process_group_flags)
+from toolchain import discover, upx_location
+
+
+BUILD_DIRECTORY = "build"
+SPECIFICATION_EXTENSION = ".spec"
+
+# Modules excluded from every build to reduce bundle size
+DEFAULT_EXCLUDED_MODULES = ("sitecustomize", "unittest", "test", "pydoc")
+OPTIMIZATION_LEVELS = ("none", "-O", "-OO")  # Bytecode level -> name (-O drops asserts, -OO docstrings as well)
+# Version-control folders and caches, left out of every staged data folder
+DEFAULT_DATA_EXCLUDES = (".git", ".hg", ".svn", "__pycache__", "*.pyc", ".DS_Store", "Thumbs.db", "desktop.ini")
+
+
+@dataclass
+class BuildTarget:
+    """
+        All settings that describe a single PyInstaller build, independent of any GUI.
+
+        The GUI fills one of these from its widgets; the batch builder reads many of them from a manifest.
+    """
+    entry_point: str
+    executable_name: str = ""
+    hidden_imports: list[str] = field(default_factory=list)
+    icon: str = ""
+    output_directory: str = "dist"
+    onefile: bool = True
+    upx: bool = True    # Compress with UPX when it is installed
+    upx_policy: str = "all"     # "all" binaries, or "selective" (measured per binary, see upx_policy.py)
+    upx_excludes: list[str] = field(default_factory=list)   # File names/patterns passed as --upx-exclude
+    data_files: list[str] = field(default_factory=list)  # "source;destination" specifications (see DataEntry)
+    excludes: list[str] = field(default_factory=list)   # Extra --exclude-module names
+    exclude_mode: str = "off"   # Import-graph exclude analysis: "off", "report" or "apply"
+    fast_start: bool = False    # One-file only: own extraction folder and leftover cleanup (fast_start.py), not speed
+    optimize: int = 0   # Bytecode optimization level of the collected modules, an index into OPTIMIZATION_LEVELS
+    stage_data: bool = False    # Stage every data folder (see data_staging.py), not just the filtered ones
+    compact: bool = False   # One-dir only: strip and deduplicate the app's binaries after the build (app_compaction.py)
+    package: str = ""   # Archive the finished artifact for distribution: "zip" or "tar.zst" (dist_packaging.py)
+
+    @property
+    def name(self) -> str:
+        """
+            The executable name PyInstaller will use (explicit name or the entry script's stem).
+        """
+        return self.executable_name.strip() or Path(self.entry_point).stem
+
+    @property
+    def artifact(self) -> Path:
+        """
+            Where PyInstaller puts the finished build: the executable (one-file) or the application folder (one-dir).
+        """
+        output_directory = Path(self.output_directory.strip())
+        if self.onefile:
+            return output_directory / (self.name + (".exe" if os.name == "nt" else ""))
+        return output_directory / self.name
+
+    @classmethod
+    def from_mapping(cls, mapping: dict) -> "BuildTarget":
+        """
+            Create a target from a manifest entry.
+
+            Unknown keys raise ``ValueError`` so typos in a manifest are not silently ignored.
+            ``hidden_imports`` may be given as a list or as a comma-separated string, like in the GUI.
+        """
+        known = set(cls.__dataclass_fields__)
+        unknown = set(mapping) - known
+        if unknown:
+            raise ValueError(f"Unknown target option(s): {', '.join(sorted(unknown))}")
+        if "entry_point" not in mapping:
+            raise ValueError("Every target needs an 'entry_point'.")
+
+        values = dict(mapping)
+        hidden_imports = values.get("hidden_imports", [])
+        if isinstance(hidden_imports, str):
+            values["hidden_imports"] = split_hidden_imports(hidden_imports)
+        data_files = []
+        for data in values.get("data_files", []):
+            if isinstance(data, dict):  # {"source": ..., "destination": ..., "include": [...], "exclude": [...]}
+                if "source" not in data:
+                    raise ValueError("Every data entry object needs a 'source'.")
+                data = DataEntry(source=data["source"], destination=data.get("destination", "."),
+                                 include=list(data.get("include", [])), exclude=list(data.get("exclude", []))
+                                 ).specification()
+            data_files.append(data)
+        if "data_files" in values:
+            values["data_files"] = data_files
+        return cls(**values)
+
+
+def cleanup_build_artifacts():
+    """
+        Clean previous PyInstaller build artifacts.
+    """
+    if Path(BUILD_DIRECTORY).is_dir():
+        rmtree(BUILD_DIRECTORY)
+    for specification in Path(".").glob(f"*{SPECIFICATION_EXTENSION}"):
+        specification.unlink()
+
+
+def split_hidden_imports(text: str) -> list[str]:
+    """
+        Split a comma-separated hidden import string into clean module names.
+    """
+    return list(filter(None, map(str.strip, text.split(","))))
+
+
+@dataclass
+class DataEntry:
+    """
+        One data specification: ``"source;destination"``, optionally followed by ``";include=<globs>"`` and/or
+        ``";exclude=<globs>"`` (comma-separated) that select the files of a source folder.
+
+        A glob without ``/`` matches any file or folder name (``*.psd``, ``.git``); one with ``/`` matches the
+        path relative to the source folder (``raw/*.wav``).
+    """
+    source: str
+    destination: str
+    include: list[str] = field(default_factory=list)    # Empty: every file
+    exclude: list[str] = field(default_factory=list)
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.include or self.exclude)
+
+    def staged(self, target: "BuildTarget") -> bool:
+        """
+            Return whether this entry goes through data staging: a filtered folder, or any folder of a staging target.
+        """
+        return (self.filtered or target.stage_data) and Path(self.source).is_dir()
+
+    def selects(self, relative: str, default_excludes: bool = True) -> bool:
+        """
+            Return whether the file at *relative* (a ``/``-separated path inside the source folder) is included.
+        """
+        names = relative.split("/")
+
+        def matches(pattern: str) -> bool:
+            if "/" in pattern:
+                return fnmatch.fnmatchcase(relative, pattern.strip("/")) or \
+                    fnmatch.fnmatchcase(relative, pattern.strip("/") + "/*")
+            return any(fnmatch.fnmatchcase(name, pattern) for name in names)
+
+        excludes = [*self.exclude, *(DEFAULT_DATA_EXCLUDES if default_excludes else ())]
+        if any(matches(pattern) for pattern in excludes):
+            return False
+        return not self.include or any(matches(pattern) for pattern in self.include)
+
+    def files(self, default_excludes: bool = True) -> list[tuple[str, Path]]:
+        """
+            Return ``(relative path, path)`` of every selected file, in a stable order (a single file for a file entry).
+        """
+        source = Path(self.source)
+        if source.is_file():
+            return [(source.name, source)]
+        selected = []
+        for path in sorted(source.rglob("*")):
+            relative = path.relative_to(source).as_posix()
+            if path.is_file() and self.selects(relative, default_excludes):
+                selected.append((relative, path))
+        return selected
+
+    def specification(self) -> str:
+        """
+            Return the specification string of this entry.
+        """
+        return ";".join([self.source, self.destination, *(f"{name}={','.join(patterns)}" for name, patterns in
+                                                          (("include", self.include), ("exclude", self.exclude))
+                                                          if patterns)])
+
+
+def parse_data_specification(specification: str) -> DataEntry:
+    """
+        Parse a data specification (see :class:`DataEntry`).
+    """
+    parts = specification.split(";")
+    filters: dict[str, list[str]] = {"include": [], "exclude": []}
+    while len(parts) > 1 and parts[-1].partition("=")[0] in filters:
+        name, _, patterns = parts.pop().partition("=")
+        filters[name] = [*filter(None, map(str.strip, patterns.split(","))), *filters[name]]
+    source, _, destination = ";".join(parts).rpartition(";")
+    if not source:
+        source, destination = ";".join(parts), "."
+    return DataEntry(source=source, destination=destination, **filters)
+
+
+def split_data_specification(specification: str) -> tuple[str, str]:
+    """
+        Split a ``"source;destination"`` data specification into its two halves (ignoring any filters).
+    """
+    entry = parse_data_specification(specification)
+    return entry.source, entry.destination
+
+
+def _venv_python(directory: Path) -> Path:
+    """
+        Return the interpreter path inside a `.venv` located in *directory*.
+    """
+    venv_directory = directory / ".venv" / ("Scripts" if os.name == "nt" else "bin")
+    return venv_directory / ("python.exe" if os.name == "nt" else "python3")
+
+
+def pyinstaller_invoker(entry_point: str) -> list[str]:
+    """
+        Resolve the exact command used to invoke PyInstaller.
+
+        Search order (first match wins):
+          1) A `.venv` next to the *target entry script* (…/project/.venv/Scripts/python.exe -m PyInstaller).
+          2) If this app is frozen: a `.venv` next to our own EXE.
+          3) When running from source: the current interpreter (`sys.executable -m PyInstaller`).
+          4) Fallback: `pyinstaller` on PATH.
+
+        Parameters
+        ----------
+        entry_point : str
+            Path to the target entry script.
+
+        Returns
+        -------
+        list[str]
+            The argv head for invoking PyInstaller, e.g.
+            `[<python>, "-m", "PyInstaller"]` or `["pyinstaller"]`.
+    """
+    # Prefer a .venv next to the target entry script
+    venv_python = _venv_python(Path(entry_point).resolve().parent)
+    if venv_python.exists():
+        return [str(venv_python), "-m", "PyInstaller"]
+
+    # If *we* are frozen, prefer a .venv next to our EXE
+    if getattr(sys, "frozen", False):
+        venv_python = _venv_python(Path(sys.executable).resolve().parent)
+        if venv_python.exists():
+            return [str(venv_python), "-m", "PyInstaller"]
+
+    # Running from source: use this interpreter
+    if not getattr(sys, "frozen", False):
+        return [sys.executable, "-m", "PyInstaller"]
+
+    return ["pyinstaller"]
+
+
+def assemble_command(target: BuildTarget, workpath: str | None = None, specpath: str | None = None) -> list[str]:
+    """
+        Build the full PyInstaller command list for *target*.
+
+        The resulting command includes:
+          - ``--onefile`` or ``--onedir`` depending on ``target.onefile``.
+          - ``--noconsole`` to hide the console window in GUI applications.
+          - ``--optimize`` with ``target.optimize`` when it is not 0 (see :data:`OPTIMIZATION_LEVELS`; the
+            option needs PyInstaller 6.6, so it is left out at the default level for older versions).
+          - ``--exclude-module sitecustomize``, common stdlib modules and ``target.excludes`` to reduce size.
+          - Optional UPX compression if enabled and UPX is found on the system PATH (``--noupx`` when disabled),
+            with ``target.upx_excludes`` as ``--upx-exclude``. Selective one-dir builds use ``--noupx``
+            because their binaries are compressed after the build (see :mod:`upx_policy`).
+          - For one-file builds with ``fast_start`` (extraction folder and cleanup; extraction still happens on every
+            launch), ``--runtime-hook``/``--runtime-tmpdir`` (see :mod:`fast_start`).
+          - The entry-point script path.
+          - Optional executable name override.
+          - Any additional data files specified.
+          - Any hidden imports specified.
+          - Optional icon file.
+          - Output directory path.
+          - Optional ``--workpath``/``--specpath`` so several builds can run side by side.
+
+        Parameters
+        ----------
+        target : BuildTarget
+            The build settings.
+        workpath : str | None
+            Directory for PyInstaller's temporary work files; PyInstaller's default (``./build``) when ``None``.
+        specpath : str | None
+            Directory for the generated ``.spec`` file; the current directory when ``None``.
+
+        Returns
+        -------
+        list[str]
+            The PyInstaller command-line arguments.
+
+        Raises
+        ------
+        ValueError
+            If the entry point or the output directory is missing.
+    """
+    if not target.entry_point:
+        raise ValueError("Please select an entry point file.")
+
+    output_directory = target.output_directory.strip()
+    if not output_directory:
+        raise ValueError("Please select an output directory.")
+
+    # Base command: onefile/onedir + no-console
+    command = \
+        [
+            *pyinstaller_invoker(target.entry_point),
+            "--onefile" if target.onefile else "--onedir",
+            "--noconsole",
+        ]
+    if target.optimize:
+        command.extend(["--optimize", str(target.optimize)])
+
+    # UPX compression (if enabled and UPX is on PATH)
+    upx_path = upx_location()
+    compressed_after_build = target.upx_policy == "selective" and not target.onefile
+    if target.upx and upx_path and not compressed_after_build:
+        command.extend(["--upx-dir", os.path.dirname(upx_path)]) # Point PyInstaller to the directory containing UPX.exe
+        for pattern in target.upx_excludes:
+            command.extend(["--upx-exclude", pattern])
+    elif not target.upx or compressed_after_build:
+        command.append("--noupx")
+
+    # Exclude sitecustomize and common unneeded stdlib modules to reduce bundle size. PyInstaller always excludes
+    # __main__ and appends it to a non-empty exclude list in place, which makes its "excludes changed" check fail on
+    # every rebuild; listing it explicitly keeps the stored list stable so a kept --workpath is actually reused.
+    for module in (*DEFAULT_EXCLUDED_MODULES, *target.excludes, "__main__"):
+        command.extend(["--exclude-module", module])
+
+    # Fast-start one-file: own extraction folder (Windows) and a runtime hook that removes leftover extractions
+    if target.onefile and target.fast_start:
+        command.extend(fast_start_arguments(target.name))
+
+    # Target entry point
+    command.append(target.entry_point)
+
+    # Optional name override
+    executable_name = target.executable_name.strip()
+    if executable_name:
+        command.extend(["--name", executable_name])
+
+    # Data files (PyInstaller expects the platform path separator between source and destination, and resolves
+    # relative sources against --specpath, so sources are made absolute)
+    for data in target.data_files:
+        source, destination = split_data_specification(data)
+        command.extend(["--add-data", f"{os.path.abspath(source)}{os.pathsep}{destination}"])
+
+    # Hidden imports
+    for hidden_import in target.hidden_imports:
+        command.extend(["--hidden-import", hidden_import])
+
+    # Icon
+    icon = target.icon.strip()
+    if icon:
+        command.extend(["--icon", os.path.abspath(icon)])
+
+    # Output directory
+    command.extend(["--distpath", output_directory])
+
+    # Isolated work/spec directories (builds running in parallel must not share ./build and ./*.spec)
+    if workpath:
+        command.extend(["--workpath", workpath])
+    if specpath:
+        command.extend(["--specpath", specpath])
+
+    # Never stop to ask before replacing a previous output directory
+    command.append("--noconfirm")
+
+    return command
+
+
+def pyinstaller_environment(command: list[str]) -> dict[str, str]:
+    """
+        Return the environment PyInstaller should run with.
+
+        On Windows, ``TCL_LIBRARY``/``TK_LIBRARY`` are pointed at the Tcl/Tk of the interpreter
+        PyInstaller runs under to reduce Tk/Tcl packaging issues. The locations come from the
+        cached toolchain discovery, so repeated builds do not spawn the interpreter again.
+    """
+    env = os.environ.copy()
+    if os.name != "nt":
+        return env
+
+    try:
+        toolchain = discover(command)
+    except RuntimeError:
+        return env
+
+    if toolchain.tcl_library and toolchain.tk_library:
+        env["TCL_LIBRARY"] = toolchain.tcl_library
+        env["TK_LIBRARY"] = toolchain.tk_library
+
+    return env
+
+
+def run_pyinstaller(command: list[str], on_output: Callable[[str], object],
+                    env: dict[str, str] | None = None,
+                    on_usage: Callable[[ProcessUsage], object] | None = None,
+                    cancellation: Cancellation | None = None, warm: bool = False,
+                    limits: ResourceLimits | None = None,
+                    on_sample: Callable[[ResourceSample], object] | None = None,
+                    analysis_cache: bool = False) -> int:
+    """
+        Run PyInstaller and stream its combined stdout/stderr, line by line, to *on_output*.
+
+        Parameters
+        ----------
+        command : list[str]
+            A command produced by :func:`assemble_command`.
+        on_output : Callable[[str], object]
+            Called with every output line (including its newline).
+        env : dict[str, str] | None
+            Environment for the child; :func:`pyinstaller_environment` when ``None``.
+        on_usage : Callable[[ProcessUsage], object] | None
+            Receives the wall time, CPU time and peak memory of the PyInstaller process tree once it exits.
+        cancellation : Cancellation | None
+            Lets another thread kill PyInstaller together with every process it started.
+        warm : bool
+            Run ``python -m PyInstaller`` commands in a long-lived worker of their interpreter that already has
+            PyInstaller imported (see :mod:`build_worker`); a bare ``pyinstaller`` command always starts a process.
+        limits : ResourceLimits | None
+            Memory, CPU-time and wall-clock limits; PyInstaller is killed with its children when one is exceeded,
+            and the reason is logged and reported in the usage.
+        on_sample : Callable[[ResourceSample], object] | None
+            Receives the CPU and memory use of the PyInstaller process tree about ten times a second (from a
+            background thread).
+        analysis_cache : bool
+            Reuse hook results and binary dependency scans of earlier builds from the same environment
+            (see :mod:`analysis_cache`); only ``python -m PyInstaller`` commands, whose environment is known.
+
+        Returns
+        -------
+        int
+            PyInstaller's exit code.
+    """
+    env = pyinstaller_environment(command) if env is None else env
+    if analysis_cache and supports_worker(command):
+        try:
+            cache_file = analysis_cache_file(command)
+        except RuntimeError as e:
+            on_output(f"Analysis cache disabled: {e}\n")
+            cache_file = None
+        if cache_file is not None:
+            env = {**env, ANALYSIS_CACHE_VARIABLE: str(cache_file)}
+    if warm and supports_worker(command):
+        return run_in_worker(command, on_output, env, on_usage=on_usage, cancellation=cancellation, limits=limits,
+                             on_sample=on_sample)
+
+    if cancellation is not None or limits:
+        flags = new_process_group_flags()  # Its own process group, so cancelling reaches every child
+    else:
+        flags = {"creationflags": subprocess.CREATE_NO_WINDOW} if os.name == "nt" else {}
+    if ANALYSIS_CACHE_VARIABLE in env and supports_worker(command):
+        command = cached_analysis_command(command)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env, **flags)
+    monitor = UsageMonitor(process, limits=limits, on_sample=on_sample)
+    if cancellation is not None:
+        cancellation.attach(process)
+
+    try:
+        for line in process.stdout:
+            on_output(line)
+    except BaseException:
+        kill_tree(process)  # Nobody reads its output any more
+        raise
+    finally:
+        usage = monitor.finish()
+        if cancellation is not None:
+            cancellation.detach()
+    if usage.limit_exceeded:
+        on_output(f"\nBuild stopped: {usage.limit_exceeded}.\n")
+    if on_usage is not None:
+        on_usage(usage)
+    return process.returncode
+
+
+def format_command(command: Iterable[str]) -> str:
+    """
+        Join a command for display in a log.
+    """
+    return " ".join(command)
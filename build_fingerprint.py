@@ -0,0 +1,158 @@
+import hashlib, json, os
+
+from pathlib import Path
+from threading import Lock
+
+from build_cache import cache_directory
+from build_engine import BuildTarget, assemble_command, parse_data_specification
+from import_graph import import_closure
+from toolchain import discover, upx_location
+
+
+FINGERPRINT_SUFFIX = ".fingerprint.json"
+DIGEST_CACHE_FILE = "digests.json"
+
+_digest_lock = Lock()
+_digests: dict[str, list] | None = None    # path -> [size, mtime_ns, sha256], shared across builds
+
+
+def _load_digests() -> dict[str, list]:
+    """
+        Load the on-disk digest cache once per process.
+    """
+    global _digests
+    if _digests is None:
+        try:
+            _digests = json.loads((cache_directory() / DIGEST_CACHE_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _digests = {}
+    return _digests
+
+
+def save_digests() -> None:
+    """
+        Persist the digest cache (best effort; a lost cache only costs re-hashing).
+    """
+    with _digest_lock:
+        if _digests is None:
+            return
+        temporary = cache_directory() / (DIGEST_CACHE_FILE + f".{os.getpid()}.tmp")
+        try:
+            temporary.write_text(json.dumps(_digests), encoding="utf-8")
+            os.replace(temporary, cache_directory() / DIGEST_CACHE_FILE)
+        except OSError:
+            temporary.unlink(missing_ok=True)
+
+
+def file_digest(path: Path) -> str:
+    """
+        Return the SHA-256 of a file's contents.
+
+        Digests are remembered by path, size and modification time, so unchanged files (such as large
+        data folders) are only read once across builds.
+    """
+    stat = path.stat()
+    key = str(path.resolve())
+    with _digest_lock:
+        known = _load_digests().get(key)
+    if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+        return known[2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    with _digest_lock:
+        _load_digests()[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return digest.hexdigest()
+
+
+def _data_digests(target: BuildTarget, specification: str) -> list[tuple[str, str]]:
+    """
+        Return ``(relative path, digest)`` of every file a data specification bundles, in a stable order.
+    """
+    entry = parse_data_specification(specification)
+    return [(relative, file_digest(path)) for relative, path in entry.files(default_excludes=entry.staged(target))]
+
+
+def compute_fingerprint(target: BuildTarget) -> str:
+    """
+        Compute a fingerprint of everything that affects *target*'s output.
+
+        Covered: the PyInstaller command (every option), the contents of the entry script and of every
+        project-local module it imports, the contents of all data files and folders (the files their
+        filters select), data staging, the icon, and the
+        interpreter, PyInstaller version and installed distributions. Modules that are only imported
+        dynamically are not seen by the static import walk.
+
+        Parameters
+        ----------
+        target : BuildTarget
+            The target to fingerprint.
+
+        Returns
+        -------
+        str
+            A hex SHA-256 digest.
+
+        Raises
+        ------
+        RuntimeError
+            If the build interpreter cannot be queried.
+        OSError
+            If an input file cannot be read.
+    """
+    command = assemble_command(target)
+    entry = Path(target.entry_point).resolve()
+    sources = sorted(import_closure(entry, target.hidden_imports))
+
+    toolchain = discover(command)
+    material = {
+        "command": command,
+        "toolchain": [toolchain.python, toolchain.python_version, toolchain.pyinstaller_version,
+                      toolchain.distributions],
+        "sources": [(str(source), file_digest(source)) for source in sources],
+        "data": [(specification, _data_digests(target, specification)) for specification in target.data_files],
+        "stage_data": target.stage_data,   # Changes how data folders are filtered and placed
+        "icon": file_digest(Path(target.icon.strip())) if target.icon.strip() else None,
+        "upx": [target.upx_policy, upx_location()] if target.upx else None,    # Not in the command for one-dir
+        "compact": target.compact and not target.onefile,   # Post-processing changes the output
+        "package": target.package,  # So switching it on rebuilds rather than skipping without an archive
+    }
+    save_digests()
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _fingerprint_file(target: BuildTarget) -> Path:
+    """
+        Return where the fingerprint of *target*'s last successful build is stored (next to the artifact).
+    """
+    return Path(target.output_directory.strip()) / f".{target.name}{FINGERPRINT_SUFFIX}"
+
+
+def is_up_to_date(target: BuildTarget, fingerprint: str) -> bool:
+    """
+        Return whether *target*'s artifact exists in its output directory and was built from *fingerprint*.
+    """
+    try:
+        stored = json.loads(_fingerprint_file(target).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    return stored.get("fingerprint") == fingerprint and target.artifact.exists()
+
+
+def forget_fingerprint(target: BuildTarget) -> None:
+    """
+        Drop the stored fingerprint before a build starts, so a failed build is never mistaken for an up-to-date one.
+    """
+    _fingerprint_file(target).unlink(missing_ok=True)
+
+
+def record_fingerprint(target: BuildTarget, fingerprint: str) -> None:
+    """
+        Store the fingerprint of a successful build next to its artifact.
+    """
+    stamp = _fingerprint_file(target)
+    stamp.parent.mkdir(parents=True, exist_ok=True)
+    stamp.write_text(json.dumps({"fingerprint": fingerprint, "artifact": str(target.artifact)}, indent=2),
+                     encoding="utf-8")
@@ -0,0 +1,407 @@
+import os, time
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+from typing import Callable
+
+from app_compaction import compact_app
+from artifact_cache import artifact_key, restore_artifact, store_artifact
+from build_cache import incremental_workspace
+from build_engine import (BUILD_DIRECTORY, OPTIMIZATION_LEVELS, BuildTarget, assemble_command, cleanup_build_artifacts,
+                          format_command, run_pyinstaller)
+from build_fingerprint import compute_fingerprint, forget_fingerprint, is_up_to_date, record_fingerprint
+from build_timing import BuildTiming, PhaseTimer, StepClock, format_timing, load_history, record_timing, regressions
+from bytecode_report import analyse_archive, format_bytecode_report, write_report as write_bytecode_report
+from data_staging import link_into_app, stage_data
+from dist_packaging import PACKAGE_FORMATS, PackageReport, format_package_report, package_available, package_artifact
+from exclude_analysis import EXCLUDE_MODES, analyse_excludes, format_report, record_collection
+from launch_benchmark import benchmark_artifact, format_startup_report
+from preflight import check_target, format_preflight_report
+from process_tree import Cancellation, ResourceLimits, ResourceSample
+from size_report import (BINARY_TYPECODES, analyse_bundle, collected_entries, format_size_report, load_report,
+                         write_report)
+from toolchain import discover, interpreter_of, upx_location
+from upx_policy import (UPX_POLICIES, apply_plan, format_decisions, plan_compression, upx_exclude_names,
+                        write_decisions)
+
+
+RESOURCE_LOG_INTERVAL = 10  # Seconds between resource-usage lines in the build log
+
+
+@dataclass
+class BuildOptions:
+    """
+        How a build is run, as opposed to what is built (see :class:`build_engine.BuildTarget`).
+    """
+    incremental: bool = False   # Reuse the target's persistent work directory (build_cache)
+    skip_up_to_date: bool = True    # Do nothing when the artifact already matches the input fingerprint
+    isolated: bool = False  # Private temporary work/spec directories instead of ./build and ./*.spec
+    benchmark_runs: int = 0     # Launch the fresh artifact this many times (cold and warm) after a successful build
+    ready_marker: str = ""  # Stdout text that means "started" for the benchmark; otherwise the app must exit
+    benchmark_timeout: float = 60.0     # Seconds each benchmark launch may take to be ready
+    warm_worker: bool = False   # Run PyInstaller in a long-lived worker with PyInstaller already imported
+    analysis_cache: bool = False    # Reuse hook results and binary dependency scans of the same environment
+    artifact_cache: bool = False    # Copy identical earlier builds out of the artifact cache instead of building
+    memory_limit_mb: int = 0    # Stop PyInstaller when its process tree uses more memory than this (0: no limit)
+    cpu_limit_seconds: float = 0    # ... more CPU time than this (0: no limit)
+    time_limit_seconds: float = 0   # ... runs longer than this (0: no limit)
+
+    def limits(self) -> ResourceLimits:
+        return ResourceLimits(memory_bytes=self.memory_limit_mb * 1024 * 1024 if self.memory_limit_mb else None,
+                              cpu_seconds=self.cpu_limit_seconds or None, wall_seconds=self.time_limit_seconds or None)
+
+
+@dataclass
+class BuildOutcome:
+    """
+        What happened to one build.
+    """
+    exit_code: int
+    skipped: bool = False   # The artifact was already up to date
+    cached: bool = False    # The artifact was restored from the artifact cache
+    cancelled: bool = False
+    fingerprint: str | None = None
+    timing: BuildTiming | None = None   # None for skipped builds
+
+    @property
+    def succeeded(self) -> bool:
+        return self.exit_code == 0
+
+
+def execute_build(target: BuildTarget, options: BuildOptions, log: Callable[[str], object],
+                  cancellation: Cancellation | None = None,
+                  on_resources: Callable[[ResourceSample], object] | None = None) -> BuildOutcome:
+    """
+        Run the complete build of one target, shared by the GUI and the headless tools.
+
+        Steps: pre-flight checks of the inputs and the build environment (see :mod:`preflight`; a failure
+        ends the build before anything else runs), optional exclude analysis, fingerprint and up-to-date
+        check, optional restore from the artifact cache (see :mod:`artifact_cache`), data staging (filtered
+        data folders, see :mod:`data_staging`), work directory set-up (shared ``./build``, private temporary
+        or persistent incremental), PyInstaller itself (sampled, and stopped if it exceeds the options'
+        resource limits), cloning staged data folders into a one-dir app, recording the fingerprint of a
+        successful build, selective UPX compression, one-dir compaction (stripped and deduplicated binaries, see
+        :mod:`app_compaction`), storing the artifact in the artifact cache, packaging it for distribution (see
+        :mod:`dist_packaging`; in the background, overlapping the bundle size and bytecode reports, which are
+        read from the work directory before it is cleaned up) and an optional startup benchmark.
+        Everything is reported through *log*. Every build that runs PyInstaller gets a timing record (its
+        phases, wall/CPU time and peak memory, and the duration of each step here) appended to the
+        target's history in the user cache, and phases that got slower than usual are pointed out.
+
+        Parameters
+        ----------
+        target : BuildTarget
+            What to build. It is not modified; analysis results are applied to a copy.
+        options : BuildOptions
+            How to build it.
+        log : Callable[[str], object]
+            Receives all log text, PyInstaller output included. May be called from this thread only.
+        cancellation : Cancellation | None
+            Lets another thread stop the build; PyInstaller is killed with all of its children and the
+            remaining steps are skipped.
+        on_resources : Callable[[ResourceSample], object] | None
+            Receives the live CPU and memory use of PyInstaller's process tree (from a background thread). The
+            build log gets a resource line every :data:`RESOURCE_LOG_INTERVAL` seconds either way.
+
+        Returns
+        -------
+        BuildOutcome
+            The exit code, whether the build was skipped or cancelled, and its timing record.
+
+        Raises
+        ------
+        ValueError
+            If the target settings are incomplete or invalid.
+    """
+    assemble_command(target)    # Validate the settings before doing any work
+    if target.exclude_mode not in EXCLUDE_MODES:
+        raise ValueError(f"Unknown exclude mode {target.exclude_mode!r}; use one of {', '.join(EXCLUDE_MODES)}.")
+    if target.upx_policy not in UPX_POLICIES:
+        raise ValueError(f"Unknown UPX policy {target.upx_policy!r}; use one of {', '.join(UPX_POLICIES)}.")
+    if min(options.memory_limit_mb, options.cpu_limit_seconds, options.time_limit_seconds) < 0:
+        raise ValueError("Resource limits cannot be negative; use 0 for no limit.")
+    if target.optimize not in range(len(OPTIMIZATION_LEVELS)):
+        raise ValueError(f"Unknown optimization level {target.optimize!r}; use 0 (none), 1 (-O) or 2 (-OO).")
+    if target.package and not package_available(target.package):
+        raise ValueError(f"Cannot package as {target.package!r}; use one of {', '.join(PACKAGE_FORMATS)} "
+                         "(tar.zst needs the zstandard package).")
+
+    clock = StepClock()
+    with clock.step("preflight"):
+        preflight = check_target(target)
+    log(format_preflight_report(preflight))
+    if not preflight.passed:
+        return BuildOutcome(-1)
+
+    target = replace(target, excludes=list(target.excludes), upx_excludes=list(target.upx_excludes))
+    auto_excludes = []
+    if target.exclude_mode != "off":
+        with clock.step("exclude_analysis"):
+            try:
+                report = analyse_excludes(target)
+                apply = target.exclude_mode == "apply"
+                log(format_report(report, applied=apply) + "\n")
+                if apply:
+                    auto_excludes = report.modules
+                    target.excludes.extend(auto_excludes)
+            except (OSError, RuntimeError) as e:
+                log(f"Exclude analysis failed, building without it: {e}\n\n")
+
+    selective_upx = target.upx and target.upx_policy == "selective" and upx_location() is not None
+    if selective_upx and target.onefile:
+        # PyInstaller compresses one-file binaries inside the archive, so it gets the exclusions measured last time
+        with clock.step("upx_plan"):
+            target.upx_excludes.extend(_previous_upx_excludes(target, log))
+
+    with clock.step("fingerprint"):
+        try:
+            fingerprint = compute_fingerprint(target)
+        except (OSError, RuntimeError) as e:
+            log(f"Could not fingerprint the build inputs: {e}\n")
+            fingerprint = None
+
+    if fingerprint and options.skip_up_to_date and is_up_to_date(target, fingerprint):
+        log(f"{target.artifact} is up to date; build skipped.\n")
+        return BuildOutcome(0, skipped=True, fingerprint=fingerprint)
+    if cancellation is not None and cancellation.cancelled:
+        log("Build cancelled.\n")
+        return BuildOutcome(-1, cancelled=True, fingerprint=fingerprint)
+    forget_fingerprint(target)
+
+    key = None
+    if options.artifact_cache and fingerprint:
+        with clock.step("artifact_cache"):
+            try:
+                key = artifact_key(target)
+                if restore_artifact(target, key, log):
+                    record_fingerprint(target, fingerprint)
+                    if target.package:
+                        _finish_packaging(_start_packaging(target), log)
+                    return BuildOutcome(0, cached=True, fingerprint=fingerprint)
+            except (OSError, RuntimeError) as e:
+                log(f"Artifact cache unavailable: {e}\n")
+                key = None
+
+    with clock.step("data_staging"):
+        try:
+            staged = stage_data(target, log)
+        except OSError as e:
+            log(f"Data staging failed: {e}\n")
+            return BuildOutcome(-1, fingerprint=fingerprint)
+    target = replace(target, data_files=staged.data_files)
+
+    scratch = None
+    if options.incremental:
+        # Build inside the target's persistent workspace instead of ./build and ./*.spec
+        workspace = incremental_workspace(target)
+        workpath = workspace / "build"
+        command = assemble_command(target, workpath=str(workpath), specpath=str(workspace))
+    elif options.isolated:
+        scratch = Path(mkdtemp(prefix=f"upb-{target.name}-"))
+        workpath = scratch / "build"
+        command = assemble_command(target, workpath=str(workpath), specpath=str(scratch))
+    else:
+        cleanup_build_artifacts()   # Clean artifacts before build
+        workpath = Path(BUILD_DIRECTORY)
+        command = assemble_command(target)
+
+    try:
+        log("Running command:\n" + format_command(command) + "\n\n")
+        phases = PhaseTimer()
+        latest: list[ResourceSample] = []     # The newest sample, set by the sampling thread
+        logged_at = [0.0]
+
+        def sampled(sample: ResourceSample) -> None:
+            latest[:] = [sample]
+            if on_resources is not None:
+                on_resources(sample)
+
+        def output(line: str) -> None:
+            phases.feed(line)
+            log(line)
+            sample = latest[0] if latest else None
+            if sample is not None and sample.elapsed_seconds - logged_at[0] >= RESOURCE_LOG_INTERVAL:
+                logged_at[0] = sample.elapsed_seconds
+                log(f"[resources] {sample.elapsed_seconds:.0f} s: {sample.describe()}, "
+                    f"{sample.cpu_seconds:.1f} s CPU so far\n")
+
+        timing = BuildTiming(target=target.name, timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"), exit_code=-1,
+                             variant=("onefile" if target.onefile else "onedir") +
+                                     ("+incremental" if options.incremental else ""))
+        with clock.step("pyinstaller"):
+            code = run_pyinstaller(command, output, on_usage=timing.apply_usage, cancellation=cancellation,
+                                   warm=options.warm_worker, limits=options.limits(), on_sample=sampled,
+                                   analysis_cache=options.analysis_cache)
+        if code == 0 and staged.linked and not (cancellation and cancellation.cancelled):
+            with clock.step("data_linking"):
+                try:
+                    link_into_app(staged, target.artifact, log)
+                except OSError as e:
+                    log(f"\nCopying the staged data files into the app failed: {e}\n")
+                    code = -1
+        timing.exit_code, timing.phases = code, phases.finish()
+
+        if cancellation is not None and cancellation.cancelled:
+            log("\nBuild cancelled.\n")
+            return BuildOutcome(code if code else -1, cancelled=True, fingerprint=fingerprint)
+        if code == 0:
+            if fingerprint:
+                record_fingerprint(target, fingerprint)
+            log("\nExecutable built successfully.\n")
+            if selective_upx:
+                with clock.step("selective_upx"):
+                    _selective_upx(target, workpath / target.name, log)
+            if target.compact and not target.onefile:
+                with clock.step("compaction"):    # After UPX, which rewrites binaries in place
+                    try:
+                        compact_app(target, log)
+                    except OSError as e:
+                        log(f"Compaction failed: {e}\n")
+            if key is not None:
+                with clock.step("artifact_store"):
+                    try:
+                        store_artifact(target, key, log)
+                    except OSError as e:
+                        log(f"Could not store the artifact in the cache: {e}\n")
+            # Packaging only reads the finished artifact, so it runs beside the reports; it must follow every step
+            # that changes the artifact and is awaited before the benchmark, which it would slow down
+            packaging = _start_packaging(target) if target.package else None
+            with clock.step("size_report"):
+                _size_report(target, workpath / target.name, log)
+            with clock.step("bytecode_report"):
+                _bytecode_report(target, workpath / target.name, command, log)
+            if target.exclude_mode != "off":
+                try:
+                    record_collection(target, workpath / target.name, auto_excludes)
+                except (OSError, ValueError, SyntaxError) as e:
+                    log(f"\nCould not record the collected modules for the exclude analysis: {e}\n")
+            if packaging is not None:
+                with clock.step("packaging"):   # The part not hidden behind the reports
+                    _finish_packaging(packaging, log)
+            if options.benchmark_runs > 0 and not (cancellation and cancellation.cancelled):
+                with clock.step("benchmark"):
+                    _benchmark(target, options, log)
+        else:
+            log("\nBuild failed. Check the log above for details.\n")
+
+        timing.steps = clock.steps
+        _record_timing(target, command, timing, log)
+        return BuildOutcome(code, fingerprint=fingerprint, timing=timing)
+
+    finally:
+        if scratch is not None:
+            rmtree(scratch, ignore_errors=True)
+        elif not options.incremental:
+            cleanup_build_artifacts()  # Clean up artifacts after build
+
+
+def _record_timing(target: BuildTarget, command: list[str], timing: BuildTiming, log: Callable[[str], object]) -> None:
+    """
+        Log a timing record with any phase that regressed against recent builds, and append it to the history.
+    """
+    try:
+        toolchain = discover(command)
+        timing.python_version, timing.pyinstaller_version = toolchain.python_version, toolchain.pyinstaller_version
+    except RuntimeError:
+        pass
+    log("\n" + format_timing(timing, regressions(timing, load_history(target))))
+    try:
+        record_timing(target, timing)
+    except OSError as e:
+        log(f"Could not store the build timing: {e}\n")
+
+
+def _previous_upx_excludes(target: BuildTarget, log: Callable[[str], object]) -> list[str]:
+    """
+        Return ``--upx-exclude`` patterns from the binaries of the previous build (just the known-bad list without one).
+    """
+    previous = load_report(target)
+    try:
+        decisions = plan_compression(previous.binaries, upx_location(), discover(assemble_command(target)).python) \
+            if previous else []
+    except (OSError, RuntimeError) as e:
+        log(f"Could not measure the previous build's binaries, excluding only known-bad ones from UPX: {e}\n")
+        decisions = []
+    return upx_exclude_names(decisions)
+
+
+def _selective_upx(target: BuildTarget, work_directory: Path, log: Callable[[str], object]) -> None:
+    """
+        Decide per binary whether UPX pays off, record it and compress a one-dir build; never fails the build.
+
+        One-file builds were already compressed by PyInstaller; their decisions are used by the next build.
+        Outside Windows PyInstaller never applies UPX, so the decisions are only recorded there.
+    """
+    try:
+        binaries = [entry for entry in collected_entries(work_directory) if entry.typecode in BINARY_TYPECODES]
+        decisions = plan_compression(binaries, upx_location(), discover(assemble_command(target)).python)
+        path = write_decisions(target, decisions)
+        log("\n" + format_decisions(decisions) + f"  Full list: {path}\n")
+        if not target.onefile and os.name == "nt":
+            saved = apply_plan(target, binaries, decisions, upx_location())
+            log(f"UPX compression of the output folder saved {saved / (1024 * 1024):.2f} MB.\n")
+        elif not target.onefile:
+            log("Like PyInstaller, UPX is only applied on Windows; the decisions above are recorded only.\n")
+    except (OSError, RuntimeError) as e:
+        log(f"\nSelective UPX failed: {e}\n")
+
+
+def _size_report(target: BuildTarget, work_directory: Path, log: Callable[[str], object]) -> None:
+    """
+        Store and log the bundle size breakdown while PyInstaller's TOC files still exist; never fails the build.
+    """
+    try:
+        report = analyse_bundle(target, work_directory)
+        path = write_report(target, report)
+        log("\n" + format_size_report(report) + f"  Full report: {path}\n")
+    except OSError as e:
+        log(f"\nSize report failed: {e}\n")
+
+
+def _bytecode_report(target: BuildTarget, work_directory: Path, command: list[str],
+                     log: Callable[[str], object]) -> None:
+    """
+        Log the size and load time of the module archive against earlier builds at other optimization levels.
+    """
+    try:
+        python = interpreter_of(command)
+        report = analyse_archive(target, work_directory, str(python) if python else None)
+        path = write_bytecode_report(target, report)
+        log("\n" + format_bytecode_report(report) + f"  Full report: {path}\n")
+    except OSError as e:
+        log(f"\nBytecode report failed: {e}\n")
+
+
+def _start_packaging(target: BuildTarget) -> Future[PackageReport]:
+    """
+        Start packaging a fresh artifact on a background thread.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upb-package")
+    future = executor.submit(package_artifact, target, target.package)
+    executor.shutdown(wait=False)   # The thread ends with the task
+    return future
+
+
+def _finish_packaging(packaging: Future[PackageReport], log: Callable[[str], object]) -> None:
+    """
+        Wait for the packaging started by :func:`_start_packaging` and log it; failing packaging never fails the build.
+    """
+    try:
+        log("\n" + format_package_report(packaging.result()))
+    except Exception as e:  # Compressor errors (zstandard.ZstdError, ...) included: the app itself is built
+        log(f"\nPackaging failed: {e}\n")
+
+
+def _benchmark(target: BuildTarget, options: BuildOptions, log: Callable[[str], object]) -> None:
+    """
+        Run the startup benchmark on a fresh artifact; a failing benchmark never fails the build.
+    """
+    log(f"\nBenchmarking startup ({options.benchmark_runs} cold and {options.benchmark_runs} warm launches)...\n")
+    try:
+        log(format_startup_report(benchmark_artifact(target, options.benchmark_runs, options.ready_marker,
+                                                    options.benchmark_timeout)))
+    except OSError as e:
+        log(f"Startup benchmark failed: {e}\n")
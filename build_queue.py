@@ -0,0 +1,177 @@
+import time
+
+from dataclasses import dataclass, field, replace
+from itertools import count
+from pathlib import Path
+from threading import Lock, Thread
+
+from build_engine import BuildTarget
+from build_pipeline import BuildOptions, BuildOutcome, execute_build
+from build_timing import PhaseTimer
+from log_sink import LogSink, prune_logs
+from process_tree import Cancellation, ResourceSample
+
+
+JOB_STATES = ("queued", "running", "succeeded", "failed", "skipped", "cancelled")
+FINISHED_STATES = ("succeeded", "failed", "skipped", "cancelled")
+
+
+@dataclass(eq=False)
+class BuildJob:
+    """
+        One queued build with its own log, progress and cancellation.
+
+        ``state`` and ``progress`` are written by the job's thread and may be read from any thread.
+    """
+    number: int
+    target: BuildTarget
+    options: BuildOptions
+    log: LogSink = field(default_factory=LogSink)
+    cancellation: Cancellation = field(default_factory=Cancellation)
+    state: str = "queued"
+    progress: str = "waiting"   # The PyInstaller phase while running, a short result afterwards
+    resources: ResourceSample | None = None     # Latest CPU and memory use of PyInstaller while it runs
+    outcome: BuildOutcome | None = None
+    error: str = ""     # Exception text when the build could not run at all
+    started: float | None = None
+    finished: float | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    @property
+    def seconds(self) -> float:
+        """
+            How long the job has been running (or ran).
+        """
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+
+class BuildQueue:
+    """
+        Run builds concurrently, at most ``concurrency`` at a time, in submission order.
+
+        Every job gets private temporary ``--workpath``/``--specpath`` directories (or its target's own
+        incremental workspace), so jobs never share ``./build`` or ``./*.spec``. A job waits while another
+        job that writes the same artifact is running. Each job streams its log to its own file in
+        *log_directory*.
+    """
+
+    def __init__(self, log_directory: Path, concurrency: int = 1, logs_kept: int = 20):
+        self.log_directory = log_directory
+        self.logs_kept = logs_kept
+        self.jobs: list[BuildJob] = []
+        self._concurrency = max(1, concurrency)
+        self._lock = Lock()
+        self._numbers = count(1)
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    @concurrency.setter
+    def concurrency(self, value: int) -> None:
+        self._concurrency = max(1, value)
+        self._dispatch()
+
+    def submit(self, target: BuildTarget, options: BuildOptions) -> BuildJob:
+        """
+            Queue a build and start it as soon as a slot is free.
+        """
+        options = replace(options, isolated=not options.incremental)
+        job = BuildJob(number=next(self._numbers), target=target, options=options)
+        with self._lock:
+            self.jobs.append(job)
+        self._dispatch()
+        return job
+
+    def cancel(self, job: BuildJob) -> None:
+        """
+            Cancel a job: a queued job never starts, a running one has its whole process tree killed.
+        """
+        with self._lock:
+            if job.state == "queued":
+                job.state, job.progress = "cancelled", "cancelled"
+                return
+        if job.state == "running":
+            job.progress = "cancelling"
+            job.cancellation.cancel()
+
+    def cancel_all(self) -> None:
+        for job in list(self.jobs):
+            self.cancel(job)
+
+    def clear_finished(self, keep: int = 0) -> None:
+        """
+            Forget finished jobs except the *keep* most recently submitted (their log files stay on disk).
+        """
+        with self._lock:
+            finished = [job for job in self.jobs if job.done]
+            forgotten = set(finished[:len(finished) - keep]) if keep else set(finished)
+            self.jobs = [job for job in self.jobs if job not in forgotten]
+
+    @property
+    def running(self) -> list[BuildJob]:
+        return [job for job in self.jobs if job.state == "running"]
+
+    def _dispatch(self) -> None:
+        """
+            Start queued jobs while there are free slots and their artifacts are not being built.
+        """
+        with self._lock:
+            running = self.running
+            for job in self.jobs:
+                if len(running) >= self._concurrency:
+                    break
+                if job.state != "queued":
+                    continue
+                artifact = job.target.artifact.resolve()
+                if any(other.target.artifact.resolve() == artifact for other in running):
+                    continue
+                job.state, job.started = "running", time.perf_counter()
+                running.append(job)
+                Thread(target=self._run, args=(job,), daemon=True, name=f"build-{job.number}").start()
+
+    def _run(self, job: BuildJob) -> None:
+        """
+            Build one job in its own thread, then hand the slot to the next queued job.
+        """
+        self.log_directory.mkdir(parents=True, exist_ok=True)
+        job.log.open_file(self.log_directory / f"{job.target.name}-{time.strftime('%Y%m%d-%H%M%S')}-{job.number}.log")
+        prune_logs(self.log_directory, self.logs_kept)
+        job.log.write(f"Full log: {job.log.log_path}\n")
+        phases = PhaseTimer()
+
+        def output(text: str) -> None:
+            """
+                Log a line and follow PyInstaller's progress through its phases.
+            """
+            job.log.write(text)
+            phases.feed(text)
+            if phases.phase and not job.cancellation.cancelled:
+                job.progress = phases.phase
+
+        try:
+            job.progress = "preparing"
+            job.outcome = execute_build(job.target, job.options, output, job.cancellation,
+                                        on_resources=lambda sample: setattr(job, "resources", sample))
+            if job.outcome.cancelled:
+                job.state = "cancelled"
+            elif job.outcome.skipped:
+                job.state = "skipped"
+            else:
+                job.state = "succeeded" if job.outcome.succeeded else "failed"
+        except Exception as e:
+            job.error = str(e)
+            job.log.write(f"\nBuild failed: {e}\n")
+            job.state = "failed"
+        finally:
+            job.progress = "from cache" if job.outcome and job.outcome.cached else \
+                {"skipped": "up to date"}.get(job.state, job.state)
+            job.resources = None
+            job.finished = time.perf_counter()
+            job.log.close_file()
+            self._dispatch()
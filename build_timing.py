@@ -0,0 +1,216 @@
+import hashlib, json, os, re, statistics, time
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Iterator
+
+from build_cache import cache_directory
+from build_engine import BuildTarget
+from process_tree import ProcessUsage
+
+
+TIMINGS_DIRECTORY = "timings"
+HISTORY_KEPT = 200  # Records kept per target
+BASELINE_RUNS = 5   # Previous successful builds a new build is compared with
+REGRESSION_FACTOR = 1.25    # A phase this much slower than its baseline median is reported...
+REGRESSION_MINIMUM = 0.5    # ...if it also lost at least this many seconds
+
+# PyInstaller log messages that start a phase (PyInstaller prefixes each line with milliseconds since its start)
+PHASE_MARKERS = (
+    ("analysis", ("checking Analysis",)),
+    ("module_graph", ("Initializing module dependency graph", "Reusing cached module dependency graph")),
+    ("hooks", ("Processing module hooks (post-graph stage)",)),
+    ("binaries", ("Performing binary vs. data reclassification", "Looking for ctypes DLLs")),
+    ("pyz", ("checking PYZ",)),
+    ("pkg", ("checking PKG",)),
+    ("exe", ("checking EXE",)),
+    ("collect", ("checking COLLECT",)),
+    ("finish", ("Build complete!",)),
+)
+_LOG_LINE = re.compile(r"^(\d+) (?:TRACE|DEBUG|INFO|WARNING|DEPRECATION|ERROR|CRITICAL|FATAL): (.*)")
+
+_lock = Lock()
+
+
+class PhaseTimer:
+    """
+        Split a PyInstaller run into phases by watching its log output.
+
+        Feed every output line to :meth:`feed`; :meth:`finish` returns seconds per phase. The time of
+        lines before Analysis is ``startup``; repeated phases (several Analysis/EXE blocks) add up. UPX
+        runs inside the PKG/EXE/COLLECT phases, so ``upx`` overlaps them and is reported on its own.
+    """
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self._current = "startup"
+        self._since = 0
+        self._last = 0
+        self._upx_since: int | None = None
+        self._started = False
+
+    @property
+    def phase(self) -> str | None:
+        """
+            The phase PyInstaller is in, or ``None`` before its first log line.
+        """
+        return self._current if self._started else None
+
+    def _add(self, phase: str, milliseconds: int) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + milliseconds / 1000
+
+    def feed(self, line: str) -> None:
+        match = _LOG_LINE.match(line)
+        if not match:
+            return
+        now, message = int(match.group(1)), match.group(2)
+        self._last, self._started = now, True
+
+        if self._upx_since is not None:
+            self._add("upx", now - self._upx_since)
+            self._upx_since = None
+        if message.startswith("Executing: ") and Path(message.split()[1]).stem.lower() == "upx":
+            self._upx_since = now
+
+        for phase, markers in PHASE_MARKERS:
+            if message.startswith(markers):
+                self._add(self._current, now - self._since)
+                self._current, self._since = phase, now
+                break
+
+    def finish(self) -> dict[str, float]:
+        """
+            Close the running phase at the last timestamp seen and return seconds per phase.
+        """
+        if self._current != "finish":
+            self._add(self._current, self._last - self._since)
+            self._current, self._since = "finish", self._last
+        return {phase: round(seconds, 3) for phase, seconds in self.phases.items() if phase != "finish"}
+
+
+@dataclass
+class BuildTiming:
+    """
+        Timing record of one build, as kept in the target's history.
+    """
+    target: str
+    timestamp: str
+    exit_code: int
+    variant: str    # "onefile"/"onedir", plus "+incremental", so only comparable builds are compared
+    python_version: str | None = None
+    pyinstaller_version: str | None = None
+    wall_seconds: float | None = None   # The PyInstaller process tree
+    cpu_seconds: float | None = None
+    peak_rss_bytes: int | None = None
+    phases: dict[str, float] = field(default_factory=dict)  # PyInstaller phases (see PHASE_MARKERS)
+    steps: dict[str, float] = field(default_factory=dict)   # Builder steps around PyInstaller
+
+    def apply_usage(self, usage: ProcessUsage) -> None:
+        self.wall_seconds = round(usage.wall_seconds, 3)
+        self.cpu_seconds = round(usage.cpu_seconds, 3) if usage.cpu_seconds is not None else None
+        self.peak_rss_bytes = usage.peak_rss_bytes
+
+
+class StepClock:
+    """
+        Accumulate the duration of named builder steps: ``with clock.step("fingerprint"): ...``.
+    """
+
+    def __init__(self):
+        self.steps: dict[str, float] = {}
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.steps[name] = round(self.steps.get(name, 0.0) + elapsed, 3)
+
+
+def history_file(target: BuildTarget) -> Path:
+    """
+        Return the timing history of a target: ``timings/<name>-<entry hash>.jsonl`` in the user cache.
+    """
+    entry = hashlib.sha256(str(Path(target.entry_point).resolve()).encode("utf-8")).hexdigest()[:12]
+    return cache_directory() / TIMINGS_DIRECTORY / f"{target.name}-{entry}.jsonl"
+
+
+def load_history(target: BuildTarget) -> list[BuildTiming]:
+    """
+        Return the recorded builds of a target, oldest first (unreadable lines are skipped).
+    """
+    records = []
+    try:
+        lines = history_file(target).read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return records
+    for line in lines:
+        try:
+            records.append(BuildTiming(**json.loads(line)))
+        except (ValueError, TypeError):
+            continue
+    return records
+
+
+def record_timing(target: BuildTarget, timing: BuildTiming) -> None:
+    """
+        Append a record to the target's history, keeping the most recent :data:`HISTORY_KEPT`.
+    """
+    path = history_file(target)
+    with _lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [json.dumps(asdict(record)) for record in load_history(target)[-(HISTORY_KEPT - 1):]]
+        lines.append(json.dumps(asdict(timing)))
+        temporary = path.with_name(path.name + f".{os.getpid()}.tmp")
+        temporary.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        temporary.replace(path)
+
+
+def regressions(timing: BuildTiming, history: list[BuildTiming]) -> list[tuple[str, float, float]]:
+    """
+        Compare a build with the median of the last successful comparable builds.
+
+        Returns ``(phase or step, seconds now, baseline median)`` for everything that got slower by more
+        than :data:`REGRESSION_FACTOR` and :data:`REGRESSION_MINIMUM` seconds.
+    """
+    baseline = [record for record in history if record.exit_code == 0 and record.variant == timing.variant]
+    baseline = baseline[-BASELINE_RUNS:]
+    if not baseline:
+        return []
+
+    slower = []
+    for name, seconds in {**timing.phases, **timing.steps}.items():
+        previous = [record.phases.get(name, record.steps.get(name)) for record in baseline]
+        previous = [value for value in previous if value is not None]
+        if not previous:
+            continue
+        median = statistics.median(previous)
+        if seconds > median * REGRESSION_FACTOR and seconds - median >= REGRESSION_MINIMUM:
+            slower.append((name, seconds, median))
+    return slower
+
+
+def format_timing(timing: BuildTiming, slower: list[tuple[str, float, float]]) -> str:
+    """
+        Render a record (and any regressions) for the build log.
+    """
+    usage = []
+    if timing.wall_seconds is not None:
+        usage.append(f"{timing.wall_seconds:.1f} s wall")
+    if timing.cpu_seconds is not None:
+        usage.append(f"{timing.cpu_seconds:.1f} s CPU")
+    if timing.peak_rss_bytes:
+        usage.append(f"peak {timing.peak_rss_bytes / (1024 * 1024):.0f} MB")
+    lines = [f"Build timing: {', '.join(usage) or 'no process statistics'}."]
+    if timing.phases:
+        lines.append("  PyInstaller: " + ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in
+                                                   timing.phases.items()))
+    if timing.steps:
+        lines.append("  Builder: " + ", ".join(f"{step} {seconds:.2f} s" for step, seconds in timing.steps.items()))
+    for name, seconds, median in slower:
+        lines.append(f"  Slower than usual: {name} took {seconds:.2f} s (median of recent builds {median:.2f} s)")
+    return "\n".join(lines) + "\n"
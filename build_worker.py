@@ -0,0 +1,254 @@
+import atexit, hashlib, json, os, subprocess, time, uuid
+
+from threading import Lock
+from typing import Callable
+
+from analysis_cache import CACHE_SHIM
+from process_tree import (Cancellation, ProcessUsage, ResourceLimits, ResourceSample, TreeSampler, kill_tree,
+                          new_process_group_flags)
+from toolchain import interpreter_of
+
+
+BUILDS_PER_WORKER = 20  # A worker is replaced after this many builds, which bounds its memory
+IDLE_WORKERS_KEPT = 4   # Idle workers kept per interpreter and environment; extra ones are closed
+
+# The worker: imports PyInstaller once, then runs one build per JSON request read from stdin. Where fork() exists
+# every build runs in a forked child (a fresh copy of the warm interpreter, so builds cannot leak state into each
+# other), and between builds the worker primes PyInstaller's own cache of the base module graph for the excludes
+# and folder of the last build. Elsewhere builds run in the worker itself, which PyInstaller supports for repeated
+# runs (its test-suite does the same). Build output goes to stdout; the marker line closes each build. Builds whose
+# environment names an analysis cache file use it (see analysis_cache).
+_WORKER = CACHE_SHIM + (
+    "import json, logging, os, sys, time, traceback\n"
+    "import PyInstaller.__main__, PyInstaller.building.build_main, PyInstaller.building.makespec\n"
+    "from PyInstaller.depend import analysis\n"
+    "DONE, FORK, primed = sys.argv[1], hasattr(os, 'fork'), None\n"
+    "def enter(job):\n"
+    "    os.chdir(job['cwd'])\n"
+    "    sys.path[0] = job['cwd']\n"
+    "    global primed\n"
+    "    if primed != [job['excludes'], job['cwd']]:\n"
+    "        analysis._cached_module_graph_ = None\n"
+    "    primed = [job['excludes'], job['cwd']]\n"
+    "def build(job):\n"
+    "    os.environ.clear(); os.environ.update(job['env'])\n"
+    "    logging._startTime = time.time()\n"
+    "    _upb_cache_begin()\n"
+    "    try:\n"
+    "        PyInstaller.__main__.run(job['args'])\n"
+    "        return 0\n"
+    "    except SystemExit as e:\n"
+    "        if e.code is None or isinstance(e.code, int):\n"
+    "            return e.code or 0\n"
+    "        print(e.code, file=sys.stderr); return 1\n"
+    "    except BaseException:\n"
+    "        traceback.print_exc(); return 1\n"
+    "    finally:\n"
+    "        _upb_cache_end()\n"
+    "        sys.stdout.flush(); sys.stderr.flush()\n"
+    "def prime(job):\n"
+    "    global primed\n"
+    "    if analysis._cached_module_graph_ is not None:\n"
+    "        return\n"
+    "    saved, null = (os.dup(1), os.dup(2)), os.open(os.devnull, os.O_WRONLY)\n"
+    "    os.dup2(null, 1); os.dup2(null, 2)\n"
+    "    try:\n"
+    "        analysis.initialize_modgraph(excludes=list(job['excludes']))\n"
+    "    except Exception:\n"
+    "        analysis._cached_module_graph_, primed = None, None\n"
+    "    finally:\n"
+    "        sys.stdout.flush(); sys.stderr.flush()\n"
+    "        os.dup2(saved[0], 1); os.dup2(saved[1], 2)\n"
+    "        for fd in (*saved, null): os.close(fd)\n"
+    "for line in sys.stdin:\n"
+    "    job = json.loads(line)\n"
+    "    enter(job)\n"
+    "    cpu, peak = None, None\n"
+    "    if FORK:\n"
+    "        sys.stdout.flush(); sys.stderr.flush()\n"
+    "        pid = os.fork()\n"
+    "        if pid == 0:\n"
+    "            os.dup2(os.open(os.devnull, os.O_RDONLY), 0)\n"
+    "            os._exit(build(job))\n"
+    "        _, status, usage = os.wait4(pid, 0)\n"
+    "        code = os.waitstatus_to_exitcode(status)\n"
+    "        cpu = usage.ru_utime + usage.ru_stime\n"
+    "        peak = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)\n"
+    "    else:\n"
+    "        environment, started = dict(os.environ), time.process_time()\n"
+    "        code = build(job)\n"
+    "        cpu = time.process_time() - started\n"
+    "        os.environ.clear(); os.environ.update(environment)\n"
+    "    report = {'exit_code': code, 'cpu_seconds': cpu, 'peak_rss_bytes': peak}\n"
+    "    sys.stdout.write(DONE + ' ' + json.dumps(report) + '\\n')\n"
+    "    sys.stdout.flush()\n"
+    "    if FORK:\n"
+    "        prime(job)\n"
+)
+
+
+class BuildWorker:
+    """
+        One long-lived ``python -c <worker>`` process of a build interpreter with PyInstaller already imported.
+
+        Runs one build at a time. The worker is started in its own process group, so cancelling a build kills it
+        together with the build it is running; a killed or crashed worker is simply not reused.
+    """
+
+    def __init__(self, python: str, env: dict[str, str]):
+        self.marker = f"UPB-WORKER-DONE-{uuid.uuid4().hex}"   # Cannot appear in build output by accident
+        self.builds = 0
+        self.process = subprocess.Popen([python, "-c", _WORKER, self.marker], stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env,
+                                        **new_process_group_flags())
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def build(self, args: list[str], env: dict[str, str], on_output: Callable[[str], object],
+              cancellation: Cancellation | None = None, limits: ResourceLimits | None = None,
+              on_sample: Callable[[ResourceSample], object] | None = None) -> tuple[int, ProcessUsage]:
+        """
+            Run PyInstaller with *args* in the current folder and stream its output to *on_output*.
+
+            Returns the exit code and the usage of the build (wall time measured here; CPU time and peak
+            memory as reported by the worker). The worker is sampled while it builds; exceeding *limits*
+            kills it (a replacement is started for the next build).
+        """
+        self.builds += 1
+        started = time.perf_counter()
+        sampler = TreeSampler(self.process.pid, limits=limits, on_sample=on_sample,
+                              on_exceeded=lambda _: kill_tree(self.process))
+        if cancellation is not None:
+            cancellation.attach(self.process)
+        excludes = [value for option, value in zip(args, args[1:]) if option == "--exclude-module"]
+        request = {"args": args, "cwd": os.getcwd(), "env": env, "excludes": excludes}
+        result = None
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+            for line in self.process.stdout:
+                if self.marker in line:
+                    output, _, report = line.partition(self.marker)
+                    if output:
+                        on_output(output)
+                    result = json.loads(report)
+                    break
+                on_output(line)
+        except (OSError, ValueError):
+            pass    # The worker died (or was killed); reported below
+        except BaseException:
+            kill_tree(self.process)  # Nobody reads its output any more
+            raise
+        finally:
+            sampler.stop()
+            if cancellation is not None:
+                cancellation.detach()
+        wall = time.perf_counter() - started
+
+        if result is None:
+            kill_tree(self.process)
+            code = self.process.wait()
+            if sampler.exceeded:
+                on_output(f"\nBuild stopped: {sampler.exceeded}.\n")
+            elif not (cancellation and cancellation.cancelled):
+                on_output(f"\nThe build worker exited unexpectedly (exit code {code}).\n")
+            return code or -1, ProcessUsage(wall_seconds=wall, cpu_seconds=None, peak_rss_bytes=None,
+                                            limit_exceeded=sampler.exceeded)
+        return result["exit_code"], ProcessUsage(wall_seconds=wall, cpu_seconds=result["cpu_seconds"],
+                                                 peak_rss_bytes=result["peak_rss_bytes"])
+
+    def close(self) -> None:
+        """
+            Let the worker finish (it exits when its input closes); kill it if it does not.
+        """
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            kill_tree(self.process)
+
+
+_lock = Lock()
+_idle: dict[str, list[BuildWorker]] = {}    # interpreter + environment digest -> idle workers
+
+
+def _pool_key(python: str, env: dict[str, str]) -> str:
+    """
+        Workers are shared by builds with the same interpreter and environment (PyInstaller reads some of it on import).
+    """
+    return python + "|" + hashlib.sha256(json.dumps(sorted(env.items())).encode("utf-8")).hexdigest()
+
+
+def _acquire(python: str, env: dict[str, str]) -> BuildWorker:
+    with _lock:
+        idle = _idle.get(_pool_key(python, env), [])
+        while idle:
+            worker = idle.pop()
+            if worker.alive:
+                return worker
+    return BuildWorker(python, env)
+
+
+def _release(python: str, env: dict[str, str], worker: BuildWorker) -> None:
+    """
+        Return a worker to the pool, replacing it with a fresh one (which warms up while idle) once it is used up.
+    """
+    if not worker.alive:
+        return
+    if worker.builds >= BUILDS_PER_WORKER:
+        worker.close()
+        worker = BuildWorker(python, env)
+    with _lock:
+        idle = _idle.setdefault(_pool_key(python, env), [])
+        if len(idle) < IDLE_WORKERS_KEPT:
+            idle.append(worker)
+            return
+    worker.close()
+
+
+def supports_worker(command: list[str]) -> bool:
+    """
+        Return whether *command* can run in a warm worker (a ``python -m PyInstaller`` command).
+    """
+    return interpreter_of(command) is not None
+
+
+def run_in_worker(command: list[str], on_output: Callable[[str], object], env: dict[str, str],
+                  on_usage: Callable[[ProcessUsage], object] | None = None,
+                  cancellation: Cancellation | None = None, limits: ResourceLimits | None = None,
+                  on_sample: Callable[[ResourceSample], object] | None = None) -> int:
+    """
+        Run a ``python -m PyInstaller`` command in a warm worker; see :func:`build_engine.run_pyinstaller`.
+
+        The first build of an interpreter starts its worker; later builds skip interpreter start-up and
+        PyInstaller's imports, and (where fork() exists) rebuilds with the same excludes reuse the base module
+        graph the worker prepared after the previous build.
+
+        Returns
+        -------
+        int
+            PyInstaller's exit code.
+    """
+    python = command[0]
+    worker = _acquire(python, env)
+    try:
+        code, usage = worker.build(command[3:], env, on_output, cancellation, limits, on_sample)
+    finally:
+        _release(python, env, worker)
+    if on_usage is not None:
+        on_usage(usage)
+    return code
+
+
+@atexit.register
+def close_workers() -> None:
+    """
+        Close every idle worker (called at exit).
+    """
+    with _lock:
+        workers = [worker for idle in _idle.values() for worker in idle]
+        _idle.clear()
+    for worker in workers:
+        worker.close()
@@ -0,0 +1,139 @@
+import hashlib, json, os, shutil, subprocess, time
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from build_cache import cache_directory
+from build_engine import OPTIMIZATION_LEVELS, BuildTarget
+
+
+BYTECODE_REPORT_SUFFIX = ".bytecode.json"
+ARCHIVES_DIRECTORY = "bytecode"
+PYZ_FILE = "PYZ-00.pyz"
+LOAD_ROUNDS = 9     # Passes over each archive; the fastest one is reported (the least disturbed)
+
+# Decompress and unmarshal every module of each PYZ archive the way the frozen app's importer does, in the build
+# interpreter (the bytecode format belongs to its Python version), without running any module code. Archives take
+# turns, so they are compared under the same conditions.
+_LOAD_PROBE = (
+    "import json, sys, time\n"
+    "from PyInstaller.loader.pyimod01_archive import ZlibArchiveReader\n"
+    "rounds, archives = int(sys.argv[1]), [ZlibArchiveReader(path) for path in sys.argv[2:]]\n"
+    "best = [None] * len(archives)\n"
+    "for _ in range(rounds):\n"
+    "    for index, archive in enumerate(archives):\n"
+    "        started = time.perf_counter()\n"
+    "        for name in archive.toc:\n"
+    "            archive.extract(name)\n"
+    "        elapsed = (time.perf_counter() - started) * 1000\n"
+    "        best[index] = elapsed if best[index] is None else min(best[index], elapsed)\n"
+    "print(json.dumps([[len(archive.toc), milliseconds] for archive, milliseconds in zip(archives, best)]))\n"
+)
+
+
+@dataclass
+class ArchiveMeasurement:
+    """
+        The Python-module archive (PYZ) of the latest build at one optimization level.
+    """
+    level: int
+    pyz_bytes: int
+    modules: int | None = None
+    load_ms: float | None = None    # Decompressing and unmarshalling every module once (None if not measured)
+
+
+@dataclass
+class BytecodeReport:
+    """
+        The archive of a build, measured side by side with the latest archives built at the other levels.
+    """
+    target: str
+    timestamp: str
+    level: int  # The level of this build
+    archives: list[ArchiveMeasurement] = field(default_factory=list)
+
+    def archive(self, level: int) -> ArchiveMeasurement | None:
+        return next((archive for archive in self.archives if archive.level == level), None)
+
+
+def archive_copy(target: BuildTarget, level: int) -> Path:
+    """
+        Return where the latest archive of a target at *level* is kept for comparisons (in the user cache).
+    """
+    entry = hashlib.sha256(str(Path(target.entry_point).resolve()).encode("utf-8")).hexdigest()[:12]
+    return cache_directory() / ARCHIVES_DIRECTORY / f"{target.name}-{entry}" / f"level-{level}.pyz"
+
+
+def _load_times(python: str, archives: list[Path]) -> list[list] | None:
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    try:
+        output = subprocess.run([python, "-c", _LOAD_PROBE, str(LOAD_ROUNDS), *map(str, archives)],
+                                capture_output=True, text=True, timeout=300, creationflags=creationflags).stdout
+        return json.loads(output)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+def analyse_archive(target: BuildTarget, work_directory: Path, python: str | None) -> BytecodeReport:
+    """
+        Keep the PYZ archive PyInstaller left in *work_directory* and measure it against the other levels.
+
+        Load times are only measured when *python* (the build interpreter) is known.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the work directory has no PYZ archive.
+    """
+    copy = archive_copy(target, target.optimize)
+    copy.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(work_directory / PYZ_FILE, copy)
+
+    levels = [level for level in range(len(OPTIMIZATION_LEVELS)) if archive_copy(target, level).is_file()]
+    archives = [archive_copy(target, level) for level in levels]
+    times = _load_times(python, archives) if python else None
+    report = BytecodeReport(target=target.name, timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"), level=target.optimize)
+    for index, (level, path) in enumerate(zip(levels, archives)):
+        measurement = ArchiveMeasurement(level=level, pyz_bytes=path.stat().st_size)
+        if times and len(times) == len(archives):
+            measurement.modules, measurement.load_ms = times[index][0], round(times[index][1], 2)
+        report.archives.append(measurement)
+    return report
+
+
+def report_path(target: BuildTarget) -> Path:
+    """
+        Return where the bytecode report of a target is stored (``<output>/<name>.bytecode.json``).
+    """
+    return Path(target.output_directory) / f"{target.name}{BYTECODE_REPORT_SUFFIX}"
+
+
+def write_report(target: BuildTarget, report: BytecodeReport) -> Path:
+    """
+        Store a report next to the artifact and return its path.
+    """
+    path = report_path(target)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    return path
+
+
+def format_bytecode_report(report: BytecodeReport) -> str:
+    """
+        Render the archive of the build and its size and load-time difference to the other levels.
+    """
+    built = report.archive(report.level)
+    load = f", {built.load_ms:.1f} ms to load its {built.modules} modules" if built.load_ms is not None else ""
+    lines = [f"Bytecode optimization {OPTIMIZATION_LEVELS[report.level]}: PYZ {built.pyz_bytes / (1024 * 1024):.2f} "
+             f"MB{load}."]
+    for other in report.archives:
+        if other is built:
+            continue
+        size = (built.pyz_bytes - other.pyz_bytes) / max(other.pyz_bytes, 1) * 100
+        line = f"  vs latest {OPTIMIZATION_LEVELS[other.level]} build: size {size:+.1f}%"
+        if built.load_ms is not None and other.load_ms is not None:
+            line += f", load time {built.load_ms - other.load_ms:+.1f} ms"
+        lines.append(line)
+    if len(report.archives) == 1:
+        lines.append("  Build at another optimization level to compare.")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,231 @@
+import hashlib, json, os, shutil, stat, sys, threading, time
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from build_cache import cache_directory
+from build_engine import BuildTarget, parse_data_specification
+from build_fingerprint import file_digest, save_digests
+
+
+STAGING_DIRECTORY = "staging"
+OBJECTS_DIRECTORY = "objects"   # Content-addressed copies of staged files, shared by all targets
+TREES_DIRECTORY = "trees"   # Per-entry folders of hard links to objects (what keeps an object in use)
+TREE_MANIFEST = ".upb-staging.json"     # relative path -> digest of what a staged folder holds
+PRUNE_INTERVAL = 24 * 3600  # Seconds between sweeps of unreferenced objects
+PRUNE_AGE = 3600    # An object unreferenced for this long is removed (younger ones may be about to be linked)
+FICLONE = 0x40049409    # Linux ioctl that makes a copy-on-write clone (btrfs, XFS, ...)
+
+
+@dataclass
+class StagedData:
+    """
+        The data of a build after staging.
+
+        ``data_files`` replace the target's specifications for PyInstaller; ``linked`` folders are left out
+        of PyInstaller and cloned into a one-dir app afterwards (see :func:`link_into_app`).
+    """
+    data_files: list[str] = field(default_factory=list)
+    linked: list[tuple[str, dict[str, str]]] = field(default_factory=list)  # (destination, {relative path: digest})
+    files: int = 0
+    bytes: int = 0
+    stored_bytes: int = 0   # Bytes cloned or copied into the object store by this staging (new content)
+    duplicates: int = 0     # Selected files whose content another selected file already has
+
+
+def _clone(source: Path, destination: Path) -> None:
+    """
+        Copy a file as a copy-on-write clone where the file system supports it, else byte for byte.
+    """
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        try:
+            with open(source, "rb") as reader, open(destination, "wb") as writer:
+                fcntl.ioctl(writer.fileno(), FICLONE, reader.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source, destination)
+
+
+def _link(source: Path, destination: Path) -> None:
+    """
+        Hard-link *destination* to *source*; clone or copy it where hard links are impossible (other volume).
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        _clone(source, destination)
+
+
+def _unlink(path: Path) -> None:
+    """
+        Remove *path* if it exists, read-only or not (Windows refuses to delete read-only files).
+    """
+    try:
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+    except FileNotFoundError:
+        return
+    path.unlink(missing_ok=True)
+
+
+def _object(digest: str) -> Path:
+    return cache_directory() / STAGING_DIRECTORY / OBJECTS_DIRECTORY / digest[:2] / digest
+
+
+def _store(path: Path, digest: str) -> int:
+    """
+        Put the content of *path* in the object store unless it is there already; return the bytes stored.
+
+        Objects stay writable, since a staged folder's hard links share their attributes and must be removable
+        when a file changes. Nothing writes through those links: PyInstaller copies from staged folders and apps
+        get clones (see :func:`link_into_app`), and an object is only reused when its digest matches.
+    """
+    target = _object(digest)
+    if target.is_file():
+        return 0
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_name(f"{digest}.{os.getpid()}-{threading.get_ident()}.tmp")
+    _clone(path, temporary)
+    os.replace(temporary, target)
+    return target.stat().st_size
+
+
+def _sync_tree(folder: Path, files: dict[str, str]) -> None:
+    """
+        Make *folder* hold exactly *files* (relative path -> digest) as links to objects, touching only changes.
+    """
+    manifest_path = folder / TREE_MANIFEST
+    try:
+        current = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        shutil.rmtree(folder, ignore_errors=True)   # Unknown state: start over
+        current = {}
+    folder.mkdir(parents=True, exist_ok=True)
+    manifest_path.unlink(missing_ok=True)   # Rewritten once the folder is complete
+
+    for relative in set(current) - set(files):
+        _unlink(folder / relative)
+    for relative, digest in files.items():
+        path = folder / relative
+        if current.get(relative) == digest and path.is_file():
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _unlink(path)   # Objects staged by earlier versions may still be read-only
+        _link(_object(digest), path)
+    for directory in sorted((path for path in folder.rglob("*") if path.is_dir()), reverse=True):
+        if not any(directory.iterdir()):
+            directory.rmdir()
+    manifest_path.write_text(json.dumps(files), encoding="utf-8")
+
+
+def stage_data(target: BuildTarget, log: Callable[[str], object]) -> StagedData:
+    """
+        Stage the data folders of *target* that need it and return the data to build with.
+
+        A folder is staged when it has include/exclude filters, or for every folder when the target sets
+        ``stage_data``; version-control folders and caches (``build_engine.DEFAULT_DATA_EXCLUDES``) are
+        dropped from staged folders. The selected files are hashed (digests are cached by size and
+        modification time, so unchanged files are not read again) and their contents put once into an
+        object store in the user cache: cloned copy-on-write where the file system can, copied otherwise,
+        and skipped when the store already has that content. Files with the same content share one object.
+
+        Every staged entry gets a folder of hard links to its objects in the staging area. One-file builds
+        hand that folder to PyInstaller instead of the source folder. One-dir builds leave staged folders
+        out of PyInstaller, which would copy every file again on every build, and clone them into the app
+        folder afterwards.
+
+        Raises
+        ------
+        OSError
+            If a data file cannot be read or staged.
+    """
+    staged, seen = StagedData(), set()
+    for specification in target.data_files:
+        entry = parse_data_specification(specification)
+        if not entry.staged(target):
+            staged.data_files.append(specification)
+            continue
+
+        files = {}
+        for relative, path in entry.files():
+            digest = file_digest(path)
+            staged.duplicates += digest in seen
+            if digest not in seen:
+                staged.stored_bytes += _store(path, digest)
+            seen.add(digest)
+            files[relative] = digest
+            staged.files += 1
+            staged.bytes += path.stat().st_size
+
+        key = hashlib.sha256(f"{target.artifact.resolve()}\n{specification}".encode("utf-8")).hexdigest()[:16]
+        folder = cache_directory() / STAGING_DIRECTORY / TREES_DIRECTORY / key
+        _sync_tree(folder, files)
+        if target.onefile:
+            staged.data_files.append(f"{folder}{os.sep};{entry.destination}")
+        else:
+            staged.linked.append((entry.destination, files))
+    save_digests()
+    if staged.files:
+        log(f"Staged {staged.files} data files ({staged.bytes / (1024 * 1024):.1f} MB, {staged.duplicates} "
+            f"duplicates): {staged.stored_bytes / (1024 * 1024):.1f} MB new content stored, the rest unchanged.\n")
+    return staged
+
+
+def link_into_app(staged: StagedData, app_folder: Path, log: Callable[[str], object]) -> None:
+    """
+        Put the staged folders PyInstaller left out into a freshly built one-dir app.
+
+        Files go where PyInstaller would have put them: below the contents directory (``_internal``) when
+        the app has one. They are copy-on-write clones of the objects where the file system supports it and
+        plain copies otherwise, never hard links: the app's files must be ordinary writable files that the
+        app may change and a rebuild may delete without touching the store.
+
+        Raises
+        ------
+        OSError
+            If a file cannot be cloned or copied.
+    """
+    if not staged.linked:
+        return
+    started = time.perf_counter()
+    contents = app_folder / "_internal" if (app_folder / "_internal").is_dir() else app_folder
+    for destination, files in staged.linked:
+        for relative, digest in files.items():
+            path = contents / destination / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _clone(_object(digest), path)
+    count = sum(len(files) for _, files in staged.linked)
+    log(f"Cloned {count} staged data files into {contents} in {time.perf_counter() - started:.2f} s.\n")
+    prune_objects()
+
+
+def prune_objects() -> int:
+    """
+        Remove objects nothing links to any more (at most once per :data:`PRUNE_INTERVAL`); return how many.
+
+        An object's link count drops to one when every staged folder linking to it is gone, and its change
+        time records when that happened.
+    """
+    root = cache_directory() / STAGING_DIRECTORY / OBJECTS_DIRECTORY
+    marker = root / ".pruned"
+    try:
+        if time.time() - marker.stat().st_mtime < PRUNE_INTERVAL:
+            return 0
+    except OSError:
+        pass
+    if not root.is_dir():
+        return 0
+    marker.touch()
+    removed, now = 0, time.time()
+    for path in root.glob("*/*"):
+        try:
+            status = path.stat()
+            if status.st_nlink == 1 and now - status.st_ctime > PRUNE_AGE:
+                _unlink(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
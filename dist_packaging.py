@@ -0,0 +1,332 @@
+import hashlib, importlib.util, json, os, stat, struct, time, zlib
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from build_engine import BuildTarget
+
+
+PACKAGE_FORMATS = ("zip", "tar.zst")
+PACKAGE_MANIFEST_SUFFIX = ".package.json"
+CHUNK_BYTES = 1024 * 1024   # Files are read and deflated in pieces of this size, in parallel
+CHUNKS_IN_FLIGHT = 4    # Per thread: bounds the memory of chunks read ahead of the writer
+DEFLATE_LEVEL = 6
+ZSTD_LEVEL = 10
+
+# ZIP file format (APPNOTE.TXT)
+_LOCAL = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END = struct.Struct("<IHHHHIIH")
+_ZIP64_END = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_LOCATOR = struct.Struct("<IIQI")
+_DESCRIPTOR64 = struct.Struct("<IIQQ")
+_MADE_BY = 3 << 8 | 45  # Unix, ZIP 4.5 (ZIP64)
+_UTF8, _DESCRIPTOR_FOLLOWS = 0x800, 0x008
+_LIMIT = 0xFFFFFFFF
+
+
+@dataclass
+class PackageReport:
+    """
+        The archive of one artifact and its manifest.
+    """
+    archive: str
+    manifest: str
+    format: str
+    files: int = 0
+    bytes: int = 0  # Uncompressed
+    archive_bytes: int = 0
+    sha256: str = ""    # Of the archive
+    seconds: float = 0
+
+
+@dataclass
+class _Entry:
+    path: Path
+    name: str   # Inside the archive, "/"-separated
+    status: os.stat_result
+    chunks: list[Future] = field(default_factory=list)
+
+
+def package_available(package_format: str) -> bool:
+    """
+        Return whether *package_format* can be written here (``tar.zst`` needs the ``zstandard`` package).
+    """
+    if package_format == "tar.zst" and importlib.util.find_spec("zstandard") is None:
+        return False
+    return package_format in PACKAGE_FORMATS
+
+
+def _walk(artifact: Path) -> Iterator[tuple[Path, str]]:
+    """
+        Yield the artifact's files, symbolic links and empty folders with their archive names, in a stable order.
+    """
+    base = artifact.parent
+    if not artifact.is_dir() or artifact.is_symlink():
+        yield artifact, artifact.name
+        return
+    for folder, directories, files in os.walk(artifact):
+        directories.sort()
+        folder = Path(folder)
+        links = [name for name in directories if (folder / name).is_symlink()]    # os.walk does not follow them
+        if not directories and not files:
+            yield folder, folder.relative_to(base).as_posix() + "/"
+        for name in sorted(files + links):
+            yield folder / name, (folder / name).relative_to(base).as_posix()
+
+
+def _dos_time(timestamp: float) -> tuple[int, int]:
+    moment = time.localtime(max(timestamp, 315532800))     # ZIP dates start in 1980
+    return (moment.tm_hour << 11 | moment.tm_min << 5 | moment.tm_sec // 2,
+            (moment.tm_year - 1980) << 9 | moment.tm_mon << 5 | moment.tm_mday)
+
+
+def _deflate(data: bytes, last: bool) -> bytes:
+    """
+        Deflate one piece of a file on its own; the pieces of a file concatenate into one valid stream.
+
+        Every piece but the last ends on a byte boundary without the final-block flag (``Z_SYNC_FLUSH``),
+        so a decoder reads straight on into the next piece, whose compressor started afresh.
+    """
+    compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _read_chunk(path: Path, offset: int, last: bool) -> tuple[bytes, bytes]:
+    with open(path, "rb") as file:
+        file.seek(offset)
+        data = file.read(CHUNK_BYTES)
+    return data, _deflate(data, last)
+
+
+class _ZipWriter:
+    """
+        Streams entries into a ZIP archive, ZIP64 where sizes or offsets need it.
+    """
+
+    def __init__(self, output: BinaryIO):
+        self.output = output
+        self.offset = 0
+        self.central: list[bytes] = []
+
+    def _write(self, data: bytes) -> None:
+        self.output.write(data)
+        self.offset += len(data)
+
+    def add(self, name: str, status: os.stat_result, pieces: Iterator[bytes], size: int | None = None,
+            crc: int = 0, compressed_size: int = 0, method: int = 8) -> tuple[int, int, int]:
+        """
+            Write one entry. With *size* known (small files), the header carries the sizes; otherwise the
+            *pieces* are streamed and their sizes and CRC follow in a ZIP64 data descriptor. Returns the
+            CRC, size and compressed size; for streamed entries *pieces* yields ``(raw, compressed)`` pairs.
+        """
+        encoded = name.encode("utf-8")
+        clock, date = _dos_time(status.st_mtime)
+        header_offset = self.offset
+        if size is not None:
+            zip64 = size >= _LIMIT or compressed_size >= _LIMIT
+            extra = struct.pack("<HHQQ", 1, 16, size, compressed_size) if zip64 else b""
+            self._write(_LOCAL.pack(0x04034B50, 45 if zip64 else 20, _UTF8, method, clock, date, crc,
+                                    _LIMIT if zip64 else compressed_size, _LIMIT if zip64 else size,
+                                    len(encoded), len(extra)) + encoded + extra)
+            for piece in pieces:
+                self._write(piece)
+            flags = _UTF8
+        else:
+            extra = struct.pack("<HHQQ", 1, 16, 0, 0)
+            self._write(_LOCAL.pack(0x04034B50, 45, _UTF8 | _DESCRIPTOR_FOLLOWS, method, clock, date, 0, _LIMIT,
+                                    _LIMIT, len(encoded), len(extra)) + encoded + extra)
+            size = compressed_size = 0
+            for raw, compressed in pieces:
+                crc = zlib.crc32(raw, crc)
+                size += len(raw)
+                compressed_size += len(compressed)
+                self._write(compressed)
+            self._write(_DESCRIPTOR64.pack(0x08074B50, crc, compressed_size, size))
+            flags = _UTF8 | _DESCRIPTOR_FOLLOWS
+
+        values = [value for value in (size, compressed_size, header_offset) if value >= _LIMIT]
+        big = [size >= _LIMIT, compressed_size >= _LIMIT, header_offset >= _LIMIT]
+        central_extra = struct.pack(f"<HH{len(values)}Q", 1, 8 * len(values), *values) if values else b""
+        self.central.append(_CENTRAL.pack(
+            0x02014B50, _MADE_BY, 45 if values or flags & _DESCRIPTOR_FOLLOWS else 20, flags, method, clock, date,
+            crc, _LIMIT if big[1] else compressed_size, _LIMIT if big[0] else size, len(encoded),
+            len(central_extra), 0, 0, 0, (status.st_mode & 0xFFFF) << 16 | (0x10 if name.endswith("/") else 0),
+            _LIMIT if big[2] else header_offset) + encoded + central_extra)
+        return crc, size, compressed_size
+
+    def close(self) -> None:
+        start, count = self.offset, len(self.central)
+        for record in self.central:
+            self._write(record)
+        size = self.offset - start
+        if count >= 0xFFFF or size >= _LIMIT or start >= _LIMIT:
+            zip64_end = self.offset
+            self._write(_ZIP64_END.pack(0x06064B50, _ZIP64_END.size - 12, _MADE_BY, 45, 0, 0, count, count, size,
+                                        start))
+            self._write(_ZIP64_LOCATOR.pack(0x07064B50, 0, zip64_end, 1))
+        self._write(_END.pack(0x06054B50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF), min(size, _LIMIT),
+                              min(start, _LIMIT), 0))
+
+
+def _write_zip(artifact: Path, output: BinaryIO, jobs: int) -> dict[str, dict]:
+    """
+        Write *artifact* as a ZIP archive, deflating file pieces on *jobs* threads; return the manifest entries.
+
+        Pieces are read and deflated ahead of the writer (bounded by :data:`CHUNKS_IN_FLIGHT` per thread)
+        while it hashes and writes the finished ones in order, so every byte is read from disk once.
+    """
+    writer, manifest = _ZipWriter(output), {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending: deque[_Entry] = deque()
+        queued = 0
+
+        def finish(entry: _Entry) -> None:
+            nonlocal queued
+            name, status = entry.name, entry.status
+            if stat.S_ISLNK(status.st_mode):
+                target = os.readlink(entry.path).encode("utf-8")
+                writer.add(name, status, iter([target]), len(target), zlib.crc32(target), len(target), method=0)
+                return
+            if name.endswith("/"):
+                writer.add(name, status, iter(()), 0, 0, 0, method=0)
+                return
+            digest = hashlib.sha256()
+            if len(entry.chunks) == 1:
+                raw, compressed = entry.chunks[0].result()
+                queued -= 1
+                digest.update(raw)
+                stored = len(compressed) >= len(raw)
+                writer.add(name, status, iter([raw if stored else compressed]), len(raw), zlib.crc32(raw),
+                           len(raw) if stored else len(compressed), method=0 if stored else 8)
+                size = len(raw)
+            else:
+                def pieces() -> Iterator[tuple[bytes, bytes]]:
+                    nonlocal queued
+                    for chunk in entry.chunks:
+                        raw, compressed = chunk.result()
+                        queued -= 1
+                        digest.update(raw)
+                        yield raw, compressed
+
+                _, size, _ = writer.add(name, status, pieces())
+            manifest[name] = {"sha256": digest.hexdigest(), "bytes": size}
+
+        for path, name in _walk(artifact):
+            status = path.lstat()
+            entry = _Entry(path, name, status)
+            if stat.S_ISREG(status.st_mode):
+                offsets = range(0, max(status.st_size, 1), CHUNK_BYTES)
+                for offset in offsets:
+                    entry.chunks.append(pool.submit(_read_chunk, path, offset, offset == offsets[-1]))
+                    queued += 1
+            pending.append(entry)
+            while pending and queued > jobs * CHUNKS_IN_FLIGHT:
+                finish(pending.popleft())
+        while pending:
+            finish(pending.popleft())
+    writer.close()
+    return manifest
+
+
+class _Hashing:
+    """
+        Wraps a file so that everything read from or written to it is hashed on the way through.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self.file, self.digest = file, hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.file.read(size)
+        self.digest.update(data)
+        return data
+
+    def write(self, data: bytes) -> int:
+        self.digest.update(data)
+        return self.file.write(data)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+def _write_tar_zst(artifact: Path, output: BinaryIO, jobs: int) -> dict[str, dict]:
+    """
+        Write *artifact* as a zstandard-compressed tar stream, compressed on *jobs* threads by zstd itself.
+
+        Hard links (from compaction or data staging) are stored once, as tar hard links.
+    """
+    import tarfile, zstandard
+
+    manifest, digests = {}, {}
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=jobs)
+    with compressor.stream_writer(output, closefd=False) as stream, tarfile.open(fileobj=stream, mode="w|") as tar:
+        for path, name in _walk(artifact):
+            info = tar.gettarinfo(path, name.rstrip("/"))
+            if info.isreg():
+                with open(path, "rb") as file:
+                    reader = _Hashing(file)
+                    tar.addfile(info, reader)
+                digests[path.lstat().st_ino] = reader.digest.hexdigest()
+                manifest[name] = {"sha256": reader.digest.hexdigest(), "bytes": info.size}
+            else:
+                tar.addfile(info)
+                if info.islnk():
+                    manifest[name] = {"sha256": digests.get(path.lstat().st_ino, ""), "bytes": path.stat().st_size}
+    return manifest
+
+
+def package_artifact(target: BuildTarget, package_format: str, jobs: int | None = None) -> PackageReport:
+    """
+        Pack a finished artifact into ``<output>/<name>.zip`` (or ``.tar.zst``) with a SHA-256 manifest.
+
+        The archive holds the app folder (or the one-file executable) under its own name, keeping
+        permissions, symbolic links and empty folders. ``<name>.package.json`` next to it lists the
+        SHA-256 and size of every file and of the archive itself. Compression runs on *jobs* threads (one
+        per CPU core by default): ZIP archives deflate pieces of every file in parallel, ``tar.zst`` uses
+        zstd's own threads. The archive is written under a temporary name and renamed when complete.
+
+        Raises
+        ------
+        ValueError
+            If the format is unknown or not available (``tar.zst`` needs the ``zstandard`` package).
+        OSError
+            If the artifact cannot be read or the archive written.
+    """
+    if not package_available(package_format):
+        raise ValueError(f"Cannot package as {package_format!r}; use one of {', '.join(PACKAGE_FORMATS)} "
+                         "(tar.zst needs the zstandard package).")
+    started = time.perf_counter()
+    artifact = target.artifact
+    archive = artifact.with_name(f"{target.name}.{package_format}")
+    temporary = archive.with_name(f".{archive.name}.{os.getpid()}.tmp")
+    jobs = jobs or os.cpu_count() or 1
+    try:
+        with open(temporary, "wb") as file:
+            output = _Hashing(file)     # The archive's own digest, without reading it back
+            write = _write_zip if package_format == "zip" else _write_tar_zst
+            files = write(artifact, output, jobs)
+        os.replace(temporary, archive)
+    finally:
+        if temporary.exists():
+            temporary.unlink()
+
+    report = PackageReport(archive=str(archive), manifest=str(archive.with_name(target.name + PACKAGE_MANIFEST_SUFFIX)),
+                           format=package_format, files=len(files), bytes=sum(item["bytes"] for item in files.values()),
+                           archive_bytes=archive.stat().st_size, sha256=output.digest.hexdigest(),
+                           seconds=time.perf_counter() - started)
+    Path(report.manifest).write_text(json.dumps({**asdict(report), "contents": files}, indent=2), encoding="utf-8")
+    return report
+
+
+def format_package_report(report: PackageReport) -> str:
+    """
+        Summarise a packaging run for the build log.
+    """
+    ratio = report.archive_bytes / report.bytes if report.bytes else 1
+    return (f"Packaged {report.files} files ({report.bytes / (1024 * 1024):.1f} MB) into {report.archive} "
+            f"({report.archive_bytes / (1024 * 1024):.1f} MB, {ratio:.0%}) in {report.seconds:.2f} s; "
+            f"SHA-256 {report.sha256[:16]}..., manifest {report.manifest}.\n")
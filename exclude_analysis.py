@@ -0,0 +1,226 @@
+import ast, hashlib, html, json, os, re, sys
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from build_cache import cache_directory
+from build_engine import DEFAULT_EXCLUDED_MODULES, BuildTarget, assemble_command
+from import_graph import imported_modules, resolve_module
+from toolchain import discover
+
+
+EXCLUDE_MODES = ("off", "report", "apply")
+COLLECTIONS_DIRECTORY = "collections"   # What the latest build of each target collected, in the user cache
+PYZ_TOC_FILE = "PYZ-00.toc"
+
+# Modules PyInstaller's bootloader and always-on run-time hooks import before the application runs
+# (PyInstaller's PY3_BASE_MODULES plus the pyimod*/pyi_rth_inspect dependencies). Their imports are
+# walked as extra roots, so nothing they need can be proposed for exclusion.
+BOOTSTRAP_MODULES = (
+    "_collections_abc", "_weakrefset", "abc", "codecs", "collections", "copyreg", "encodings", "enum", "functools",
+    "genericpath", "io", "heapq", "keyword", "linecache", "locale", "ntpath", "operator", "os", "posixpath", "re",
+    "reprlib", "stat", "traceback", "types", "weakref", "warnings", "sre_compile", "sre_constants", "sre_parse",
+    "struct", "marshal", "zlib", "zipimport", "importlib", "inspect", "pkgutil", "threading", "site",
+)
+
+# One module of PyInstaller's cross-reference (xref-<name>.html): its name, type and the "imports:" links
+_XREF_NODE = re.compile(r'<div class="node">\s*<a name="([^"]*)"></a>(.*?)(?=<div class="node">|</body>)', re.S)
+_XREF_IMPORTS = re.compile(r"imports:(.*?)</div>", re.S)
+_XREF_LINK = re.compile(r'<a href="#([^"]*)">')
+
+
+@dataclass
+class ExcludeReport:
+    """
+        Result of the exclude analysis: bundled top-level modules the app only imports conditionally, and their size.
+    """
+    stdlib: list[tuple[str, int]] = field(default_factory=list)    # (module, bytes of source), largest first
+    site_packages: list[tuple[str, int]] = field(default_factory=list)
+    compared: bool = True   # False when there was no earlier build to take the collected modules from
+
+    @property
+    def modules(self) -> list[str]:
+        return [name for name, _ in (*self.stdlib, *self.site_packages)]
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for _, size in (*self.stdlib, *self.site_packages))
+
+
+def collection_record(target: BuildTarget) -> Path:
+    """
+        Return where the modules collected by the latest build of a target are kept (in the user cache).
+    """
+    entry = hashlib.sha256(str(Path(target.entry_point).resolve()).encode("utf-8")).hexdigest()[:12]
+    return cache_directory() / COLLECTIONS_DIRECTORY / f"{target.name}-{entry}.json"
+
+
+def _read_xref(path: Path) -> tuple[dict[str, list[str]], dict[str, list[str]]]:
+    """
+        Return PyInstaller's module graph from its cross-reference: (module -> imports, script -> imports).
+    """
+    modules, scripts = {}, {}
+    for name, body in _XREF_NODE.findall(path.read_text(encoding="utf-8", errors="replace")):
+        imports = _XREF_IMPORTS.search(body)
+        names = [html.unescape(link) for link in _XREF_LINK.findall(imports[1])] if imports else []
+        (scripts if '<span class="moduletype">Script</span>' in body else modules)[html.unescape(name)] = names
+    return modules, scripts
+
+
+def record_collection(target: BuildTarget, work_directory: Path, applied: list[str]) -> Path:
+    """
+        Keep what PyInstaller collected for *target*, read from its work folder, for the next exclude analysis.
+
+        The record holds the modules of the archive (PYZ) with their source sizes and PyInstaller's module
+        graph, which includes the hidden imports hooks add. Modules under the top-level names in *applied*
+        (excluded by the analysis itself) are carried over from the previous record, so the next analysis
+        still knows them and can take the exclusion back when the app starts to need them.
+
+        Raises
+        ------
+        OSError
+            If the work folder has no archive table of contents or cross-reference.
+        ValueError
+            If the table of contents cannot be parsed.
+    """
+    _, entries = ast.literal_eval((work_directory / PYZ_TOC_FILE).read_text(encoding="utf-8"))
+    sizes = {name: os.path.getsize(path) if path and os.path.isfile(path) else 0
+             for name, path, kind in entries if kind == "PYMODULE"}
+    imports, scripts = _read_xref(work_directory / f"xref-{target.name}.html")
+
+    path = collection_record(target)
+    if applied:
+        try:
+            previous = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            previous = {"modules": {}, "imports": {}}
+        kept = set(applied)
+        for key, current in (("modules", sizes), ("imports", imports)):
+            for name, value in previous.get(key, {}).items():
+                if name.split(".", 1)[0] in kept:
+                    current.setdefault(name, value)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"modules": sizes, "imports": imports, "scripts": scripts}), encoding="utf-8")
+    return path
+
+
+def _explained(name: str, static_imports: set[str]) -> bool:
+    """
+        Return whether an import PyInstaller recorded is visible in the source (``a`` is, for ``import a.b``).
+    """
+    return name in static_imports or any(imported.startswith(name + ".") for imported in static_imports)
+
+
+def _required_modules(target: BuildTarget, sys_path: list[str], record: dict) -> set[str]:
+    """
+        Return every module that is imported whenever the app starts, or that a PyInstaller hook requires.
+
+        From the entry script, hidden imports, bootstrap modules and run-time hooks, a library module's
+        imports are followed when they run on every import of it (module level, outside ``if``/``try`` blocks
+        and functions) and when PyInstaller's graph has them but the source does not: those come from hooks
+        (or from modules without source, such as extensions), and the modules they reach are kept as well.
+        Every import of the project's own modules (next to the entry script) counts, lazy ones included.
+    """
+    entry = Path(target.entry_point).resolve()
+    search_paths = [entry.parent, *(Path(path) for path in sys_path if os.path.isdir(path))]
+    graph, scripts = record.get("imports", {}), record.get("scripts", {})
+    static_entry = imported_modules(entry)
+    pending = [*target.hidden_imports, *BOOTSTRAP_MODULES, *static_entry]
+    pending.extend(name for name in scripts.get(entry.name, []) if not _explained(name, static_entry))
+    pending.extend(name for script, names in scripts.items() if script != entry.name for name in names)
+
+    required = set()
+    while pending:
+        name = pending.pop()
+        if name in required:
+            continue
+        required.add(name)
+        parts = name.split(".")
+        pending.extend(".".join(parts[:index]) for index in range(1, len(parts)))  # Importing a.b runs a first
+        source = resolve_module(name, search_paths)
+        if source is None:
+            pending.extend(graph.get(name, []))
+            continue
+        static = imported_modules(source)
+        local = source.is_relative_to(entry.parent) and not {"site-packages", "dist-packages"} & set(source.parts)
+        pending.extend(static if local else imported_modules(source, unconditional_only=True))
+        pending.extend(imported for imported in graph.get(name, []) if not _explained(imported, static))
+    return required
+
+
+def analyse_excludes(target: BuildTarget) -> ExcludeReport:
+    """
+        Find modules the latest build bundled that the app only imports on some code paths.
+
+        PyInstaller never collects a module the entry script cannot reach, so the candidates come from what
+        the previous build actually put in the module archive (see :func:`record_collection`). A top-level
+        module is proposed when nothing imports it on every start-up: imports at module level are followed
+        from the entry script, hidden imports, bootstrap modules and run-time hooks, while imports inside
+        functions, ``if`` and ``try`` blocks are not. Anything a PyInstaller hook adds (the imports in
+        PyInstaller's graph that the source does not have) is required, and never proposed; so are private
+        (``_``) modules and modules already excluded. Sizes are those of the bundled modules' sources.
+
+        Parameters
+        ----------
+        target : BuildTarget
+            The target to analyse.
+
+        Returns
+        -------
+        ExcludeReport
+            The candidates, largest first; none (and ``compared`` false) before the target's first build.
+
+        Raises
+        ------
+        RuntimeError
+            If the build interpreter cannot be queried.
+    """
+    try:
+        record = json.loads(collection_record(target).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return ExcludeReport(compared=False)
+
+    toolchain = discover(assemble_command(target))
+    sys_path = toolchain.sys_path or [path for path in sys.path if path]
+    required = {name.split(".", 1)[0] for name in _required_modules(target, sys_path, record)}
+    already_excluded = {*DEFAULT_EXCLUDED_MODULES, *target.excludes}
+    stdlib_names = set(toolchain.stdlib_modules)
+    stdlib_sizes: dict[str, int] = {}
+    site_sizes: dict[str, int] = {}
+    for module, size in record.get("modules", {}).items():
+        name = module.split(".", 1)[0]
+        if name.startswith("_") or name in required or name in already_excluded:
+            continue
+        sizes = stdlib_sizes if name in stdlib_names else site_sizes
+        sizes[name] = sizes.get(name, 0) + size
+
+    by_size = lambda item: (-item[1], item[0])
+    return ExcludeReport(stdlib=sorted(stdlib_sizes.items(), key=by_size),
+                         site_packages=sorted(site_sizes.items(), key=by_size))
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.2f} MB"
+
+
+def format_report(report: ExcludeReport, applied: bool) -> str:
+    """
+        Render a report for the build log.
+    """
+    if not report.compared:
+        return "Exclude analysis: no earlier build of this target to compare with; the next build will have a report.\n"
+    if not report.modules:
+        return ("Exclude analysis: every bundled module is imported on start-up or required by a PyInstaller hook; "
+                "nothing to exclude.\n")
+
+    lines = [f"Exclude analysis: {len(report.modules)} bundled module(s) are only imported inside functions, if or "
+             f"try blocks and no hook requires them, {_megabytes(report.total_bytes)} of source "
+             f"{'excluded' if applied else 'could be excluded'}. Code paths that import them fail without them."]
+    for title, modules in (("Standard library", report.stdlib), ("Site-packages", report.site_packages)):
+        if modules:
+            lines.append(f"  {title}:")
+            lines.extend(f"    {name:<32} {_megabytes(size):>10}" for name, size in modules)
+    if not applied:
+        lines.append("  Set the exclude mode to \"apply\" to pass these as --exclude-module.")
+    return "\n".join(lines) + "\n"
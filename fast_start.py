@@ -0,0 +1,99 @@
+import hashlib, os
+
+from pathlib import Path
+
+
+RUNTIME_HOOKS_DIRECTORY = "runtime-hooks"
+WINDOWS_RUNTIME_ROOT = r"%LOCALAPPDATA%\UniversalPyInstallerBuilder\runtime"   # Expanded by the bootloader at launch
+LOCK_FILE = ".upb-runtime.lock"
+LOCK_GRACE_SECONDS = 60     # A lock file younger than this may not be locked yet, so its folder is left alone
+
+# Runs first in a fast-start one-file app. It holds a lock in the app's own extraction folder for as long as the app
+# runs, and removes sibling extraction folders whose lock is no longer held: folders the bootloader could not delete
+# because an earlier run crashed or was killed. Folders without the lock file belong to other apps and are ignored.
+_HOOK = '''\
+# Runtime hook of Universal-PyInstaller-Builder's fast-start one-file mode (generated, do not edit).
+def _upb_fast_start():
+    import os, shutil, sys, threading, time
+    lock_file, grace = %(lock_file)r, %(grace)d
+    if os.name == "nt":
+        import msvcrt
+        def lock(handle):
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+        def lock(handle):
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def in_use(path):
+        try:
+            if time.time() - os.stat(path).st_mtime < grace:
+                return True
+            with open(path, "a+b") as handle:
+                lock(handle)
+            return False
+        except OSError:
+            return True
+
+    here = os.path.abspath(sys._MEIPASS)
+    try:
+        handle = open(os.path.join(here, lock_file), "a+b")
+        lock(handle)
+    except OSError:
+        return
+    sys._upb_runtime_lock = handle  # Held until the app exits
+
+    def clean():
+        root = os.path.dirname(here)
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.startswith("_MEI") and path != here and os.path.isfile(os.path.join(path, lock_file)) \\
+                    and not in_use(os.path.join(path, lock_file)):
+                shutil.rmtree(path, ignore_errors=True)
+
+    threading.Thread(target=clean, name="upb-fast-start-cleanup", daemon=True).start()
+
+
+_upb_fast_start()
+''' % {"lock_file": LOCK_FILE, "grace": LOCK_GRACE_SECONDS}
+
+
+def runtime_hook() -> Path:
+    """
+        Return the fast-start runtime hook, written once to the user cache under a name derived from its content.
+
+        The path only changes with the hook itself, so it does not disturb up-to-date checks or incremental builds.
+    """
+    from build_cache import cache_directory     # build_cache imports build_engine, which imports this module
+
+    digest = hashlib.sha256(_HOOK.encode("utf-8")).hexdigest()[:12]
+    path = cache_directory() / RUNTIME_HOOKS_DIRECTORY / f"upb_fast_start-{digest}.py"
+    if not path.is_file():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(path.name + f".{os.getpid()}.tmp")
+        temporary.write_text(_HOOK, encoding="utf-8")
+        temporary.replace(path)
+    return path
+
+
+def runtime_tmpdir(name: str) -> str | None:
+    """
+        Return the ``--runtime-tmpdir`` of a fast-start app, or ``None`` to keep the system temp folder.
+
+        On Windows every app extracts into its own folder under ``%LOCALAPPDATA%``, away from the crowded (and
+        heavily scanned) ``%TEMP%``. Elsewhere the bootloader does not expand variables, and a fixed path from the
+        build machine would not exist for other users, so the temp folder is kept.
+    """
+    return WINDOWS_RUNTIME_ROOT + "\\" + name if os.name == "nt" else None
+
+
+def fast_start_arguments(name: str) -> list[str]:
+    """
+        Return the PyInstaller arguments of fast-start mode for the one-file app *name*.
+    """
+    arguments = ["--runtime-hook", str(runtime_hook())]
+    tmpdir = runtime_tmpdir(name)
+    if tmpdir:
+        arguments.extend(["--runtime-tmpdir", tmpdir])
+    return arguments
@@ -0,0 +1,166 @@
+import ast, os
+
+from pathlib import Path
+
+
+def _unconditional_statements(body: list[ast.stmt]):
+    """
+        Yield the statements of a module body that always run on import: the body itself and class bodies in it.
+    """
+    for statement in body:
+        yield statement
+        if isinstance(statement, ast.ClassDef):
+            yield from _unconditional_statements(statement.body)
+
+
+def imported_modules(source_file: Path, unconditional_only: bool = False) -> set[str]:
+    """
+        Return the absolute names of every module a Python file imports, found statically.
+
+        Relative imports are resolved against the file's package. For ``from package import name`` both
+        ``package`` and ``package.name`` are returned, because *name* may be a submodule. Imports inside
+        functions, ``try`` blocks and ``if`` branches are included unless *unconditional_only* is set, which
+        keeps just the imports that run whenever the module is imported; dynamic imports (``importlib``,
+        ``__import__``) are not visible to a static walk. Files that cannot be read or parsed yield an
+        empty set.
+    """
+    try:
+        tree = ast.parse(source_file.read_bytes(), filename=str(source_file))
+    except (OSError, SyntaxError, ValueError):
+        return set()
+
+    package = _package_of(source_file)
+    modules = set()
+    for node in _unconditional_statements(tree.body) if unconditional_only else ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package.split(".") if package else []
+                if node.level - 1 > len(parts):
+                    continue    # Relative import beyond the top-level package
+                parts = parts[:len(parts) - (node.level - 1)]
+                base = ".".join(parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            if base:
+                modules.add(base)
+            modules.update(f"{base}.{alias.name}" if base else alias.name
+                           for alias in node.names if alias.name != "*")
+    return modules
+
+
+def _package_of(source_file: Path) -> str:
+    """
+        Return the dotted package a file belongs to, by walking up through directories with ``__init__.py``.
+
+        For ``pkg/__init__.py`` and ``pkg/module.py`` alike this is ``pkg``, the anchor of relative imports.
+    """
+    parts = []
+    directory = source_file.parent
+    while (directory / "__init__.py").is_file():
+        parts.append(directory.name)
+        directory = directory.parent
+    parts.reverse()
+    return ".".join(parts)
+
+
+def resolve_module(name: str, search_paths: list[Path]) -> Path | None:
+    """
+        Find the source file of module *name* under *search_paths* (``a/b.py`` or ``a/b/__init__.py``).
+
+        Only source files are considered; compiled extensions and namespace packages return ``None``.
+    """
+    relative = Path(*name.split("."))
+    for root in search_paths:
+        for candidate in (root / relative.with_suffix(".py"), root / relative / "__init__.py"):
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def _parent_packages(name: str) -> list[str]:
+    """
+        Return the parent packages of a dotted name, outermost first (``a.b.c`` -> ``a``, ``a.b``).
+    """
+    parts = name.split(".")
+    return [".".join(parts[:index]) for index in range(1, len(parts))]
+
+
+def _walk(entry: Path, search_paths: list[Path], extra_modules) -> tuple[set[Path], set[str]]:
+    """
+        Follow imports from *entry* (and *extra_modules*) through every source file found under *search_paths*.
+
+        Returns the reached source files and the names of all modules that were imported, whether or not
+        they resolved to a source file (built-ins and compiled extensions are leaves).
+    """
+    closure = {entry}
+    pending = [entry]
+    seen_modules: set[str] = set()
+    roots = set(extra_modules or ())
+
+    while pending or roots:
+        names = imported_modules(pending.pop()) if pending else set()
+        names |= roots
+        roots = set()
+        for name in names:
+            for module in (*_parent_packages(name), name):    # Importing a.b also runs a/__init__.py
+                if module in seen_modules:
+                    continue
+                seen_modules.add(module)
+                source = resolve_module(module, search_paths)
+                if source is not None:
+                    source = source.resolve()
+                    if source not in closure:
+                        closure.add(source)
+                        pending.append(source)
+    return closure, seen_modules
+
+
+def import_closure(entry_point: str | Path, extra_modules: list[str] | None = None) -> set[Path]:
+    """
+        Return the entry script plus every project-local source file it (transitively) imports.
+
+        "Project-local" means resolvable under the entry script's own directory, which is where
+        PyInstaller looks first as well; stdlib and site-packages modules are not followed.
+
+        Parameters
+        ----------
+        entry_point : str | Path
+            The entry script.
+        extra_modules : list[str] | None
+            Additional root module names, such as hidden imports.
+
+        Returns
+        -------
+        set[Path]
+            Resolved paths of all local source files reachable from the entry script.
+    """
+    entry = Path(entry_point).resolve()
+    return _walk(entry, [entry.parent], extra_modules)[0]
+
+
+def reachable_modules(entry_point: str | Path, sys_path: list[str], extra_modules: list[str] | None = None) -> set[str]:
+    """
+        Return the names of all modules statically reachable from the entry script, across the whole environment.
+
+        Unlike :func:`import_closure`, imports are followed into the standard library and site-packages
+        (the target interpreter's *sys_path*), the way PyInstaller's own analysis does.
+
+        Parameters
+        ----------
+        entry_point : str | Path
+            The entry script.
+        sys_path : list[str]
+            The target interpreter's module search path.
+        extra_modules : list[str] | None
+            Additional root module names, such as hidden imports.
+
+        Returns
+        -------
+        set[str]
+            Dotted names of every imported module (including names that turned out to be attributes).
+    """
+    entry = Path(entry_point).resolve()
+    search_paths = [entry.parent, *(Path(path) for path in sys_path if os.path.isdir(path))]
+    return _walk(entry, search_paths, extra_modules)[1]
@@ -0,0 +1,314 @@
+import json, math, os, subprocess, time
+
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Event, Thread
+
+from build_engine import BuildTarget
+from process_tree import has_proc, kill_tree, new_process_group_flags, tree_rss_bytes
+from toolchain import upx_location
+
+
+READY_FILE_VARIABLE = "UPB_BENCHMARK_READY_FILE"   # An app may create this file to signal "ready"
+STARTUP_SUFFIX = ".startup.json"
+COMPARISON_SUFFIX = ".startup-comparison.json"
+SAMPLE_INTERVAL = 0.01
+
+
+@dataclass
+class LaunchSample:
+    """
+        One launch of a built executable.
+    """
+    seconds: float
+    peak_rss_bytes: int | None  # None where memory cannot be sampled (no /proc)
+    exit_code: int | None   # None when the process was stopped after signalling "ready"
+    timed_out: bool = False
+
+    @property
+    def failed(self) -> bool:
+        """
+            Whether the launch did not start the app: it timed out or the app exited with an error.
+        """
+        return self.timed_out or self.exit_code not in (None, 0)
+
+
+@dataclass
+class StartupStatistics:
+    """
+        Percentiles over a series of launches (seconds and bytes).
+    """
+    runs: int
+    p50: float
+    p90: float
+    p95: float
+    minimum: float
+    maximum: float
+    mean: float
+    peak_rss_bytes: int | None
+
+
+@dataclass
+class StartupReport:
+    """
+        Cold and warm startup statistics of one artifact, as stored next to it.
+    """
+    artifact: str
+    variant: str
+    ready_marker: str
+    timestamp: str
+    cold: StartupStatistics | None
+    warm: StartupStatistics | None
+    samples: dict[str, list[LaunchSample]] = field(default_factory=dict)
+    timeout: float = 60.0   # Seconds a launch had to signal readiness
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """
+        Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def summarise(samples: list[LaunchSample]) -> StartupStatistics | None:
+    """
+        Reduce launch samples to percentiles; failed launches (timed out or crashed) are left out.
+    """
+    valid = [sample for sample in samples if not sample.failed]
+    if not valid:
+        return None
+    seconds = [sample.seconds for sample in valid]
+    rss = [sample.peak_rss_bytes for sample in valid if sample.peak_rss_bytes is not None]
+    return StartupStatistics(runs=len(valid), p50=_percentile(seconds, 50), p90=_percentile(seconds, 90),
+                             p95=_percentile(seconds, 95), minimum=min(seconds), maximum=max(seconds),
+                             mean=sum(seconds) / len(seconds), peak_rss_bytes=max(rss) if rss else None)
+
+
+def _evict_from_page_cache(artifact: Path) -> bool:
+    """
+        Ask the OS to drop the artifact's files from the page cache, so the next launch reads them from disk.
+
+        Uses ``posix_fadvise(DONTNEED)``, which needs no privileges; returns ``False`` where unsupported
+        (Windows), in which case only the first launch after a build counts as cold.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    files = [artifact] if artifact.is_file() else [path for path in artifact.rglob("*") if path.is_file()]
+    for path in files:
+        try:
+            descriptor = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(descriptor)
+            except OSError:
+                pass
+            os.posix_fadvise(descriptor, 0, 0, os.POSIX_FADV_DONTNEED)
+            os.close(descriptor)
+        except OSError:
+            return False
+    return True
+
+
+def launch_once(executable: Path, ready_marker: str = "", timeout: float = 60.0) -> LaunchSample:
+    """
+        Launch *executable* once and measure the time until it is ready.
+
+        "Ready" is the first of: a stdout line containing *ready_marker* (when given), the appearance of
+        the file named by the ``UPB_BENCHMARK_READY_FILE`` environment variable (useful for windowed apps
+        without stdout), or the process exiting. A process that signalled readiness is then killed
+        together with its children. Peak memory is the highest combined RSS of the process tree seen
+        while sampling every 10 ms (Linux only).
+    """
+    scratch = Path(mkdtemp(prefix="upb-launch-"))
+    ready_file = scratch / "ready"
+    env = dict(os.environ, **{READY_FILE_VARIABLE: str(ready_file)})
+    ready = Event()
+    peak = [0]
+
+    started = time.perf_counter()
+    process = subprocess.Popen([str(executable)], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, env=env, **new_process_group_flags())
+
+    def watch_stdout() -> None:
+        """
+            Consume stdout (so the app never blocks on a full pipe) and flag the ready marker.
+        """
+        for raw in process.stdout:
+            if ready_marker and ready_marker.encode() in raw:
+                ready.set()
+
+    reader = Thread(target=watch_stdout, daemon=True)
+    reader.start()
+
+    timed_out = False
+    while True:
+        if has_proc():
+            peak[0] = max(peak[0], tree_rss_bytes(process.pid))
+        if ready.is_set() or ready_file.exists() or process.poll() is not None:
+            break
+        if time.perf_counter() - started > timeout:
+            timed_out = True
+            break
+        time.sleep(SAMPLE_INTERVAL)
+
+    elapsed = time.perf_counter() - started
+    exit_code = process.poll()
+    if exit_code is None:
+        kill_tree(process)
+        process.wait()
+    reader.join(timeout=1)
+    rmtree(scratch, ignore_errors=True)
+    return LaunchSample(seconds=elapsed, peak_rss_bytes=peak[0] if has_proc() else None, exit_code=exit_code,
+                        timed_out=timed_out)
+
+
+def executable_of(artifact: Path) -> Path:
+    """
+        Return the program to launch for an artifact (the one-file executable, or the one inside a one-dir folder).
+    """
+    if artifact.is_dir():
+        return artifact / (artifact.name + (".exe" if os.name == "nt" else ""))
+    return artifact
+
+
+def benchmark_artifact(target: BuildTarget, runs: int = 5, ready_marker: str = "", timeout: float = 60.0,
+                       variant: str = "") -> StartupReport:
+    """
+        Launch a built target *runs* times cold and *runs* times warm, and store the results next to the artifact.
+
+        Cold launches evict the artifact from the page cache first (where the OS allows it without
+        privileges; otherwise only the first launch is cold). Warm launches follow one discarded
+        warm-up launch. The report is written to ``<output>/<name>.startup.json``. When the first launch times
+        out, no more are made: an app that neither exits, prints *ready_marker* nor creates the ready file
+        would only wait out the timeout every time.
+
+        Parameters
+        ----------
+        target : BuildTarget
+            A target whose artifact has been built.
+        runs : int
+            Launches per series.
+        ready_marker : str
+            Optional stdout text that means "started"; otherwise the app must exit (or create the ready file).
+        timeout : float
+            Seconds after which a launch is abandoned.
+        variant : str
+            Label stored with the results (for comparisons).
+
+        Returns
+        -------
+        StartupReport
+            The measurements.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the artifact does not exist.
+    """
+    executable = executable_of(target.artifact)
+    if not executable.exists():
+        raise FileNotFoundError(f"Nothing to benchmark: {executable} does not exist.")
+
+    evictable = _evict_from_page_cache(target.artifact)
+    cold, warm = [launch_once(executable, ready_marker, timeout)], []
+    if not cold[0].timed_out:
+        while evictable and len(cold) < runs:
+            _evict_from_page_cache(target.artifact)
+            cold.append(launch_once(executable, ready_marker, timeout))
+
+        launch_once(executable, ready_marker, timeout)  # Warm-up
+        warm = [launch_once(executable, ready_marker, timeout) for _ in range(max(1, runs))]
+
+    report = StartupReport(artifact=str(target.artifact), variant=variant or describe_variant(target),
+                           ready_marker=ready_marker, timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                           cold=summarise(cold), warm=summarise(warm), samples={"cold": cold, "warm": warm},
+                           timeout=timeout)
+    report_file = Path(target.output_directory) / f"{target.name}{STARTUP_SUFFIX}"
+    report_file.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    return report
+
+
+def describe_variant(target: BuildTarget) -> str:
+    """
+        Short label of the startup-relevant build toggles, e.g. ``onefile+upx`` (UPX only if it is actually installed).
+    """
+    return ("onefile" if target.onefile else "onedir") + ("+upx" if target.upx and upx_location() else "")
+
+
+def _milliseconds(seconds: float) -> str:
+    return f"{seconds * 1000:8.1f} ms"
+
+
+def format_startup_report(report: StartupReport) -> str:
+    """
+        Render a report for the build log.
+    """
+    lines = [f"Startup benchmark ({report.variant}):"]
+    if not report.samples.get("warm") and any(sample.timed_out for sample in report.samples.get("cold", [])):
+        signal = f", print {report.ready_marker!r}" if report.ready_marker else ""
+        lines.append(f"  The first launch was not ready within {report.timeout:g} s, so the benchmark stopped. The "
+                     f"app must exit on its own{signal} or create the file named by {READY_FILE_VARIABLE} (a "
+                     f"windowed app has no stdout on Windows) to be benchmarked.")
+        return "\n".join(lines) + "\n"
+    for label, statistics in (("cold", report.cold), ("warm", report.warm)):
+        if statistics is None:
+            lines.append(f"  {label}: no successful launches")
+            continue
+        memory = f", peak RSS {statistics.peak_rss_bytes / (1024 * 1024):.1f} MB" \
+            if statistics.peak_rss_bytes is not None else ""
+        lines.append(f"  {label} ({statistics.runs} runs): p50 {_milliseconds(statistics.p50)}  "
+                     f"p90 {_milliseconds(statistics.p90)}  p95 {_milliseconds(statistics.p95)}{memory}")
+    return "\n".join(lines) + "\n"
+
+
+def compare_variants(target: BuildTarget, runs: int, build, log, ready_marker: str = "",
+                     timeout: float = 60.0, with_upx: bool | None = None) -> list[StartupReport]:
+    """
+        Build *target* as one-file and one-dir, each with and without UPX, and benchmark every variant.
+
+        Variants are built into ``<output>/variants/<label>`` so the regular artifact is left alone, and
+        a side-by-side summary is written to ``<output>/<name>.startup-comparison.json``.
+
+        Parameters
+        ----------
+        target : BuildTarget
+            The target to compare.
+        runs : int
+            Launches per series for each variant.
+        build : Callable[[BuildTarget], bool]
+            Builds a variant and returns whether it succeeded.
+        log : Callable[[str], object]
+            Receives progress text.
+        ready_marker, timeout
+            As for :func:`benchmark_artifact`.
+        with_upx : bool | None
+            Include the UPX variants; by default only when UPX is installed.
+
+        Returns
+        -------
+        list[StartupReport]
+            One report per successfully built variant.
+    """
+    if with_upx is None:
+        with_upx = upx_location() is not None
+
+    reports = []
+    for onefile in (True, False):
+        for upx in ((False, True) if with_upx else (False,)):
+            variant = replace(target, onefile=onefile, upx=upx)
+            label = describe_variant(variant)
+            variant.output_directory = str(Path(target.output_directory) / "variants" / label)
+            log(f"Building variant {label}...\n")
+            if not build(variant):
+                log(f"Variant {label} failed to build; skipped.\n")
+                continue
+            report = benchmark_artifact(variant, runs, ready_marker, timeout, variant=label)
+            log(format_startup_report(report))
+            reports.append(report)
+
+    comparison = Path(target.output_directory) / f"{target.name}{COMPARISON_SUFFIX}"
+    comparison.parent.mkdir(parents=True, exist_ok=True)
+    comparison.write_text(json.dumps([asdict(report) for report in reports], indent=2), encoding="utf-8")
+    return reports
@@ -0,0 +1,104 @@
+import time
+
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from threading import Lock
+from typing import TextIO
+
+
+class LogSink:
+    """
+        Thread-safe collector between a build thread and the GUI.
+
+        Producers call :meth:`write` from any thread; the text is streamed straight to the current log
+        file and queued in memory. The GUI thread periodically calls :meth:`drain` to take everything
+        queued so far as one string, so a build that prints tens of thousands of lines costs a handful
+        of widget updates instead of one Tk callback per line.
+    """
+    def __init__(self):
+        self._queue: SimpleQueue[str] = SimpleQueue()
+        self._file_lock = Lock()
+        self._file: TextIO | None = None
+        self.log_path: Path | None = None
+
+    def open_file(self, path: Path) -> None:
+        """
+            Start streaming everything written from now on to *path* (closing any previous log file).
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._file_lock:
+            if self._file:
+                self._file.close()
+            self._file = open(path, "w", encoding="utf-8", errors="replace")
+            self.log_path = path
+
+    def close_file(self) -> None:
+        """
+            Flush and close the current log file; :attr:`log_path` keeps pointing at it.
+        """
+        with self._file_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def flush(self) -> None:
+        """
+            Push everything written so far to the log file, so it can be read while the build goes on.
+        """
+        with self._file_lock:
+            if self._file:
+                self._file.flush()
+
+    def write(self, text: str) -> None:
+        """
+            Queue *text* for the GUI and append it to the log file. Safe to call from any thread.
+        """
+        with self._file_lock:   # Queued and written together, so snapshot() sees a text in both places or neither
+            self._queue.put(text)
+            if self._file:
+                self._file.write(text)
+
+    def snapshot(self) -> int:
+        """
+            Flush the log file, drop the queued text it already holds and return its size in bytes.
+
+            Reading the file up to that size and then draining shows every line once: anything written in
+            between is only in the queue.
+        """
+        with self._file_lock:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except Empty:
+                    break
+            if self._file:
+                self._file.flush()
+            try:
+                return self.log_path.stat().st_size if self.log_path is not None else 0
+            except OSError:
+                return 0
+
+    def drain(self, time_budget: float = 0.008, max_chunks: int = 5000) -> str:
+        """
+            Take queued text, stopping after *time_budget* seconds or *max_chunks* chunks, whichever comes first.
+
+            The budget keeps each GUI tick short even when the producer is much faster than the
+            widget; anything left over is picked up by the next tick.
+        """
+        chunks = []
+        deadline = time.perf_counter() + time_budget
+        while len(chunks) < max_chunks and time.perf_counter() < deadline:
+            try:
+                chunks.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return "".join(chunks)
+
+
+def prune_logs(directory: Path, keep: int) -> None:
+    """
+        Delete all but the *keep* most recent ``*.log`` files in *directory*.
+    """
+    logs = sorted(directory.glob("*.log"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for stale in logs[keep:]:
+        stale.unlink(missing_ok=True)
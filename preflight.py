@@ -0,0 +1,224 @@
+import json, os, subprocess, sys, time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from build_engine import BuildTarget, parse_data_specification, pyinstaller_invoker
+from toolchain import discover, interpreter_of
+
+
+PROBE_TIMEOUT = 30  # Seconds; an interpreter that does not answer by then fails the check
+ICON_MAGICS = {".ico": b"\x00\x00\x01\x00", ".icns": b"icns", ".exe": b"MZ"}
+NATIVE_ICONS = {"win32": (".ico", ".exe"), "darwin": (".icns",)}    # Other formats need Pillow to be converted
+OPTIMIZE_PYINSTALLER = (6, 6)   # First PyInstaller version with --optimize (and the spec's optimize= argument)
+
+# Resolves module names in the build interpreter the way PyInstaller's analysis will look for them, without importing
+# them: path-based lookup along sys.path (plus the entry script's folder), descending into packages. Names found only
+# after importing their parent package (packages that extend __path__ at import time) fall back to find_spec.
+_PROBE = (
+    "import importlib.machinery as _machinery, importlib.util as _util, json, sys\n"
+    "request = json.loads(sys.argv[1])\n"
+    "sys.path[:0] = request['path']\n"
+    "def resolves(name):\n"
+    "    parts, path, spec = name.split('.'), None, None\n"
+    "    if parts[0] in sys.builtin_module_names:\n"
+    "        return len(parts) == 1\n"
+    "    for index in range(len(parts)):\n"
+    "        if index and path is None:\n"
+    "            spec = None\n"
+    "            break\n"
+    "        spec = _machinery.PathFinder.find_spec('.'.join(parts[:index + 1]), path)\n"
+    "        if spec is None:\n"
+    "            break\n"
+    "        path = spec.submodule_search_locations\n"
+    "    if spec is not None:\n"
+    "        return True\n"
+    "    try:\n"
+    "        return _util.find_spec(name) is not None\n"
+    "    except Exception:\n"
+    "        return False\n"
+    "def version(name):\n"
+    "    try:\n"
+    "        import importlib.metadata as metadata\n"
+    "        return metadata.version(name)\n"
+    "    except Exception:\n"
+    "        return None\n"
+    "print(json.dumps({'pyinstaller': version('pyinstaller') if resolves('PyInstaller') else None,\n"
+    "    'pillow': resolves('PIL'), 'missing': [name for name in request['modules'] if not resolves(name)]}))\n"
+)
+
+
+@dataclass
+class PreflightReport:
+    """
+        What the pre-flight checks of one target found.
+    """
+    problems: list[str] = field(default_factory=list)   # Each one would make the build fail or come out wrong
+    pyinstaller_version: str | None = None
+    seconds: float = 0
+
+    @property
+    def passed(self) -> bool:
+        return not self.problems
+
+
+def _check_entry_point(target: BuildTarget) -> list[str]:
+    entry = Path(target.entry_point)
+    if not entry.is_file():
+        return [f"Entry point {target.entry_point} does not exist."]
+    return [] if os.access(entry, os.R_OK) else [f"Entry point {target.entry_point} cannot be read."]
+
+
+def _check_data(specification: str) -> list[str]:
+    entry = parse_data_specification(specification)
+    source = Path(entry.source)
+    if not source.exists():
+        return [f"Data source {entry.source} does not exist."]
+    if not os.access(source, os.R_OK):
+        return [f"Data source {entry.source} cannot be read."]
+    if os.path.isabs(entry.destination) or ".." in Path(entry.destination).parts:
+        return [f"Data destination {entry.destination!r} of {entry.source} must be a path inside the app."]
+    return []
+
+
+def _icon_needs_pillow(icon: str) -> bool:
+    native = NATIVE_ICONS.get(sys.platform)   # Elsewhere PyInstaller ignores the icon
+    return bool(icon) and icon != "NONE" and native is not None and Path(icon).suffix.lower() not in native
+
+
+def _check_icon(icon: str) -> list[str]:
+    """
+        Check that the icon exists and, for the formats PyInstaller uses as they are, that it is what its suffix says.
+    """
+    if icon == "NONE":  # PyInstaller's "no icon at all"
+        return []
+    path = Path(icon)
+    if not path.is_file():
+        return [f"Icon {icon} does not exist."]
+    magic = ICON_MAGICS.get(path.suffix.lower())
+    try:
+        with open(path, "rb") as file:
+            header = file.read(4)
+    except OSError as e:
+        return [f"Icon {icon} cannot be read: {e}"]
+    if not header:
+        return [f"Icon {icon} is empty."]
+    if magic is not None and not header.startswith(magic):
+        return [f"Icon {icon} is not a valid {path.suffix.lower()} file."]
+    return []
+
+
+def _probe(command: list[str], target: BuildTarget) -> dict:
+    """
+        Ask the build interpreter, in one spawn, for its PyInstaller version, Pillow and the hidden imports it lacks.
+
+        Raises
+        ------
+        RuntimeError
+            If the interpreter cannot be run or does not answer within :data:`PROBE_TIMEOUT` seconds.
+    """
+    request = {"path": [str(Path(target.entry_point).resolve().parent)], "modules": target.hidden_imports}
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    try:
+        output = subprocess.run([command[0], "-c", _PROBE, json.dumps(request)], capture_output=True, text=True,
+                                stdin=subprocess.DEVNULL, timeout=PROBE_TIMEOUT, check=True,
+                                creationflags=creationflags).stdout
+        return json.loads(output)
+    except (OSError, subprocess.SubprocessError, ValueError) as error:
+        raise RuntimeError(f"Could not query the build interpreter {command[0]}: {error}") from error
+
+
+def _not_installed(command: list[str]) -> str:
+    if interpreter_of(command) is None:
+        return f"{command[0]} cannot be run; install PyInstaller or create a .venv next to the entry point."
+    return f"PyInstaller is not installed for {command[0]}; install it with `{command[0]} -m pip install pyinstaller`."
+
+
+def _check_interpreter(command: list[str], target: BuildTarget, report: PreflightReport) -> list[str]:
+    """
+        Check that PyInstaller is installed and every hidden import resolves in the build interpreter.
+
+        The interpreter is spawned only when there are hidden imports to resolve or an icon to convert;
+        otherwise the (usually cached) toolchain record answers.
+    """
+    needs_pillow = _icon_needs_pillow(target.icon.strip())
+    if interpreter_of(command) is None or not (target.hidden_imports or needs_pillow):
+        try:
+            report.pyinstaller_version = discover(command).pyinstaller_version
+        except RuntimeError as e:
+            return [str(e)]
+        return [] if report.pyinstaller_version else [_not_installed(command)]
+    try:
+        answer = _probe(command, target)
+    except RuntimeError as e:
+        return [str(e)]
+    report.pyinstaller_version = answer["pyinstaller"]
+    problems = [] if answer["pyinstaller"] else [_not_installed(command)]
+    problems.extend(f"Hidden import {name!r} cannot be found by {command[0]}." for name in answer["missing"])
+    if needs_pillow and not answer["pillow"]:
+        problems.append(f"Icon {target.icon.strip()} is not a {' or '.join(NATIVE_ICONS[sys.platform])} file and "
+                        f"Pillow, which PyInstaller needs to convert it, is not installed for {command[0]}.")
+    return problems
+
+
+def _version(text: str) -> tuple[int, ...]:
+    """
+        Return the leading numeric parts of a version string (``"6.6.0.dev0"`` -> ``(6, 6, 0)``).
+    """
+    parts = []
+    for part in text.split("."):
+        digits = part[:len(part) - len(part.lstrip("0123456789"))]
+        if not digits:
+            break
+        parts.append(int(digits))
+    return tuple(parts)
+
+
+def check_target(target: BuildTarget) -> PreflightReport:
+    """
+        Check the inputs and the build environment of *target* before PyInstaller is started.
+
+        The entry point, every data source (and its destination) and the icon are checked
+        on a thread pool while one probe of the build interpreter checks that PyInstaller is installed
+        and that every hidden import resolves (found on the interpreter's path or next to the entry
+        script, without being imported). A bare ``pyinstaller`` command cannot be probed, so its
+        hidden imports are left to PyInstaller. A bytecode optimization level needs PyInstaller 6.6 or later.
+
+        Parameters
+        ----------
+        target : BuildTarget
+            What to build.
+
+        Returns
+        -------
+        PreflightReport
+            Every problem found, in the order of the checks.
+    """
+    started = time.perf_counter()
+    report = PreflightReport()
+    command = pyinstaller_invoker(target.entry_point)
+    icon = target.icon.strip()
+    with ThreadPoolExecutor(max_workers=min(8, 3 + len(target.data_files))) as pool:
+        checks = [pool.submit(_check_interpreter, command, target, report), pool.submit(_check_entry_point, target),
+                  *(pool.submit(_check_data, specification) for specification in target.data_files)]
+        if icon:
+            checks.append(pool.submit(_check_icon, icon))
+        for check in checks:
+            report.problems.extend(check.result())
+    version = report.pyinstaller_version
+    if target.optimize and version and _version(version) < OPTIMIZE_PYINSTALLER:
+        report.problems.append(f"Bytecode optimization needs PyInstaller {'.'.join(map(str, OPTIMIZE_PYINSTALLER))} "
+                               f"or later, but {command[0]} has {version}; set the level to none or upgrade.")
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def format_preflight_report(report: PreflightReport) -> str:
+    """
+        Summarise the pre-flight checks for the build log.
+    """
+    if report.passed:
+        return f"Pre-flight checks passed in {report.seconds:.2f} s (PyInstaller {report.pyinstaller_version}).\n"
+    return (f"Pre-flight checks failed in {report.seconds:.2f} s; nothing was built:\n" +
+            "".join(f"  - {problem}\n" for problem in report.problems))
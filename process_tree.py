@@ -0,0 +1,343 @@
+import os, signal, subprocess, sys, time
+
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Callable
+
+
+PROC = Path("/proc")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100    # Units of the /proc CPU times
+
+
+def has_proc() -> bool:
+    """
+        Return whether per-process statistics can be read from ``/proc`` (Linux).
+    """
+    return (PROC / "self" / "status").is_file()
+
+
+def _children(pid: int) -> list[int]:
+    """
+        Return the direct children of *pid* from ``/proc/<pid>/task/*/children``.
+    """
+    children = []
+    try:
+        for task in (PROC / str(pid) / "task").iterdir():
+            try:
+                children.extend(int(child) for child in (task / "children").read_text().split())
+            except (OSError, ValueError):
+                continue
+    except OSError:
+        pass
+    return children
+
+
+def _children_by_scan() -> dict[int, list[int]]:
+    """
+        Map every process to its children by reading ``/proc/*/stat`` (for kernels without ``children`` files).
+    """
+    children: dict[int, list[int]] = {}
+    for entry in PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+            parent = int(stat[stat.rindex(")") + 2:].split()[1])    # Field 4; the name in (...) may contain spaces
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry.name))
+    return children
+
+
+def tree_pids(pid: int) -> list[int]:
+    """
+        Return *pid* and all of its descendants that are still alive (Linux only; just *pid* elsewhere).
+    """
+    if not has_proc():
+        return [pid]
+    if (PROC / "self" / "task" / str(os.getpid()) / "children").exists():
+        children_of = _children
+    else:
+        scanned = _children_by_scan()
+        children_of = lambda parent: scanned.get(parent, [])
+
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        if current in pids:
+            continue
+        pids.append(current)
+        pending.extend(children_of(current))
+    return pids
+
+
+def rss_bytes(pid: int) -> int:
+    """
+        Return the resident set size of one process in bytes, or 0 if it cannot be read.
+    """
+    try:
+        for line in (PROC / str(pid) / "status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def cpu_seconds(pid: int) -> float:
+    """
+        Return the CPU time (user plus system) of one process and of the children it has waited for, or 0.
+    """
+    try:
+        stat = (PROC / str(pid) / "stat").read_text()
+        fields = stat[stat.rindex(")") + 2:].split()   # Field 3 onwards; the name in (...) may contain spaces
+        return sum(int(value) for value in fields[11:15]) / CLOCK_TICKS    # utime, stime, cutime, cstime
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def tree_rss_bytes(pid: int) -> int:
+    """
+        Return the combined resident set size of *pid* and its descendants (Linux only; 0 elsewhere).
+    """
+    return sum(rss_bytes(member) for member in tree_pids(pid)) if has_proc() else 0
+
+
+def new_process_group_flags() -> dict:
+    """
+        Return ``Popen`` keyword arguments that start the child as the leader of its own process group,
+        so :func:`kill_tree` can take down everything it spawns.
+    """
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW}
+    return {"start_new_session": True}
+
+
+def kill_tree(process: subprocess.Popen) -> None:
+    """
+        Kill a process started with :func:`new_process_group_flags` together with all of its descendants.
+    """
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], capture_output=True,
+                           creationflags=subprocess.CREATE_NO_WINDOW)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        process.kill()
+
+
+class Cancellation:
+    """
+        Lets another thread cancel a running build.
+
+        The build attaches each child process it starts (started with :func:`new_process_group_flags`);
+        :meth:`cancel` kills the attached process tree at once and makes the build stop at its next step.
+    """
+
+    def __init__(self):
+        self._event = Event()
+        self._lock = Lock()
+        self._process: subprocess.Popen | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+        with self._lock:
+            if self._process is not None:
+                kill_tree(self._process)
+
+    def attach(self, process: subprocess.Popen) -> None:
+        """
+            Make *process* the one :meth:`cancel` kills; it is killed right away if cancellation came first.
+        """
+        with self._lock:
+            self._process = process
+        if self.cancelled:
+            kill_tree(process)
+
+    def detach(self) -> None:
+        with self._lock:
+            self._process = None
+
+
+@dataclass
+class ProcessUsage:
+    """
+        Resources used by one finished process.
+    """
+    wall_seconds: float
+    cpu_seconds: float | None   # User plus system time, including waited-for children (None if unknown)
+    peak_rss_bytes: int | None  # Highest combined RSS of the process tree seen while sampling (None if unknown)
+    limit_exceeded: str = ""    # Why the process was stopped by a resource limit, if it was
+
+
+@dataclass
+class ResourceSample:
+    """
+        The resources a running process tree is using, sampled from ``/proc``.
+    """
+    elapsed_seconds: float
+    cpu_seconds: float  # CPU time of the tree so far
+    cpu_percent: float  # Since the previous sample; above 100 when several cores are busy
+    rss_bytes: int  # Combined resident set size of the tree
+
+    def describe(self) -> str:
+        return f"CPU {self.cpu_percent:.0f}%, {self.rss_bytes / (1024 * 1024):.0f} MB"
+
+
+@dataclass
+class ResourceLimits:
+    """
+        Limits that stop a build; ``None`` means no limit. Memory and CPU limits need ``/proc`` (Linux).
+    """
+    memory_bytes: int | None = None     # Combined resident set size of the process tree
+    cpu_seconds: float | None = None    # CPU time of the process tree
+    wall_seconds: float | None = None
+
+    def __bool__(self) -> bool:
+        return any(limit is not None for limit in (self.memory_bytes, self.cpu_seconds, self.wall_seconds))
+
+    def exceeded(self, sample: ResourceSample) -> str:
+        """
+            Return which limit *sample* exceeds, or ``""``.
+        """
+        if self.memory_bytes is not None and sample.rss_bytes > self.memory_bytes:
+            return f"memory limit of {self.memory_bytes / (1024 * 1024):.0f} MB exceeded " \
+                   f"({sample.rss_bytes / (1024 * 1024):.0f} MB in use)"
+        if self.cpu_seconds is not None and sample.cpu_seconds > self.cpu_seconds:
+            return f"CPU time limit of {self.cpu_seconds:g} s exceeded"
+        if self.wall_seconds is not None and sample.elapsed_seconds > self.wall_seconds:
+            return f"time limit of {self.wall_seconds:g} s exceeded"
+        return ""
+
+
+class TreeSampler:
+    """
+        Sample the CPU and memory use of a process tree in a background thread and enforce limits.
+
+        CPU time is counted from when sampling starts, so a long-lived root (a warm worker) only
+        contributes what it used since. When a limit is exceeded, *on_exceeded* is called once with the
+        reason and sampling stops. Without ``/proc`` only the wall-clock limit is checked.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.1, limits: ResourceLimits | None = None,
+                 on_sample: Callable[[ResourceSample], object] | None = None,
+                 on_exceeded: Callable[[str], object] | None = None):
+        self.pid = pid
+        self.limits = limits or ResourceLimits()
+        self.on_sample = on_sample
+        self.on_exceeded = on_exceeded
+        self.peak_rss_bytes = 0
+        self.exceeded = ""  # Why the build was stopped, if it was
+        self._started = time.perf_counter()
+        self._cpu_base = self._tree_cpu()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, args=(interval,), daemon=True)
+        if has_proc() or self.limits.wall_seconds is not None:
+            self._thread.start()
+
+    def _tree_cpu(self) -> float:
+        return sum(cpu_seconds(member) for member in tree_pids(self.pid)) if has_proc() else 0.0
+
+    def _run(self, interval: float) -> None:
+        previous_elapsed, previous_cpu = 0.0, 0.0
+        while not self._stop.wait(interval):
+            elapsed = time.perf_counter() - self._started
+            if has_proc():
+                members = tree_pids(self.pid)
+                cpu = max(sum(cpu_seconds(member) for member in members) - self._cpu_base, previous_cpu)
+                rss = sum(rss_bytes(member) for member in members)
+            else:
+                cpu, rss = 0.0, 0
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+            sample = ResourceSample(elapsed_seconds=elapsed, cpu_seconds=cpu, rss_bytes=rss,
+                                    cpu_percent=(cpu - previous_cpu) / max(elapsed - previous_elapsed, 1e-6) * 100)
+            previous_elapsed, previous_cpu = elapsed, cpu
+            if self.on_sample is not None:
+                self.on_sample(sample)
+            self.exceeded = self.limits.exceeded(sample)
+            if self.exceeded:
+                if self.on_exceeded is not None:
+                    self.on_exceeded(self.exceeded)
+                return
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def _windows_usage(process: subprocess.Popen) -> tuple[float | None, int | None]:
+    """
+        Return the CPU seconds and peak working set of a finished process from its Windows handle.
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    class MemoryCounters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    *((name, ctypes.c_size_t) for name in (
+                        "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                        "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage"))]
+
+    handle = wintypes.HANDLE(int(process._handle))
+    creation, exit_, kernel, user = (wintypes.FILETIME() for _ in range(4))
+    cpu = None
+    if ctypes.windll.kernel32.GetProcessTimes(handle, *map(ctypes.byref, (creation, exit_, kernel, user))):
+        ticks = lambda value: (value.dwHighDateTime << 32) | value.dwLowDateTime
+        cpu = (ticks(kernel) + ticks(user)) / 10_000_000   # 100 ns units
+    counters = MemoryCounters(cb=ctypes.sizeof(MemoryCounters))
+    peak = counters.PeakWorkingSetSize \
+        if ctypes.windll.kernel32.K32GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb) else None
+    return cpu, peak
+
+
+class UsageMonitor:
+    """
+        Measure wall time, CPU time and peak memory of a child process.
+
+        The process tree is sampled in a background thread (see :class:`TreeSampler`; CPU and memory on
+        Linux), and killed when it exceeds *limits* (start it with :func:`new_process_group_flags`).
+        :meth:`finish` reaps the process itself so the kernel's CPU accounting (which includes the
+        children it waited for) can be read. Use it instead of ``process.wait()``.
+    """
+
+    def __init__(self, process: subprocess.Popen, interval: float = 0.1, limits: ResourceLimits | None = None,
+                 on_sample: Callable[[ResourceSample], object] | None = None):
+        self.process = process
+        self.started = time.perf_counter()
+        self._sampler = TreeSampler(process.pid, interval, limits, on_sample, on_exceeded=lambda _: kill_tree(process))
+
+    def finish(self) -> ProcessUsage:
+        """
+            Wait for the process to exit and return its usage; ``process.returncode`` is set as by ``wait()``.
+        """
+        cpu, peak = None, None
+        if hasattr(os, "wait4") and self.process.returncode is None:
+            try:
+                _, status, usage = os.wait4(self.process.pid, 0)
+                self.process.returncode = os.waitstatus_to_exitcode(status)
+                # ru_maxrss is in KiB (bytes on macOS)
+                cpu, peak = usage.ru_utime + usage.ru_stime, usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+            except ChildProcessError:
+                pass
+        self.process.wait()
+        wall = time.perf_counter() - self.started
+        if os.name == "nt":
+            try:
+                cpu, peak = _windows_usage(self.process)
+            except (OSError, AttributeError, ValueError):
+                pass
+
+        self._sampler.stop()
+        if has_proc():
+            peak = max(self._sampler.peak_rss_bytes, peak or 0)
+        return ProcessUsage(wall_seconds=wall, cpu_seconds=cpu, peak_rss_bytes=peak,
+                            limit_exceeded=self._sampler.exceeded)
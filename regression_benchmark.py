@@ -0,0 +1,290 @@
+import argparse, json, os, platform, random, sys, time
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+from typing import Callable
+
+from build_cache import cache_directory
+from build_engine import BuildTarget, assemble_command, format_command
+from build_pipeline import BuildOptions, execute_build
+from launch_benchmark import benchmark_artifact
+from toolchain import discover
+
+
+BASELINE_FILE = "regression-baseline.json"  # Default baseline, in the user cache
+STARTUP_RUNS = 5
+# Metric -> (factor, minimum difference): a metric regresses when it grows by both (noise stays below the minimum)
+REGRESSION_THRESHOLDS = {
+    "build_seconds": (1.25, 1.0),
+    "artifact_bytes": (1.05, 256 * 1024),
+    "startup_seconds": (1.25, 0.02),
+}
+
+MANY_MODULES = 300  # Modules of the "many small modules" project
+HEAVY_IMPORTS = ("asyncio", "concurrent.futures", "csv", "decimal", "email.mime.multipart", "http.server",
+                 "json", "logging.handlers", "multiprocessing", "sqlite3", "unittest", "urllib.request",
+                 "xml.dom.minidom", "xml.etree.ElementTree", "zipfile")  # Large standard-library dependency trees
+DATA_FILES = 400    # Files of the "large data folder" project...
+DATA_FILE_BYTES = 96 * 1024     # ...each this large, half compressible text and half random bytes
+
+
+@dataclass
+class ScenarioResult:
+    """
+        The metrics of one synthetic project; ``None`` where a metric could not be measured.
+    """
+    name: str
+    build_seconds: float | None = None
+    artifact_bytes: int | None = None
+    startup_seconds: float | None = None    # Median warm launch
+    error: str = ""
+
+
+@dataclass
+class Baseline:
+    """
+        Stored results to compare later runs with, and what produced them.
+    """
+    timestamp: str
+    python_version: str
+    pyinstaller_version: str | None
+    platform: str
+    scenarios: dict[str, ScenarioResult] = field(default_factory=dict)
+
+
+def _entry(path: Path, body: str) -> Path:
+    """
+        Write the entry script *body* to *path*. The apps exit once they are done and that is what the startup
+        benchmark times: they print nothing, since builds are windowed and ``sys.stdout`` is ``None`` on Windows.
+    """
+    path.write_text(body, encoding="utf-8")
+    return path
+
+
+def many_modules(root: Path) -> BuildTarget:
+    """
+        A package of many small modules, all imported by the package itself and reached from the entry script.
+
+        The package imports its modules side by side rather than as a chain, whose nesting would exceed the
+        recursion limit long before the last module.
+    """
+    package = root / "synthetic_modules"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text(
+        "".join(f"from .module_{index} import VALUE as VALUE_{index}\n" for index in range(MANY_MODULES)) +
+        f"VALUE = sum(globals()[f'VALUE_{{index}}'] for index in range({MANY_MODULES}))\n", encoding="utf-8")
+    for index in range(MANY_MODULES):
+        (package / f"module_{index}.py").write_text(
+            f'"""Synthetic module {index}."""\n\n\n'
+            f"def function_{index}(value):\n    return value + {index}\n\n"
+            f"VALUE = function_{index}(1)\n", encoding="utf-8")
+    entry = _entry(root / "many_modules.py", "from synthetic_modules import VALUE\nassert VALUE\n")
+    return BuildTarget(entry_point=str(entry), output_directory=str(root / "dist"), onefile=False)
+
+
+def heavy_dependencies(root: Path) -> BuildTarget:
+    """
+        A one-file app importing several large standard-library packages, so analysis and extraction dominate.
+    """
+    root.mkdir(parents=True)
+    entry = _entry(root / "heavy_dependencies.py", "".join(f"import {module}\n" for module in HEAVY_IMPORTS))
+    return BuildTarget(entry_point=str(entry), output_directory=str(root / "dist"), onefile=True)
+
+
+def large_data(root: Path) -> BuildTarget:
+    """
+        A small app with a large nested data folder, added the way the GUI's "Add Folder" adds one.
+    """
+    folder = root / "assets"
+    generator = random.Random(19)   # Fixed seed: the same bytes every run
+    for index in range(DATA_FILES):
+        path = folder / f"group_{index % 8}" / f"item_{index}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = (f"record {index} " * (DATA_FILE_BYTES // 24)).encode("ascii")[:DATA_FILE_BYTES // 2]
+        path.write_bytes(text + generator.randbytes(DATA_FILE_BYTES - len(text)))
+    entry = _entry(root / "large_data.py", "import os, sys\n"
+                                           "folder = os.path.join(getattr(sys, '_MEIPASS', '.'), 'assets')\n"
+                                           "assert sum(len(files) for _, _, files in os.walk(folder))\n")
+    return BuildTarget(entry_point=str(entry), output_directory=str(root / "dist"), onefile=False,
+                       data_files=[f"{folder}{os.sep};assets"])
+
+
+SCENARIOS: dict[str, Callable[[Path], BuildTarget]] = {
+    "many_modules": many_modules,
+    "heavy_dependencies": heavy_dependencies,
+    "large_data": large_data,
+}
+
+
+def _artifact_bytes(artifact: Path) -> int:
+    if artifact.is_dir():
+        return sum(path.stat().st_size for path in artifact.rglob("*") if path.is_file() and not path.is_symlink())
+    return artifact.stat().st_size
+
+
+def run_scenario(name: str, root: Path, log: Callable[[str], object], runs: int = STARTUP_RUNS) -> ScenarioResult:
+    """
+        Generate the synthetic project *name* in *root*, build it from scratch and measure it.
+
+        The build goes through :func:`build_pipeline.execute_build`, so it uses the same command assembly
+        and steps as the GUI and the batch builder.
+    """
+    result = ScenarioResult(name=name)
+    target = SCENARIOS[name](root)
+    log(f"== {name} ==\n" + format_command(assemble_command(target)) + "\n")
+    started = time.perf_counter()
+    try:
+        outcome = execute_build(target, BuildOptions(skip_up_to_date=False, isolated=True), lambda _: None)
+    except (OSError, ValueError) as e:
+        result.error = str(e)
+        return result
+    if not outcome.succeeded:
+        result.error = f"build failed with exit code {outcome.exit_code}"
+        return result
+    result.build_seconds = round(time.perf_counter() - started, 3)
+    result.artifact_bytes = _artifact_bytes(target.artifact)
+    try:
+        report = benchmark_artifact(target, runs)
+        failed = [sample for samples in report.samples.values() for sample in samples if sample.failed]
+        if failed:
+            codes = sorted({"timeout" if sample.timed_out else str(sample.exit_code) for sample in failed})
+            result.error = f"{len(failed)} launch(es) failed ({', '.join(codes)})"
+        elif report.warm is not None:
+            result.startup_seconds = round(report.warm.p50, 4)
+    except (OSError, RuntimeError) as e:
+        result.error = f"startup benchmark failed: {e}"
+    return result
+
+
+def compare(results: list[ScenarioResult], baseline: Baseline) -> list[str]:
+    """
+        Return a description of every metric that regressed past :data:`REGRESSION_THRESHOLDS`.
+
+        Scenarios or metrics missing from the baseline are not compared; failed scenarios always count.
+    """
+    problems = []
+    for result in results:
+        if result.error:
+            problems.append(f"{result.name}: {result.error}")
+            continue
+        previous = baseline.scenarios.get(result.name)
+        if previous is None:
+            continue
+        for metric, (factor, minimum) in REGRESSION_THRESHOLDS.items():
+            now, before = getattr(result, metric), getattr(previous, metric)
+            if now is None or before is None:
+                continue
+            if now > before * factor and now - before >= minimum:
+                problems.append(f"{result.name}: {metric} {_format(metric, now)} vs baseline {_format(metric, before)} "
+                                f"({(now - before) / max(before, 1e-9) * 100:+.0f}%)")
+    return problems
+
+
+def _format(metric: str, value: float) -> str:
+    if metric == "artifact_bytes":
+        return f"{value / (1024 * 1024):.2f} MB"
+    return f"{value * 1000:.1f} ms" if metric == "startup_seconds" else f"{value:.2f} s"
+
+
+def format_results(results: list[ScenarioResult], baseline: Baseline | None) -> str:
+    """
+        Render each scenario's metrics next to its baseline.
+    """
+    lines = []
+    for result in results:
+        if result.error:
+            lines.append(f"{result.name}: FAILED ({result.error})")
+            continue
+        previous = baseline.scenarios.get(result.name) if baseline else None
+        parts = []
+        for metric in REGRESSION_THRESHOLDS:
+            now = getattr(result, metric)
+            text = f"{metric} {_format(metric, now)}" if now is not None else f"{metric} n/a"
+            before = getattr(previous, metric) if previous else None
+            if now is not None and before:
+                text += f" ({(now - before) / before * 100:+.0f}%)"
+            parts.append(text)
+        lines.append(f"{result.name}: " + ", ".join(parts))
+    return "\n".join(lines) + "\n"
+
+
+def load_baseline(path: Path) -> Baseline | None:
+    """
+        Read a stored baseline, or return ``None`` if there is none (or it cannot be read).
+    """
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data["scenarios"] = {name: ScenarioResult(**values) for name, values in data["scenarios"].items()}
+        return Baseline(**data)
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def save_baseline(path: Path, results: list[ScenarioResult]) -> Baseline:
+    """
+        Store the successful *results* as the new baseline, keeping stored scenarios that were not run.
+    """
+    try:
+        toolchain = discover([sys.executable, "-m", "PyInstaller"])     # The build interpreter of the scenarios
+        python_version, pyinstaller_version = toolchain.python_version, toolchain.pyinstaller_version
+    except RuntimeError:
+        python_version, pyinstaller_version = platform.python_version(), None
+    previous = load_baseline(path)
+    baseline = Baseline(timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"), python_version=python_version,
+                        pyinstaller_version=pyinstaller_version, platform=platform.platform(),
+                        scenarios=dict(previous.scenarios) if previous else {})
+    baseline.scenarios.update({result.name: result for result in results if not result.error})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(asdict(baseline), indent=2), encoding="utf-8")
+    return baseline
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+        Command-line entry point: build the synthetic projects and fail on regressions against the baseline.
+    """
+    parser = argparse.ArgumentParser(description="Build synthetic projects and compare build time, artifact size "
+                                                 "and startup latency with a stored baseline.")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--baseline", type=Path, default=None,
+                        help=f"baseline file (default: {BASELINE_FILE} in the user cache)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store this run's results as the new baseline instead of failing on regressions")
+    parser.add_argument("--runs", type=int, default=STARTUP_RUNS,
+                        help=f"warm launches per startup measurement (default: {STARTUP_RUNS})")
+    parser.add_argument("--keep", action="store_true", help="keep the generated projects and their builds")
+    arguments = parser.parse_args(argv)
+    unknown = [name for name in arguments.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    baseline_path = arguments.baseline or cache_directory() / BASELINE_FILE
+    baseline = load_baseline(baseline_path)
+    root = Path(mkdtemp(prefix="upb-regression-"))
+    try:
+        results = [run_scenario(name, root / name, lambda text: print(text, end="", flush=True), arguments.runs)
+                   for name in arguments.scenarios or SCENARIOS]
+    finally:
+        if arguments.keep:
+            print(f"Generated projects kept in {root}")
+        else:
+            rmtree(root, ignore_errors=True)
+
+    print("\n" + format_results(results, None if arguments.update_baseline else baseline), end="")
+    if arguments.update_baseline:
+        save_baseline(baseline_path, results)
+        print(f"Baseline stored in {baseline_path}")
+        return 1 if any(result.error for result in results) else 0
+    if baseline is None:
+        print(f"No baseline in {baseline_path} yet; run with --update-baseline to store one.")
+    problems = compare(results, baseline or Baseline("", "", None, ""))
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
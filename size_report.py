@@ -0,0 +1,271 @@
+import ast, html, json, re, time
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from build_engine import BuildTarget
+
+
+SIZE_REPORT_SUFFIX = ".size-report.json"
+BINARY_TYPECODES = ("EXTENSION", "BINARY")
+SHARED_LIBRARIES = "(shared libraries)"     # Package name for top-level BINARY entries (libpython, libssl, ...)
+
+_SKIPPED_TYPECODES = {"OPTION", "PYZ", "EXECUTABLE", "DEPENDENCY", "SYMLINK"}   # Not payload, or counted elsewhere
+_MISSING = re.compile(r"^missing module named '?([\w.]+)'? - imported by (.*)$")
+_NODE_NAME = re.compile(r'<a name="([^"]+)"></a>')
+_LINK = re.compile(r'<a href="#([^"]+)">')
+
+
+@dataclass
+class BundleEntry:
+    """
+        One file that PyInstaller put into the bundle.
+    """
+    name: str   # Destination name inside the bundle (module name for Python modules)
+    source: str
+    typecode: str   # PYMODULE, PYSOURCE, EXTENSION, BINARY, DATA, ...
+    bytes: int
+
+
+@dataclass
+class PackageSize:
+    """
+        Everything collected for one top-level package (or shared library group), largest contributors first.
+    """
+    package: str
+    bytes: int
+    files: int
+    by_type: dict[str, int] = field(default_factory=dict)     # typecode -> bytes
+    imported_by: list[str] = field(default_factory=list)    # Modules outside the package that pull it in (xref)
+
+
+@dataclass
+class SizeReport:
+    """
+        Ranked size breakdown of one build, as stored next to the artifact.
+    """
+    target: str
+    artifact: str
+    artifact_bytes: int
+    timestamp: str
+    total_bytes: int    # Sum of the collected inputs (uncompressed; Python modules by source size)
+    packages: list[PackageSize] = field(default_factory=list)
+    binaries: list[BundleEntry] = field(default_factory=list)   # Extensions and shared libraries
+    missing_modules: dict[str, str] = field(default_factory=dict)   # name -> "imported by" text from warn-*.txt
+
+
+def _read_toc(path: Path) -> tuple | list | None:
+    """
+        Parse one of PyInstaller's ``*.toc`` files (Python literals), or return ``None`` if it is unreadable.
+    """
+    try:
+        return ast.literal_eval(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError, SyntaxError, MemoryError):
+        return None
+
+
+def _toc_entries(value) -> list[tuple[str, str, str]]:
+    """
+        Return the ``(name, source, typecode)`` entries of every TOC list nested in a parsed ``*.toc`` file.
+    """
+    entries = []
+    for item in value if isinstance(value, (tuple, list)) else ():
+        if isinstance(item, list):
+            entries.extend(entry for entry in item if isinstance(entry, tuple) and len(entry) == 3
+                           and isinstance(entry[0], str) and isinstance(entry[2], str))
+    return entries
+
+
+def _file_size(path: str | None) -> int:
+    try:
+        return Path(path).stat().st_size if path else 0
+    except OSError:
+        return 0
+
+
+def collected_entries(work_directory: Path) -> list[BundleEntry]:
+    """
+        Read what PyInstaller collected from the TOC files in a target's work directory (``<workpath>/<name>``).
+
+        Python modules come from ``PYZ-*.toc``; binaries, data and bootstrap scripts from ``PKG-*.toc``
+        (one-file) and ``COLLECT-*.toc`` (one-dir). Each destination is counted once.
+    """
+    seen: dict[str, BundleEntry] = {}
+    for pattern in ("PYZ-*.toc", "PKG-*.toc", "COLLECT-*.toc"):
+        for toc_file in sorted(work_directory.glob(pattern)):
+            for name, source, typecode in _toc_entries(_read_toc(toc_file)):
+                if typecode in _SKIPPED_TYPECODES or name in seen:
+                    continue
+                seen[name] = BundleEntry(name=name, source=source or "", typecode=typecode, bytes=_file_size(source))
+    return list(seen.values())
+
+
+def package_of(entry: BundleEntry) -> str:
+    """
+        Return the top-level package an entry belongs to.
+
+        Modules are grouped by their first dotted component, files by their first folder inside the bundle
+        (``numpy.libs`` counts as ``numpy``, stdlib extensions under ``lib-dynload`` by module name).
+    """
+    if entry.typecode in ("PYMODULE", "PYSOURCE"):
+        return entry.name.split(".", 1)[0]
+    parts = Path(entry.name).parts
+    if "lib-dynload" in parts[:-1]:
+        return parts[-1].split(".", 1)[0]
+    if len(parts) == 1:
+        return SHARED_LIBRARIES if entry.typecode == "BINARY" else parts[0]
+    top = parts[0]
+    return top[:-len(".libs")] if top.endswith(".libs") else top
+
+
+def missing_modules(work_directory: Path, name: str) -> dict[str, str]:
+    """
+        Return the modules listed in ``warn-<name>.txt`` with the text saying who imports them.
+    """
+    missing = {}
+    try:
+        lines = (work_directory / f"warn-{name}.txt").read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return missing
+    for line in lines:
+        match = _MISSING.match(line)
+        if match:
+            missing[match.group(1)] = match.group(2)
+    return missing
+
+
+def importers(work_directory: Path, name: str) -> dict[str, set[str]]:
+    """
+        Map every module in ``xref-<name>.html`` to the modules that import it.
+    """
+    try:
+        text = (work_directory / f"xref-{name}.html").read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return {}
+
+    imported_by: dict[str, set[str]] = {}
+    for node in text.split('<div class="node">')[1:]:
+        match = _NODE_NAME.search(node)
+        if not match:
+            continue
+        _, _, importer_section = node.partition("imported by:")
+        imported_by[html.unescape(match.group(1))] = {html.unescape(link) for link in
+                                                     _LINK.findall(importer_section)}
+    return imported_by
+
+
+def _artifact_size(artifact: Path) -> int:
+    if artifact.is_dir():
+        return sum(path.stat().st_size for path in artifact.rglob("*") if path.is_file())
+    return _file_size(str(artifact))
+
+
+def analyse_bundle(target: BuildTarget, work_directory: Path, importers_shown: int = 5) -> SizeReport:
+    """
+        Produce a ranked per-package and per-binary size breakdown from a finished build's work directory.
+
+        Must run before the work directory is cleaned up. Sizes are those of the collected input files
+        (Python modules by their source), so they rank dependencies by weight rather than predict the
+        compressed size of the executable; the artifact's real size is reported alongside.
+
+        Parameters
+        ----------
+        target : BuildTarget
+            The target that was built.
+        work_directory : Path
+            PyInstaller's work directory of the target, i.e. ``<workpath>/<name>``.
+        importers_shown : int
+            How many importing modules (from the xref file) to keep per package.
+
+        Returns
+        -------
+        SizeReport
+            The breakdown, largest packages and binaries first.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the work directory contains no TOC files.
+    """
+    entries = collected_entries(work_directory)
+    if not entries:
+        raise FileNotFoundError(f"No PyInstaller TOC files found in {work_directory}.")
+
+    packages: dict[str, PackageSize] = {}
+    for entry in entries:
+        name = package_of(entry)
+        package = packages.setdefault(name, PackageSize(package=name, bytes=0, files=0))
+        package.bytes += entry.bytes
+        package.files += 1
+        package.by_type[entry.typecode] = package.by_type.get(entry.typecode, 0) + entry.bytes
+
+    # Who pulls each package in: importers of any of its modules that live outside the package
+    for module, modules_importing in importers(work_directory, target.name).items():
+        package = packages.get(module.split(".", 1)[0])
+        if package is None:
+            continue
+        outside = sorted(name for name in modules_importing if name.split(".", 1)[0] != package.package)
+        for name in outside:
+            if name not in package.imported_by and len(package.imported_by) < importers_shown:
+                package.imported_by.append(name)
+
+    by_size = lambda item: (-item.bytes, item.name if isinstance(item, BundleEntry) else item.package)
+    return SizeReport(target=target.name, artifact=str(target.artifact), artifact_bytes=_artifact_size(target.artifact),
+                      timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"), total_bytes=sum(entry.bytes for entry in entries),
+                      packages=sorted(packages.values(), key=by_size),
+                      binaries=sorted((entry for entry in entries if entry.typecode in BINARY_TYPECODES),
+                                      key=by_size),
+                      missing_modules=missing_modules(work_directory, target.name))
+
+
+def report_path(target: BuildTarget) -> Path:
+    """
+        Return where the size report of a target is stored (``<output>/<name>.size-report.json``).
+    """
+    return Path(target.output_directory) / f"{target.name}{SIZE_REPORT_SUFFIX}"
+
+
+def write_report(target: BuildTarget, report: SizeReport) -> Path:
+    """
+        Store a report next to the artifact and return its path.
+    """
+    path = report_path(target)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    return path
+
+
+def load_report(target: BuildTarget) -> SizeReport | None:
+    """
+        Read the stored report of a target, or return ``None`` if there is none.
+    """
+    try:
+        data = json.loads(report_path(target).read_text(encoding="utf-8"))
+        data["packages"] = [PackageSize(**package) for package in data["packages"]]
+        data["binaries"] = [BundleEntry(**entry) for entry in data["binaries"]]
+        return SizeReport(**data)
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.2f} MB"
+
+
+def format_size_report(report: SizeReport, limit: int = 10) -> str:
+    """
+        Render the *limit* largest packages and binaries for the build log or the GUI.
+    """
+    lines = [f"Bundle size: {_megabytes(report.artifact_bytes)} on disk, {_megabytes(report.total_bytes)} of "
+             f"collected inputs in {len(report.packages)} package(s)."]
+    lines.append("  Largest packages:")
+    for package in report.packages[:limit]:
+        importer = f"  <- {', '.join(package.imported_by[:2])}" if package.imported_by else ""
+        lines.append(f"    {package.package:<32} {_megabytes(package.bytes):>10}  {package.files:>5} file(s){importer}")
+    if report.binaries:
+        lines.append("  Largest binaries:")
+        lines.extend(f"    {_megabytes(entry.bytes):>10}  {entry.name}" for entry in report.binaries[:limit])
+    if report.missing_modules:
+        lines.append(f"  {len(report.missing_modules)} module(s) could not be found (see warn-{report.target}.txt); "
+                     f"most are optional imports.")
+    return "\n".join(lines) + "\n"
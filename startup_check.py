@@ -0,0 +1,137 @@
+import argparse, os, subprocess, sys
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+GUI_MODULE = "universal_executable_builder"
+HEADLESS_MODULES = ("build_engine", "build_pipeline", "build_queue", "batch_build", "suite_build", "watch_mode",
+                    "build_daemon")
+GUI_PACKAGES = ("tkinter", "_tkinter", "customtkinter", "CTkToolTip", "darkdetect")  # Never loaded by headless code
+IMPORT_BUDGETS_MS = {GUI_MODULE: 1500}  # Import-time budgets of modules that need more than the default
+DEFAULT_BUDGET_MS = 300
+IMPORT_RUNS = 5     # Imports per module; the fastest one is judged (the least disturbed)
+SLOWEST_SHOWN = 5   # Most expensive modules listed per import
+
+
+@dataclass
+class ImportProfile:
+    """
+        The fastest of several fresh-interpreter imports of one of the builder's modules.
+    """
+    module: str
+    total_ms: float | None = None   # Cumulative import time of the module (None if it could not be imported)
+    slowest: list[tuple[str, float]] = field(default_factory=list)  # (module, own import time in ms), slowest first
+    gui_modules: list[str] = field(default_factory=list)    # GUI packages the import loaded
+    error: str = ""
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, float, float]]:
+    """
+        Parse the ``-X importtime`` report into ``(module, depth, self_ms, cumulative_ms)`` tuples.
+
+        Each report line reads ``import time: <self us> | <cumulative us> | <indentation><module>``, where two
+        spaces of indentation mark one level of nesting.
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue    # The header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(parts[0]) / 1000, int(parts[1]) / 1000))
+    return entries
+
+
+def profile_import(module: str, python: str = sys.executable, runs: int = IMPORT_RUNS) -> ImportProfile:
+    """
+        Import *module* from this folder in *runs* fresh interpreters with ``-X importtime`` and keep the fastest.
+    """
+    profile = ImportProfile(module=module)
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    for _ in range(max(1, runs)):
+        try:
+            completed = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                                       cwd=Path(__file__).resolve().parent, capture_output=True, text=True,
+                                       timeout=120, creationflags=creationflags)
+        except (OSError, subprocess.SubprocessError) as e:
+            profile.error = str(e)
+            return profile
+        entries = parse_importtime(completed.stderr)
+        if completed.returncode != 0:
+            profile.error = (completed.stderr.strip().splitlines() or ["import failed"])[-1]
+            return profile
+        total = next((cumulative for name, depth, _, cumulative in entries if name == module and depth == 0), None)
+        if total is not None and (profile.total_ms is None or total < profile.total_ms):
+            profile.total_ms = total
+            profile.slowest = sorted(((name, own) for name, _, own, _ in entries), key=lambda item: -item[1])
+            profile.slowest = profile.slowest[:SLOWEST_SHOWN]
+            profile.gui_modules = sorted({name.partition(".")[0] for name, _, _, _ in entries} & set(GUI_PACKAGES))
+    return profile
+
+
+def check_startup(modules: list[str], python: str = sys.executable, runs: int = IMPORT_RUNS,
+                  scale: float = 1.0) -> tuple[list[ImportProfile], list[str]]:
+    """
+        Profile the imports of *modules* and return the profiles with every problem found.
+
+        A problem is a headless module that loads a GUI package, or an import slower than its budget
+        (:data:`IMPORT_BUDGETS_MS`, else :data:`DEFAULT_BUDGET_MS`) times *scale*. The GUI module is
+        skipped, not failed, where the GUI packages are not installed.
+    """
+    profiles, problems = [], []
+    for module in modules:
+        profile = profile_import(module, python, runs)
+        profiles.append(profile)
+        if profile.error:
+            missing_gui = module == GUI_MODULE and any(package in profile.error for package in GUI_PACKAGES)
+            if not missing_gui:
+                problems.append(f"{module}: cannot be imported ({profile.error})")
+            continue
+        if module != GUI_MODULE and profile.gui_modules:
+            problems.append(f"{module}: imports the GUI stack ({', '.join(profile.gui_modules)})")
+        budget = IMPORT_BUDGETS_MS.get(module, DEFAULT_BUDGET_MS) * scale
+        if profile.total_ms is not None and profile.total_ms > budget:
+            problems.append(f"{module}: imports in {profile.total_ms:.0f} ms, over its {budget:.0f} ms budget")
+    return profiles, problems
+
+
+def format_profiles(profiles: list[ImportProfile]) -> str:
+    """
+        Render import times and the slowest modules of each profile.
+    """
+    lines = []
+    for profile in profiles:
+        if profile.error:
+            lines.append(f"{profile.module}: not imported ({profile.error})")
+            continue
+        slowest = ", ".join(f"{name} {own:.1f}" for name, own in profile.slowest)
+        lines.append(f"{profile.module}: {profile.total_ms:.1f} ms (slowest, ms: {slowest})")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+        Command-line entry point: fail when the builder's own start-up got slower than its budgets.
+    """
+    parser = argparse.ArgumentParser(description="Check the import time of the builder's modules with -X importtime.")
+    parser.add_argument("modules", nargs="*", default=[*HEADLESS_MODULES, GUI_MODULE],
+                        help="modules to check (default: the headless modules and the GUI)")
+    parser.add_argument("--runs", type=int, default=IMPORT_RUNS,
+                        help=f"fresh imports per module; the fastest counts (default: {IMPORT_RUNS})")
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="multiply every budget, for slow machines (default: 1.0)")
+    arguments = parser.parse_args(argv)
+
+    profiles, problems = check_startup(arguments.modules, runs=arguments.runs, scale=arguments.budget_scale)
+    print(format_profiles(profiles), end="")
+    for problem in problems:
+        print(f"FAIL {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
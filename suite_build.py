@@ -0,0 +1,239 @@
+import os, time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+from typing import Callable
+
+from app_compaction import compact_app
+from build_engine import (DEFAULT_EXCLUDED_MODULES, BuildTarget, format_command, parse_data_specification,
+                          pyinstaller_invoker, run_pyinstaller)
+from dist_packaging import format_package_report, package_artifact
+from preflight import check_target, format_preflight_report
+from process_tree import Cancellation, ResourceLimits
+from toolchain import upx_location
+
+
+SUITE_SPEC_SUFFIX = ".suite.spec"
+
+# One Analysis of every entry point feeds one PYZ; each executable gets the bootstrap scripts and runtime hooks plus
+# its own entry script, and a single COLLECT puts all executables next to one shared _internal folder (COLLECT keeps
+# one copy of every binary and data file by destination).
+_SPEC = """\
+# -*- mode: python ; coding: utf-8 -*-
+# Generated by Universal-PyInstaller-Builder for the suite %(name)r.
+import os
+
+entry_points = %(entry_points)r
+
+a = Analysis(
+    entry_points,
+    pathex=[],
+    binaries=[],
+    datas=%(datas)r,
+    hiddenimports=%(hidden_imports)r,
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=%(excludes)r,
+    noarchive=False,
+%(optimize)s)
+pyz = PYZ(a.pure)
+
+
+def scripts_of(entry_point):
+    others = {os.path.normcase(os.path.abspath(other)) for other in entry_points if other != entry_point}
+    return [script for script in a.scripts if os.path.normcase(os.path.abspath(script[1])) not in others]
+
+
+executables = [
+    EXE(
+        pyz,
+        scripts_of(entry_point),
+        [],
+        exclude_binaries=True,
+        name=name,
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=%(upx)r,
+        console=False,
+        disable_windowed_traceback=False,
+        icon=icon,
+    )
+    for entry_point, name, icon in %(executables)r
+]
+coll = COLLECT(
+    *executables,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=%(upx)r,
+    upx_exclude=%(upx_excludes)r,
+    name=%(name)r,
+)
+"""
+
+
+def _check_suite(name: str, targets: list[BuildTarget]) -> None:
+    """
+        Raise ``ValueError`` unless *targets* can share one Analysis and one application folder.
+    """
+    if not name.strip():
+        raise ValueError("A suite needs a name.")
+    if len(targets) < 2:
+        raise ValueError("A suite needs at least two targets.")
+    names = [target.name for target in targets]
+    duplicates = sorted({target_name for target_name in names if names.count(target_name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate executable names in the suite: {', '.join(duplicates)}")
+    for label, values in (("build interpreter", {tuple(pyinstaller_invoker(target.entry_point)) for target in targets}),
+                          ("output directory", {os.path.abspath(target.output_directory) for target in targets}),
+                          ("optimization level", {target.optimize for target in targets}),
+                          ("compact setting", {target.compact for target in targets}),
+                          ("package format", {target.package for target in targets})):
+        if len(values) > 1:
+            raise ValueError(f"All targets of a suite need the same {label}.")
+    for target in targets:
+        if target.exclude_mode != "off":
+            raise ValueError(f"{target.name}: exclude analysis is not available for suites; "
+                             "set exclude_mode to \"off\".")
+        if target.fast_start:
+            raise ValueError(f"{target.name}: fast_start applies to one-file builds, but a suite is one-dir.")
+
+
+def suite_spec(name: str, targets: list[BuildTarget]) -> str:
+    """
+        Return the ``.spec`` source that builds *targets* as the one-dir suite *name*.
+
+        Hidden imports and data files are combined; a module is only excluded if every target excludes
+        it, since all executables share the modules. Filtered data folders (and all folders of targets that
+        stage data) are listed file by file. UPX is used if every target wants it.
+
+        Raises
+        ------
+        ValueError
+            If the targets cannot form a suite (see :func:`build_suite`).
+    """
+    _check_suite(name, targets)
+    datas = []
+    for target in targets:
+        for specification in target.data_files:
+            entry = parse_data_specification(specification)
+            if entry.staged(target):
+                selected = [(os.path.abspath(path), os.path.dirname(f"{entry.destination}/{relative}"))
+                            for relative, path in entry.files()]
+            else:
+                selected = [(os.path.abspath(entry.source), entry.destination)]
+            datas.extend(data for data in selected if data not in datas)
+    hidden_imports = list(dict.fromkeys(module for target in targets for module in target.hidden_imports))
+    excludes = set.intersection(*({*DEFAULT_EXCLUDED_MODULES, *target.excludes} for target in targets))
+    executables = [(os.path.abspath(target.entry_point), target.name,
+                    os.path.abspath(target.icon) if target.icon.strip() else None) for target in targets]
+    return _SPEC % {
+        "name": name,
+        "entry_points": [entry_point for entry_point, _, _ in executables],
+        "datas": datas,
+        "hidden_imports": hidden_imports,
+        "excludes": [*sorted(excludes), "__main__"],     # __main__ last, as in build_engine.assemble_command
+        "optimize": f"    optimize={targets[0].optimize!r},\n" if targets[0].optimize else "",   # PyInstaller 6.6+
+        "upx": all(target.upx for target in targets),
+        "upx_excludes": list(dict.fromkeys(pattern for target in targets for pattern in target.upx_excludes)),
+        "executables": executables,
+    }
+
+
+def _tree_bytes(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file() and not file.is_symlink())
+
+
+def build_suite(name: str, targets: list[BuildTarget], log: Callable[[str], object], warm: bool = False,
+                cancellation: Cancellation | None = None, analysis_cache: bool = False,
+                limits: ResourceLimits | None = None) -> int:
+    """
+        Build several entry points of one project as a single one-dir application folder.
+
+        One Analysis covers every entry point, so the module graph, hooks and binary dependencies are
+        worked out once, and every executable is placed in ``<output>/<name>/`` next to one shared
+        ``_internal`` folder instead of each carrying its own copy of the dependencies. Each executable
+        still embeds the (shared) module archive. One-file settings are ignored; the suite is always one-dir.
+        Every target passes the pre-flight checks (see :mod:`preflight`), run side by side, before PyInstaller
+        starts. The suite folder is compacted and packaged like a one-dir app when the targets ask for it.
+
+        Parameters
+        ----------
+        name : str
+            Name of the application folder.
+        targets : list[BuildTarget]
+            The executables. They must use the same build interpreter, output directory and
+            optimization level, and have distinct names.
+        log : Callable[[str], object]
+            Receives all log text, PyInstaller output included.
+        warm : bool
+            Run PyInstaller in a warm worker (see :mod:`build_worker`).
+        cancellation : Cancellation | None
+            Lets another thread stop the build.
+        analysis_cache : bool
+            Reuse hook results and binary dependency scans of the environment (see :mod:`analysis_cache`).
+        limits : ResourceLimits | None
+            Stop PyInstaller when its process tree exceeds these (see :func:`build_engine.run_pyinstaller`).
+
+        Returns
+        -------
+        int
+            PyInstaller's exit code.
+
+        Raises
+        ------
+        ValueError
+            If the targets cannot share one build.
+    """
+    spec = suite_spec(name, targets)
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        reports = list(pool.map(check_target, targets))
+    for target, report in zip(targets, reports):
+        if not report.passed:
+            log(f"{target.name}: " + format_preflight_report(report))
+    if not all(report.passed for report in reports):
+        return -1
+    output_directory = targets[0].output_directory
+    scratch = Path(mkdtemp(prefix=f"upb-suite-{name}-"))
+    try:
+        spec_file = scratch / f"{name}{SUITE_SPEC_SUFFIX}"
+        spec_file.write_text(spec, encoding="utf-8")
+        command = [*pyinstaller_invoker(targets[0].entry_point), str(spec_file), "--distpath", output_directory,
+                   "--workpath", str(scratch / "build"), "--noconfirm"]
+        upx_path = upx_location()
+        if upx_path and all(target.upx for target in targets):
+            command.extend(["--upx-dir", os.path.dirname(upx_path)])
+
+        log(f"Building {len(targets)} executables as the suite {name!r}:\n" + format_command(command) + "\n\n")
+        started = time.perf_counter()
+        code = run_pyinstaller(command, log, cancellation=cancellation, warm=warm, analysis_cache=analysis_cache,
+                               limits=limits)
+        if cancellation is not None and cancellation.cancelled:
+            log("\nBuild cancelled.\n")
+            return code if code else -1
+        if code != 0:
+            log("\nBuild failed. Check the log above for details.\n")
+            return code
+
+        folder = Path(output_directory) / name
+        log(f"\nSuite built in {time.perf_counter() - started:.1f} s: {', '.join(target.name for target in targets)} "
+            f"share {folder}, {_tree_bytes(folder) / (1024 * 1024):.1f} MB in total.\n")
+        suite = replace(targets[0], executable_name=name, onefile=False)  # The suite folder as a one-dir artifact
+        if suite.compact and (folder / "_internal").is_dir():   # Without it, the executables would be stripped too
+            try:
+                compact_app(suite, log)
+            except OSError as e:
+                log(f"Compaction failed: {e}\n")
+        if suite.package:
+            try:
+                log(format_package_report(package_artifact(suite, suite.package)))
+            except Exception as e:  # As in build_pipeline: a failed archive does not fail the built suite
+                log(f"Packaging failed: {e}\n")
+        return code
+    finally:
+        rmtree(scratch, ignore_errors=True)
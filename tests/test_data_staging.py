@@ -0,0 +1,74 @@
+import os, stat, sys
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import data_staging     # noqa: E402
+from build_engine import BuildTarget    # noqa: E402
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPB_CACHE_DIR", str(tmp_path / "cache"))
+    assets = tmp_path / "assets"
+    (assets / "sub").mkdir(parents=True)
+    (assets / "kept.txt").write_text("kept", encoding="utf-8")
+    (assets / "changed.txt").write_text("old", encoding="utf-8")
+    (assets / "sub" / "removed.txt").write_text("removed", encoding="utf-8")
+    (tmp_path / "app.py").write_text("", encoding="utf-8")
+    return BuildTarget(entry_point=str(tmp_path / "app.py"), output_directory=str(tmp_path / "dist"),
+                       data_files=[f"{assets};assets"], stage_data=True)
+
+
+def _windows_unlink(monkeypatch):
+    """
+        Make ``Path.unlink`` refuse read-only files, as it does on Windows.
+    """
+    unlink = Path.unlink
+
+    def refusing(path, missing_ok=False):
+        if path.exists() and not os.stat(path).st_mode & stat.S_IWRITE:
+            raise PermissionError(f"read-only: {path}")
+        return unlink(path, missing_ok=missing_ok)
+
+    monkeypatch.setattr(Path, "unlink", refusing)
+
+
+def _staged_folder(target):
+    """
+        Stage the data of the one-file *target* and return the staged folder handed to PyInstaller.
+    """
+    staged = data_staging.stage_data(target, lambda text: None)
+    return Path(staged.data_files[0].rpartition(";")[0])
+
+
+def test_restaging_a_changed_and_a_removed_file(project, monkeypatch):
+    _windows_unlink(monkeypatch)
+    folder = _staged_folder(project)
+    assert (folder / "changed.txt").read_text(encoding="utf-8") == "old"
+    assert (folder / "sub" / "removed.txt").is_file()
+
+    assets = Path(project.data_files[0].partition(";")[0])
+    (assets / "changed.txt").write_text("new content", encoding="utf-8")
+    (assets / "sub" / "removed.txt").unlink()
+    assert _staged_folder(project) == folder
+    assert (folder / "changed.txt").read_text(encoding="utf-8") == "new content"
+    assert (folder / "kept.txt").read_text(encoding="utf-8") == "kept"
+    assert not (folder / "sub").exists()
+
+
+def test_restaging_over_read_only_objects(project, monkeypatch):
+    _windows_unlink(monkeypatch)
+    folder = _staged_folder(project)
+    for path in folder.rglob("*.txt"):     # Objects stored by earlier versions were read-only
+        os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    assets = Path(project.data_files[0].partition(";")[0])
+    (assets / "changed.txt").write_text("new content", encoding="utf-8")
+    (assets / "sub" / "removed.txt").unlink()
+    _staged_folder(project)
+    assert (folder / "changed.txt").read_text(encoding="utf-8") == "new content"
+    assert not (folder / "sub" / "removed.txt").exists()
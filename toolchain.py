@@ -0,0 +1,217 @@
+import json, os, shutil, subprocess
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from threading import Lock
+
+
+TOOLCHAINS_FILE = "toolchains.json"
+PROBE_FORMAT = 2    # Bump whenever the probe reports new fields, so older cached records are re-probed
+
+# One interpreter spawn answers everything we need to know about a build environment
+_PROBE = (
+    "import json, site, sys, importlib.metadata as m\n"
+    "try:\n"
+    "    import PyInstaller; version = PyInstaller.__version__\n"
+    "except Exception:\n"
+    "    version = None\n"
+    "sites = [*site.getsitepackages(), site.getusersitepackages()] if hasattr(site, 'getsitepackages') else []\n"
+    "print(json.dumps({'python_version': sys.version, 'executable': sys.executable,\n"
+    "    'base_prefix': sys.base_prefix, 'pyinstaller_version': version, 'site_packages': sites,\n"
+    "    'sys_path': [path for path in sys.path if path],\n"
+    "    'stdlib_modules': sorted(getattr(sys, 'stdlib_module_names', ())),\n"
+    "    'distributions': sorted(f\"{d.metadata['Name']}=={d.version}\" for d in m.distributions())}))\n"
+)
+
+
+@dataclass
+class Toolchain:
+    """
+        What a build environment looks like: interpreter, PyInstaller, Tcl/Tk and installed distributions.
+
+        UPX does not belong to an interpreter; see :func:`upx_location`.
+
+        ``site_packages_stamp`` records the modification times of the interpreter's site-packages
+        folders at probe time; ``pip install``/``uninstall`` changes them, which invalidates the record.
+    """
+    python: str | None  # None when PyInstaller is invoked as a bare `pyinstaller`
+    python_mtime: int | None
+    python_version: str | None = None
+    base_prefix: str | None = None
+    pyinstaller_version: str | None = None
+    tcl_library: str | None = None
+    tk_library: str | None = None
+    distributions: list[str] = field(default_factory=list)
+    sys_path: list[str] = field(default_factory=list)
+    stdlib_modules: list[str] = field(default_factory=list)     # Top-level stdlib names (Python 3.10+)
+    site_packages_stamp: dict[str, int | None] = field(default_factory=dict)
+    probe_format: int = 0
+
+
+_lock = Lock()
+_probe_locks: dict[str, Lock] = {}     # Cache key -> lock, so concurrent builds of one environment share one spawn
+_memory: dict[str, Toolchain] | None = None     # interpreter path -> record, shared by every build in this process
+_upx: dict[str, str | None] = {}   # PATH value -> UPX location
+
+
+def interpreter_of(command: list[str]) -> Path | None:
+    """
+        Return the Python interpreter of a ``python -m PyInstaller`` command, or ``None`` for a bare ``pyinstaller``.
+
+        The form of the command decides, not the interpreter's name: ``python3.12``, ``pythonw.exe`` and the
+        ``py`` launcher are interpreters as well.
+    """
+    if len(command) >= 3 and isinstance(command[0], str) and command[1:3] == ["-m", "PyInstaller"]:
+        return Path(command[0])
+    return None
+
+
+def _mtime(path: Path | str) -> int | None:
+    """
+        Return a path's modification time in nanoseconds, or ``None`` if it does not exist.
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _cache_file() -> Path:
+    """
+        Return the on-disk location of the discovery cache.
+    """
+    from build_cache import cache_directory  # Imported here: build_cache depends on build_engine, which uses us
+
+    return cache_directory() / TOOLCHAINS_FILE
+
+
+def _load() -> dict[str, Toolchain]:
+    """
+        Load the persisted records once per process.
+    """
+    global _memory
+    if _memory is None:
+        _memory = {}
+        try:
+            for key, record in json.loads(_cache_file().read_text(encoding="utf-8")).items():
+                _memory[key] = Toolchain(**record)
+        except (OSError, ValueError, TypeError):
+            pass
+    return _memory
+
+
+def _save() -> None:
+    """
+        Persist the records (best effort; a lost cache only costs one probe).
+    """
+    path = _cache_file()
+    temporary = path.with_name(path.name + f".{os.getpid()}.tmp")
+    try:
+        temporary.write_text(json.dumps({key: asdict(record) for key, record in _load().items()}, indent=2),
+                             encoding="utf-8")
+        os.replace(temporary, path)
+    except OSError:
+        temporary.unlink(missing_ok=True)
+
+
+def _is_current(record: Toolchain, python_mtime: int | None) -> bool:
+    """
+        Return whether a record still describes the environment on disk.
+    """
+    return record.probe_format == PROBE_FORMAT and record.python_mtime == python_mtime and \
+        all(_mtime(directory) == stamp for directory, stamp in record.site_packages_stamp.items())
+
+
+def _probe(command: list[str], python: Path | None, python_mtime: int | None) -> Toolchain:
+    """
+        Spawn the interpreter (or ``pyinstaller --version``) once and build a fresh record.
+    """
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    if python is None:
+        try:
+            version = subprocess.check_output([command[0], "--version"], text=True, creationflags=creationflags)
+        except (subprocess.CalledProcessError, OSError):
+            version = None
+        record = Toolchain(python=None, python_mtime=python_mtime, pyinstaller_version=version and version.strip(),
+                           probe_format=PROBE_FORMAT)
+        pyinstaller_exe = shutil.which(command[0])
+        base = Path(pyinstaller_exe).parent.parent if pyinstaller_exe else None  # ...\Python3xx\
+    else:
+        try:
+            output = subprocess.check_output([str(python), "-c", _PROBE], text=True, creationflags=creationflags)
+            details = json.loads(output)
+        except (subprocess.CalledProcessError, OSError, ValueError) as error:
+            raise RuntimeError(f"Could not query the build interpreter {python}: {error}") from error
+        sites = details.pop("site_packages")
+        details.pop("executable")
+        record = Toolchain(python=str(python), python_mtime=python_mtime, **details,
+                           site_packages_stamp={directory: _mtime(directory) for directory in sites},
+                           probe_format=PROBE_FORMAT)
+        base = Path(record.base_prefix)
+
+    # Tcl/Tk as laid out by the Windows installer (<base>\tcl\tcl8.6)
+    if base is not None:
+        tcl, t_k = base / "tcl" / "tcl8.6", base / "tcl" / "tk8.6"
+        if tcl.is_dir() and t_k.is_dir():
+            record.tcl_library, record.tk_library = str(tcl), str(t_k)
+    return record
+
+
+def discover(command: list[str]) -> Toolchain:
+    """
+        Describe the environment a PyInstaller command runs in, probing the interpreter only when needed.
+
+        Records are kept in memory and in ``toolchains.json`` in the user cache, keyed by interpreter path
+        and validated against the interpreter's modification time and its site-packages folders, so
+        repeated and batch builds share one probe until the interpreter or its packages change.
+
+        Parameters
+        ----------
+        command : list[str]
+            A PyInstaller command (only its invoker part is used).
+
+        Returns
+        -------
+        Toolchain
+            The (possibly cached) record.
+
+        Raises
+        ------
+        RuntimeError
+            If the interpreter cannot be run.
+    """
+    python = interpreter_of(command)
+    key = str(python) if python else f"exe:{command[0]}"
+    if python:
+        located = python.resolve() if python.exists() else shutil.which(str(python))  # Bare names (py) are on PATH
+    else:
+        located = shutil.which(command[0])
+    python_mtime = _mtime(located) if located else None
+
+    with _lock:
+        probe_lock = _probe_locks.setdefault(key, Lock())
+    with probe_lock:    # Probes of other interpreters go on in parallel
+        with _lock:
+            record = _load().get(key)
+        if record is not None and _is_current(record, python_mtime):
+            return record
+
+        record = _probe(command, python, python_mtime)
+        with _lock:
+            _load()[key] = record
+            _save()
+        return record
+
+
+def upx_location() -> str | None:
+    """
+        Return the path of ``upx`` on PATH (memoised per PATH value for this process).
+    """
+    path = os.environ.get("PATH", "")
+    with _lock:
+        if path in _upx and (_upx[path] is None or os.path.isfile(_upx[path])):
+            return _upx[path]
+    location = shutil.which("upx")
+    with _lock:
+        _upx[path] = location
+    return location
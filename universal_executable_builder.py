@@ -1,588 +1,821 @@
-import os, shutil, subprocess, sys
-
-from pathlib import Path
-from threading import Thread
-
-import tkinter as tk, customtkinter as ctk
-from tkinter import font as tkfont, filedialog, messagebox, simpledialog
-
-from utility import cleanup_build_artifacts, place_help
-
-
-# Initialize CustomTkinter appearance (dark mode and theme accent)
-ctk.set_appearance_mode("Dark") # Dark mode for modern look
-ctk.set_default_color_theme("blue") # You can use "dark-blue" or others as needed
-
-
-class PyInstallerGUI(ctk.CTk):
-    def __init__(self):
-        """
-            Initialize the PyInstaller Builder GUI application.
-        """
-        super().__init__()
-        self.configure(fg_color="#1E1E1E")  # Forces the root window to a near-black
-        self.title("Universal PyInstaller Builder")
-        self.geometry("900x750")
-
-        self.protocol("WM_DELETE_WINDOW", self.on_close)
-
-        # Variables for settings
-        self.entry_point = tk.StringVar()
-        self.executable_name = tk.StringVar()
-        self.hidden_imports = tk.StringVar()
-        self.icon = tk.StringVar()
-        self.output_directory = tk.StringVar(value="dist")
-        self.onefile_mode = tk.BooleanVar(value=True)
-        self.data_files = []  # List of data file specifications
-
-        self.entry_point_entry = None
-        self.executable_name_entry = None
-        self.data_listbox = None
-        self.hidden_imports_entry = None
-        self.icon_entry = None
-        self.output_directory_entry = None
-        self.onefile_check = None
-        self.build_button = None
-        self.log_text = None
-
-        # Create GUI components
-        self.create_widgets()
-
-    def create_widgets(self):
-        """
-            Create and layout all the GUI widgets.
-        """
-        # Main container frame
-        main_frame = ctk.CTkFrame(self, fg_color="transparent")  # transparent uses window default dark bg
-        main_frame.pack(fill="both", expand=True, padx=10, pady=10)
-        main_frame.grid_rowconfigure(15, weight=1)  # make the log section expandable (row index 15 below)
-        main_frame.grid_columnconfigure(0, weight=1)  # make content stretch horizontally
-
-        # Define fonts for section headers and field labels (for modern, readable text)
-        section_font = ("Segoe UI", 16, "bold")
-        label_font = ("Segoe UI", 14, "bold")
-
-        def selectable_title(row: int, text: str) -> ctk.CTkEntry:
-            """
-                Create and place a selectable, non-editable title entry.
-            """
-            pixel_width = tkfont.Font(font=section_font).measure(text) + 24 # Measure text width in pixels and add a bit of padding
-            pixel_width = max(pixel_width, 180) # Set a reasonable minimum so very short titles don’t look cramped
-
-            entry = ctk.CTkEntry(main_frame, width=pixel_width, border_width=0, fg_color="transparent",
-                text_color="white", font=section_font, corner_radius=0, justify="left")
-            entry.insert(0, text)
-            entry.configure(state="readonly")
-            entry.grid(row=row, column=0, sticky="w", pady=(5, 0))
-            entry.configure(cursor="xterm")  # normal text-selection cursor
-
-            return entry
-
-        # Entry Point section
-        selectable_title(0, "Entry Point")
-        place_help(main_frame, row=0, column=1, text="Select the main .py file where your program starts.")
-        entry_frame = ctk.CTkFrame(main_frame)
-        entry_frame.grid(row=1, column=0, sticky="ew", padx=5, pady=5)
-        entry_frame.grid_columnconfigure(1, weight=1)  # Make the entry field expand in this frame
-        ctk.CTkLabel(entry_frame, text="Main Python File:", font=label_font).grid(row=0, column=0, sticky="w")
-        self.entry_point_entry = ctk.CTkEntry(entry_frame, textvariable=self.entry_point)
-        self.entry_point_entry.grid(row=0, column=1, sticky="ew", padx=5)
-        ctk.CTkButton(entry_frame, text="Browse", command=self.browse_entry_point).grid(row=0, column=2, padx=5)
-
-        # Executable Name Section
-        selectable_title(2, "Executable Name")
-        place_help(main_frame, row=2, column=1, text="Specifies the name of the generated .exe.")
-        exe_frame = ctk.CTkFrame(main_frame)
-        exe_frame.grid(row=3, column=0, sticky="ew", padx=5, pady=5)
-        exe_frame.grid_columnconfigure(1, weight=1)
-        ctk.CTkLabel(exe_frame, text="Name:", font=label_font).grid(row=0, column=0, sticky="w")
-        self.executable_name_entry = ctk.CTkEntry(exe_frame, textvariable=self.executable_name)
-        self.executable_name_entry.grid(row=0, column=1, sticky="ew", padx=5)
-
-        # Additional Data Files section
-        selectable_title(4, "Additional Data Files")
-        place_help(main_frame, row=4, column=1, text="Include extra files/folders.")
-        data_frame = ctk.CTkFrame(main_frame)
-        data_frame.grid(row=5, column=0, sticky="ew", padx=5, pady=5)
-        data_frame.grid_columnconfigure((0, 1, 2), weight=1)  # Distribute extra space across three columns
-        # Listbox for data files – using a standard tkinter Listbox, but styled to match dark theme
-        self.data_listbox = tk.Listbox(data_frame, height=5, selectmode=tk.SINGLE)
-        self.data_listbox.configure(background="#2B2B2B", foreground="white",
-                                    selectbackground="#3A9FBF", highlightthickness=0)
-        self.data_listbox.grid(row=0, column=0, columnspan=3, sticky="ew", padx=5, pady=5)
-        # Buttons for adding/removing data files
-        ctk.CTkButton(data_frame, text="Add File", command=self.add_data_file).grid(row=1, column=0, padx=5, pady=5)
-        ctk.CTkButton(data_frame, text="Add Folder", command=self.add_data_folder).grid(row=1, column=1, padx=5, pady=5)
-        ctk.CTkButton(data_frame, text="Remove Selected",
-                      command=self.remove_data_file).grid(row=1, column=2, padx=5, pady=5)
-
-        # Hidden Imports Section
-        selectable_title(6, "Hidden Imports (comma-separated)")
-        place_help(main_frame, row=6, column=1,
-                        text="Specify modules not auto-detected (package_a.submodule, mypkg.utils, etc.).")
-        hidden_frame = ctk.CTkFrame(main_frame)
-        hidden_frame.grid(row=7, column=0, sticky="ew", padx=5, pady=5)
-        hidden_frame.grid_columnconfigure(0, weight=1)
-        self.hidden_imports_entry = ctk.CTkEntry(hidden_frame, textvariable=self.hidden_imports)
-        self.hidden_imports_entry.grid(row=0, column=0, sticky="ew", padx=5)
-
-        # Icon Selection Section
-        selectable_title(8, "Icon")
-        place_help(main_frame, row=8, column=1, text="Path to a .ico file to embed in your executable.")
-        icon_frame = ctk.CTkFrame(main_frame)
-        icon_frame.grid(row=9, column=0, sticky="ew", padx=5, pady=5)
-        icon_frame.grid_columnconfigure(1, weight=1)
-        ctk.CTkLabel(icon_frame, text="Icon File:", font=label_font).grid(row=0, column=0, sticky="w")
-        self.icon_entry = ctk.CTkEntry(icon_frame, textvariable=self.icon)
-        self.icon_entry.grid(row=0, column=1, sticky="ew", padx=5)
-        ctk.CTkButton(icon_frame, text="Browse", command=self.browse_icon).grid(row=0, column=2, padx=5)
-
-        # Output Directory Section
-        selectable_title(10, "Output Directory")
-        place_help(main_frame, row=10, column=1, text="Destination folder for build output. The program will "
-                                                           "remove all .spec files inside the folder, if the folder "
-                                                           "already exists.")
-        out_frame = ctk.CTkFrame(main_frame)
-        out_frame.grid(row=11, column=0, sticky="ew", padx=5, pady=5)
-        out_frame.grid_columnconfigure(1, weight=1)
-        ctk.CTkLabel(out_frame, text="Directory:", font=label_font).grid(row=0, column=0, sticky="w")
-        self.output_directory_entry = ctk.CTkEntry(out_frame, textvariable=self.output_directory)
-        self.output_directory_entry.grid(row=0, column=1, sticky="ew", padx=5)
-        ctk.CTkButton(out_frame, text="Browse", command=self.browse_output_directory).grid(row=0, column=2, padx=5)
-
-        # Options Section (One-file toggle)
-        self.onefile_check = ctk.CTkCheckBox(main_frame, text="Build one-file executable", variable=self.onefile_mode)
-        self.onefile_check.grid(row=12, column=0, sticky="w", padx=5, pady=5)
-        place_help(main_frame, row=12, column=1, text="Choose single-file or folder build.")
-
-        # Build Button
-        self.build_button = ctk.CTkButton(main_frame, text="Build Executable", command=self.build_executable)
-        self.build_button.grid(row=13, column=0, pady=10)
-        place_help(main_frame, row=14, column=1, text="Displays real-time output from PyInstaller during build. "
-                                                           "Aborting a build might result in background process "
-                                                           "continuation or unexpected behaviour.")
-
-        # Build Log Output
-        selectable_title(14, "Build Log")
-        # Copy log button on the same row, right side
-        ctk.CTkButton(main_frame, text="Copy log", width=110, command=self.copy_log).grid(row=14, column=0, padx=(6, 25),
-                                                                                          pady=(5, 0), sticky="e")
-        # Text box for log output. CTkTextbox provides a scrollbar automatically in customtkinter >=5
-        self.log_text = ctk.CTkTextbox(main_frame, height=180)
-        self.log_text.grid(row=15, column=0, sticky="nsew", padx=5, pady=5)
-        self.log_text.configure(state="disabled")  # Start as read-only
-
-    def browse_entry_point(self):
-        """
-            Browse and select the main Python entry point file.
-        """
-        file_path = filedialog.askopenfilename(filetypes=[("Python Files", "*.py")])
-        if file_path:
-            self.entry_point.set(file_path)
-
-    def add_data_file(self):
-        """
-            Add a data file to include in the build.
-        """
-        file_path = filedialog.askopenfilename()
-        if file_path:
-            destination = simpledialog.askstring("Destination",
-                                                 f"Enter destination folder for {os.path.basename(file_path)} (relative to executable):",
-                                                 initialvalue=".")
-            if destination is None:
-                destination = "."
-            specification = f"{file_path};{destination}"
-            self.data_files.append(specification)
-            self.data_listbox.insert(tk.END, specification)
-
-    def add_data_folder(self):
-        """
-            Add a data folder to include in the build.
-        """
-        folder_path = filedialog.askdirectory()
-        if folder_path:
-            destination = simpledialog.askstring("Destination",
-                                                 f"Enter destination folder for {os.path.basename(folder_path)} (relative to executable):",
-                                                 initialvalue=os.path.basename(folder_path))
-            if destination is None:
-                destination = os.path.basename(folder_path)
-
-            specification = f"{folder_path}{os.sep};{destination}"  # Appending os.sep to indicate folder
-            self.data_files.append(specification)
-            self.data_listbox.insert(tk.END, specification)
-
-    def remove_data_file(self):
-        """
-            Remove the selected data file or folder from the list.
-        """
-        selected = self.data_listbox.curselection()
-        if selected:
-            index = selected[0]
-            self.data_listbox.delete(index)
-            del self.data_files[index]
-
-    def browse_icon(self):
-        """
-            Browse and select an icon file.
-        """
-        file_path = filedialog.askopenfilename(filetypes=[("Icon Files", "*.ico"), ("All Files", "*.*")])
-        if file_path:
-            self.icon.set(file_path)
-
-    def browse_output_directory(self):
-        """
-            Browse and select an output directory.
-        """
-        directory = filedialog.askdirectory()
-        if directory:
-            self.output_directory.set(directory)
-
-    def append_log(self, text: str):
-        """
-            Insert into the read-only log.
-        """
-        self.log_text.configure(state=tk.NORMAL)
-        self.log_text.insert(tk.END, text)
-        self.log_text.see(tk.END)
-        self.log_text.configure(state=tk.DISABLED)
-        self.update_idletasks()
-
-    def _append_log_async(self, text: str):
-        """
-            Schedule a log append on the GUI thread.
-        """
-        self.after(0, self.append_log, text)
-
-    def _pyinstaller_invoker(self) -> list[str]:
-        """
-            Resolve the exact command used to invoke PyInstaller.
-
-            Search order (first match wins):
-              1) A `.venv` next to the *target entry script* (…/project/.venv/Scripts/python.exe -m PyInstaller).
-              2) If this app is frozen: a `.venv` next to our own EXE.
-              3) When running from source: the current interpreter (`sys.executable -m PyInstaller`).
-              4) Fallback: `pyinstaller` on PATH.
-
-            Returns
-            -------
-            list[str]
-                The argv head for invoking PyInstaller, e.g.
-                `[<python>, "-m", "PyInstaller"]` or `["pyinstaller"]`.
-        """
-        entry = Path(self.entry_point.get()).resolve()
-
-        # Prefer a .venv next to the target entry script
-        venv_directory = entry.parent / ".venv" / ("Scripts" if os.name == "nt" else "bin")
-        venv_python = venv_directory / ("python.exe" if os.name == "nt" else "python3")
-        if venv_python.exists():
-            return [str(venv_python), "-m", "PyInstaller"]
-
-        # If *we* are frozen, prefer a .venv next to our EXE
-        if getattr(sys, "frozen", False):
-            application_directory = Path(sys.executable).resolve().parent
-            venv_directory = application_directory / ".venv" / ("Scripts" if os.name == "nt" else "bin")
-            venv_python = venv_directory / ("python.exe" if os.name == "nt" else "python3")
-            if venv_python.exists():
-                return [str(venv_python), "-m", "PyInstaller"]
-
-        # Running from source: use this interpreter
-        if not getattr(sys, "frozen", False):
-            return [sys.executable, "-m", "PyInstaller"]
-
-        return ["pyinstaller"]
-
-    def assemble_commands(self) -> list[str] | None:
-        """
-            Build the full PyInstaller command list based on the current GUI settings.
-
-            This method collects the user-specified build options from the GUI
-            (entry point, build mode, output directory, hidden imports, data files, icon, etc.)
-            and assembles them into a list of command-line arguments for invoking PyInstaller.
-
-            If no entry point is set, an error dialog is scheduled on the main thread
-            and the method returns ``None``.
-
-            The resulting command includes:
-              - ``--onefile`` or ``--onedir`` depending on the *Build one-file executable* checkbox.
-              - ``--noconsole`` to hide the console window in GUI applications.
-              - ``--exclude-module sitecustomize`` and common stdlib modules to reduce size.
-              - Optional UPX compression if UPX is found on the system PATH.
-              - The entry-point script path.
-              - Optional executable name override.
-              - Any additional data files specified.
-              - Any hidden imports specified.
-              - Optional icon file.
-              - Output directory path.
-
-            Returns
-            -------
-            list[str] | None
-                A list of strings representing the PyInstaller command-line arguments,
-                or ``None`` if no entry point was provided.
-        """
-        if not self.entry_point.get():
-            self.after(0, messagebox.showerror, "Error", "Please select an entry point file.")
-            return None
-
-        output_directory = self.output_directory.get().strip()
-        if not output_directory:
-            self.after(0, messagebox.showerror, "Error", "Please select an output directory.")
-            return None
-
-        # Base command: onefile/onedir + no-console
-        command = \
-            [
-                *self._pyinstaller_invoker(),
-                "--onefile" if self.onefile_mode.get() else "--onedir",
-                "--noconsole",
-                "--exclude-module", "sitecustomize",
-                "--python-option", "O0",  # Basic bytecode optimization
-            ]
-
-        # UPX compression (if UPX is on PATH)
-        upx_path = shutil.which("upx")
-        if upx_path:
-            command.extend(["--upx-dir", os.path.dirname(upx_path)]) # Point PyInstaller to the directory containing UPX.exe
-
-        # Exclude common unneeded stdlib modules to reduce bundle size
-        for module in ("unittest", "test", "pydoc"):
-            command.extend(["--exclude-module", module])
-
-        # Target entry point
-        command.append(self.entry_point.get())
-
-        # Optional name override
-        executable_name = self.executable_name.get().strip()
-        if executable_name:
-            command.extend(["--name", executable_name])
-
-        # Data files
-        for data in self.data_files:
-            command.extend(["--add-data", data])
-
-        # Hidden imports
-        for hidden_import in filter(None, map(str.strip, self.hidden_imports.get().split(","))):
-            command.extend(["--hidden-import", hidden_import])
-
-        # Icon
-        icon = self.icon.get().strip()
-        if icon:
-            command.extend(["--icon", icon])
-
-        # Output directory
-        command.extend(["--distpath", output_directory])
-
-        return command
-
-    def _enable_build_button(self, *_: object) -> None:
-        """
-            Re-enable the **Build Executable** button in the GUI.
-
-            This helper is intended to be scheduled via ``after`` or ``after_idle``
-            from background threads, ensuring the button state is reset on the main
-            Tkinter thread. The ``*_`` parameter is present so the method can safely
-            accept and ignore any positional arguments passed by the scheduler.
-
-            Parameters
-            ----------
-            *_ : object
-                Ignored positional arguments; accepted to maintain compatibility
-                with Tkinter's event and scheduling callbacks.
-            """
-        self.build_button.configure(state="normal")
-
-    def _run_build(self):
-        """
-            Runs in a background thread—executes PyInstaller and updates the log.
-        """
-        command = self.assemble_commands()
-        if not command:
-            # Re-enable the button if assemble failed
-            self.after(0, self._enable_build_button, None)
-            return
-
-        cleanup_build_artifacts()   # Clean artifacts before build
-
-        # Log the command asynchronously
-        self._append_log_async("Running command:\n" + " ".join(command) + "\n\n")
-
-        try:
-            creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
-            env = os.environ.copy()
-
-            # If we are invoking "python.exe -m PyInstaller", command[0] is that python
-            py_exe = None
-            if command and isinstance(command[0], str):
-                low = command[0].lower()
-                if low.endswith("python.exe") or low.endswith("python"):
-                    py_exe = Path(command[0])
-
-            def _base_prefix(python_exe: Path) -> Path | None:
-                """
-                    Return the `sys.base_prefix` directory for the given Python interpreter.
-
-                    This runs:  <python_exe> -c "import sys; print(sys.base_prefix)"
-                    and parses the output. If the interpreter cannot be called or returns a
-                    non-zero exit status, `None` is returned.
-
-                    Parameters
-                    ----------
-                    python_exe : Path
-                        Fully-qualified path to a Python interpreter (e.g., .../python.exe).
-
-                    Returns
-                    -------
-                    Path | None
-                        Base prefix directory, or `None` if it cannot be determined.
-                """
-                try:
-                    output = subprocess.check_output([str(python_exe), "-c",
-                                                   "import sys; print(sys.base_prefix)"],
-                                                  text=True, creationflags=(subprocess.CREATE_NO_WINDOW
-                                                                            if os.name == "nt" else 0))
-                    return Path(output.strip())
-                except (subprocess.CalledProcessError, FileNotFoundError, OSError):
-                    return None
-
-            if os.name == "nt":
-                base = _base_prefix(py_exe) if py_exe and py_exe.exists() else None
-
-                # Fallback: if we didn't call via python -m, try to locate the pyinstaller host Python
-                if base is None:
-                    pyinstaller_exe = shutil.which("pyinstaller")
-                    if pyinstaller_exe:
-                        base = Path(pyinstaller_exe).parent.parent  # ...\Python3xx\
-
-                if base:
-                    tcl = base / "tcl" / "tcl8.6"
-                    t_k = base / "tcl" / "tk8.6"
-                    if tcl.is_dir() and t_k.is_dir():
-                        env["TCL_LIBRARY"] = str(tcl)
-                        env["TK_LIBRARY"] = str(t_k)
-
-            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                       text=True, creationflags=creationflags, env=env,)
-
-            for line in process.stdout: # Send each line back to the GUI thread
-                self._append_log_async(line)
-
-            code = process.wait()
-            if code == 0:
-                self._append_log_async("\nExecutable built successfully.\n")
-            else:
-                self._append_log_async("\nBuild failed. Check the log above for details.\n")
-
-        except Exception as e:
-            self._append_log_async(f"\nBuild failed: {e}\n")
-            self.after(0, messagebox.showerror, "Build Error", str(e))
-        finally:
-            cleanup_build_artifacts()  # Clean up artifacts after build
-            self.after(0, self._enable_build_button, None)  # Re-enable the build button
-
-    def build_executable(self):
-        """
-            Build the executable using PyInstaller with the selected options.
-        """
-        if not self.entry_point.get():
-            messagebox.showerror("Error", "Please select an entry point file.")
-            return
-
-        # Disable the build button so user can't start multiple builds
-        self.build_button.configure(state="disabled")
-
-        # Start background thread
-        thread = Thread(target=self._run_build, daemon=True)
-        thread.start()
-
-    def copy_log(self):
-        """
-            Copy the build log text to the clipboard.
-        """
-        try:
-            text = self.log_text.get("1.0", "end-1c")
-            self.clipboard_clear()
-            self.clipboard_append(text)
-            self.update_idletasks() # Ensure the clipboard is actually updated on Windows
-            self._show_success_message("Build log copied to clipboard.")    # Confirmation message
-
-        except Exception as e:
-            messagebox.showerror("Copy failed", str(e))
-
-    def _show_success_message(self, text: str, duration_ms: int = 10000):
-        """
-            Small fade-out popup near the bottom-right of the window.
-        """
-        success = ctk.CTkToplevel(self)
-        success.overrideredirect(True)
-        success.attributes("-topmost", True)
-        success.configure(fg_color="#2B2B2B")
-        message_label = ctk.CTkLabel(success, text=text, font=("Segoe UI", 12), text_color="white")
-        message_label.pack(padx=12, pady=8)
-
-        self.update_idletasks()
-        x = self.winfo_rootx() + self.winfo_width() - success.winfo_reqwidth() - 20
-        y = self.winfo_rooty() + self.winfo_height() - success.winfo_reqheight() - 20
-        success.geometry(f"+{x}+{y}")
-
-        steps = 25
-        interval = max(1, duration_ms // steps)
-        try:
-            success.attributes("-alpha", 0.95)
-        except tk.TclError:
-            # If the window vanished early, just stop.
-            return
-
-        def fade(step: int = steps) -> None:
-            """
-                Gradually fade out and destroy the `success` popup window.
-
-                This function reduces the window's alpha (opacity) in equal increments
-                until it becomes fully transparent, then destroys the window. It is
-                designed to be scheduled repeatedly using Tkinter's ``after`` method
-                until the fade-out animation completes.
-
-                Parameters
-                ----------
-                step : int, optional
-                    The number of remaining fade steps. Defaults to ``steps``, a preset
-                    total step count in the enclosing scope. Each call reduces this
-                    counter by 1.
-
-                Notes
-                -----
-                - The function first checks whether the window still exists and whether
-                  the fade should stop (``step <= 0``). If so, it destroys the window
-                  safely.
-                - Any ``tk.TclError`` exceptions (such as when the window is destroyed
-                  prematurely) are caught and ignored to avoid interrupting the GUI loop.
-                - Uses ``success.attributes("-alpha", value)`` to set opacity and
-                  schedules the next fade step with ``after(interval, fade, step - 1)``.
-            """
-            if step <= 0 or not success.winfo_exists():
-                try:
-                    success.destroy()
-                except tk.TclError:
-                    pass
-                return
-
-            try:
-                success.attributes("-alpha", step / steps)
-                success.after(interval, fade, step - 1)  # Supply *args explicitly
-            except tk.TclError:
-                # Widget was likely destroyed or unavailable; ignore quietly.
-                pass
-
-        fade()
-
-    def on_close(self):
-        """
-            Called when a window is closed—quits, destroys, and exits.
-        """
-        self.quit()
-        self.destroy()
-        exit(0)
-
-
-if __name__ == "__main__":
-    app = PyInstallerGUI()
-    app.mainloop()
+import os
+
+from typing import TYPE_CHECKING
+
+import tkinter as tk, customtkinter as ctk
+from tkinter import font as tkfont, filedialog, messagebox, simpledialog
+
+from build_cache import cache_directory
+from build_engine import (OPTIMIZATION_LEVELS, BuildTarget, DataEntry, assemble_command, pyinstaller_invoker,
+                          split_hidden_imports)
+from build_pipeline import BuildOptions
+from build_queue import BuildJob, BuildQueue
+from dist_packaging import PACKAGE_FORMATS
+from exclude_analysis import EXCLUDE_MODES
+from size_report import format_size_report, load_report
+from upx_policy import UPX_POLICIES
+from utility import place_help
+
+if TYPE_CHECKING:
+    from watch_mode import BuildWatcher     # Imported when watch mode is first used
+
+
+# Initialize CustomTkinter appearance (dark mode and theme accent)
+ctk.set_appearance_mode("Dark") # Dark mode for modern look
+ctk.set_default_color_theme("blue") # You can use "dark-blue" or others as needed
+
+LOG_FLUSH_INTERVAL_MS = 50  # How often queued build output is moved into the log widget
+LOG_MAX_LINES = 5000    # The log widget keeps only this many recent lines; the full log is on disk
+LOG_FILES_KEPT = 20     # Number of full build logs kept in the user cache
+BENCHMARK_RUNS = 5  # Cold and warm launches per startup benchmark
+BENCHMARK_TIMEOUT = 10  # Default seconds a benchmark launch may take to be ready (GUI apps rarely exit by themselves)
+SIZE_REPORT_ROWS = 40   # Packages and binaries listed in the size report window
+DEFAULT_PARALLEL_BUILDS = min(2, os.cpu_count() or 1)  # Builds the queue runs at the same time until changed
+
+
+def _globs(text: str | None) -> list[str]:
+    """
+        Split comma-separated glob patterns typed into a dialog (``None`` when it was cancelled).
+    """
+    return [pattern.strip() for pattern in (text or "").split(",") if pattern.strip()]
+
+
+class PyInstallerGUI(ctk.CTk):
+    def __init__(self):
+        """
+            Initialize the PyInstaller Builder GUI application.
+        """
+        super().__init__()
+        self.configure(fg_color="#1E1E1E")  # Forces the root window to a near-black
+        self.title("Universal PyInstaller Builder")
+        self.geometry("900x880")
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Variables for settings
+        self.entry_point = tk.StringVar()
+        self.executable_name = tk.StringVar()
+        self.hidden_imports = tk.StringVar()
+        self.icon = tk.StringVar()
+        self.output_directory = tk.StringVar(value="dist")
+        self.onefile_mode = tk.BooleanVar(value=True)
+        self.incremental_mode = tk.BooleanVar(value=False)
+        self.skip_up_to_date = tk.BooleanVar(value=True)
+        self.exclude_mode = tk.StringVar(value="off")
+        self.benchmark_startup = tk.BooleanVar(value=False)
+        self.ready_marker = tk.StringVar()  # Stdout text that means "started" for the benchmark
+        self.benchmark_timeout = tk.StringVar(value=str(BENCHMARK_TIMEOUT))
+        self.warm_worker = tk.BooleanVar(value=False)
+        self.analysis_cache = tk.BooleanVar(value=False)
+        self.fast_start = tk.BooleanVar(value=False)
+        self.stage_data = tk.BooleanVar(value=False)
+        self.compact = tk.BooleanVar(value=False)
+        self.optimization = tk.StringVar(value=OPTIMIZATION_LEVELS[0])
+        self.memory_limit = tk.StringVar()  # Resource limits of a build; empty for no limit
+        self.cpu_limit = tk.StringVar()
+        self.time_limit = tk.StringVar()
+        self.upx_mode = tk.StringVar(value="all")   # "off" or one of upx_policy.UPX_POLICIES
+        self.package_format = tk.StringVar(value="none")    # "none" or one of dist_packaging.PACKAGE_FORMATS
+        self.data_files = []  # List of data file specifications
+
+        self.entry_point_entry = None
+        self.executable_name_entry = None
+        self.data_listbox = None
+        self.hidden_imports_entry = None
+        self.icon_entry = None
+        self.output_directory_entry = None
+        self.onefile_check = None
+        self.incremental_check = None
+        self.skip_up_to_date_check = None
+        self.exclude_mode_menu = None
+        self.benchmark_check = None
+        self.ready_marker_entry = None
+        self.benchmark_timeout_entry = None
+        self.warm_worker_check = None
+        self.analysis_cache_check = None
+        self.fast_start_check = None
+        self.stage_data_check = None
+        self.compact_check = None
+        self.optimization_menu = None
+        self.limit_entries = None
+        self.upx_mode_menu = None
+        self.package_menu = None
+        self.build_button = None
+        self.parallel_builds_menu = None
+        self.watch_button = None
+        self.watch_status_label = None
+        self.queue_frame = None
+        self.log_text = None
+
+        # Builds run through a queue, each with its own work folders and log. Build output is queued by the build
+        # threads and moved into the widget in batches; the widget follows the selected job.
+        self.build_queue = BuildQueue(cache_directory() / "logs", concurrency=DEFAULT_PARALLEL_BUILDS,
+                                      logs_kept=LOG_FILES_KEPT)
+        self.parallel_builds = tk.StringVar(value=str(DEFAULT_PARALLEL_BUILDS))
+        self.selected_job: BuildJob | None = None
+        self._job_rows: dict[int, tuple[ctk.CTkFrame, ctk.CTkLabel, ctk.CTkButton]] = {}
+        self._reported_errors: set[int] = set()
+        self.watcher: "BuildWatcher | None" = None    # Rebuilds the watched settings on every change (watch mode)
+        self._log_line_count = 0
+        self._log_truncated = False
+
+        # Create GUI components
+        self.create_widgets()
+        self.after(LOG_FLUSH_INTERVAL_MS, self._flush_log)
+
+    def create_widgets(self):
+        """
+            Create and layout all the GUI widgets.
+        """
+        # Main container frame
+        main_frame = ctk.CTkFrame(self, fg_color="transparent")  # transparent uses window default dark bg
+        main_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        main_frame.grid_rowconfigure(17, weight=1)  # make the log section expandable (row index 17 below)
+        main_frame.grid_columnconfigure(0, weight=1)  # make content stretch horizontally
+
+        # Define fonts for section headers and field labels (for modern, readable text)
+        section_font = ("Segoe UI", 16, "bold")
+        label_font = ("Segoe UI", 14, "bold")
+
+        def selectable_title(row: int, text: str) -> ctk.CTkEntry:
+            """
+                Create and place a selectable, non-editable title entry.
+            """
+            pixel_width = tkfont.Font(font=section_font).measure(text) + 24 # Measure text width in pixels and add a bit of padding
+            pixel_width = max(pixel_width, 180) # Set a reasonable minimum so very short titles don’t look cramped
+
+            entry = ctk.CTkEntry(main_frame, width=pixel_width, border_width=0, fg_color="transparent",
+                text_color="white", font=section_font, corner_radius=0, justify="left")
+            entry.insert(0, text)
+            entry.configure(state="readonly")
+            entry.grid(row=row, column=0, sticky="w", pady=(5, 0))
+            entry.configure(cursor="xterm")  # normal text-selection cursor
+
+            return entry
+
+        # Entry Point section
+        selectable_title(0, "Entry Point")
+        place_help(main_frame, row=0, column=1, text="Select the main .py file where your program starts.")
+        entry_frame = ctk.CTkFrame(main_frame)
+        entry_frame.grid(row=1, column=0, sticky="ew", padx=5, pady=5)
+        entry_frame.grid_columnconfigure(1, weight=1)  # Make the entry field expand in this frame
+        ctk.CTkLabel(entry_frame, text="Main Python File:", font=label_font).grid(row=0, column=0, sticky="w")
+        self.entry_point_entry = ctk.CTkEntry(entry_frame, textvariable=self.entry_point)
+        self.entry_point_entry.grid(row=0, column=1, sticky="ew", padx=5)
+        ctk.CTkButton(entry_frame, text="Browse", command=self.browse_entry_point).grid(row=0, column=2, padx=5)
+
+        # Executable Name Section
+        selectable_title(2, "Executable Name")
+        place_help(main_frame, row=2, column=1, text="Specifies the name of the generated .exe.")
+        exe_frame = ctk.CTkFrame(main_frame)
+        exe_frame.grid(row=3, column=0, sticky="ew", padx=5, pady=5)
+        exe_frame.grid_columnconfigure(1, weight=1)
+        ctk.CTkLabel(exe_frame, text="Name:", font=label_font).grid(row=0, column=0, sticky="w")
+        self.executable_name_entry = ctk.CTkEntry(exe_frame, textvariable=self.executable_name)
+        self.executable_name_entry.grid(row=0, column=1, sticky="ew", padx=5)
+
+        # Additional Data Files section
+        selectable_title(4, "Additional Data Files")
+        place_help(main_frame, row=4, column=1, text="Include extra files/folders. A folder can be filtered with "
+                                                          "include/exclude globs. Filtered folders (all folders with "
+                                                          "\"Stage data folders\") are staged in your user cache "
+                                                          "without version-control folders and caches, storing each "
+                                                          "file's content once; one-dir builds link them into the app "
+                                                          "instead of copying them on every build.")
+        data_frame = ctk.CTkFrame(main_frame)
+        data_frame.grid(row=5, column=0, sticky="ew", padx=5, pady=5)
+        data_frame.grid_columnconfigure((0, 1, 2), weight=1)  # Distribute extra space across three columns
+        # Listbox for data files – using a standard tkinter Listbox, but styled to match dark theme
+        self.data_listbox = tk.Listbox(data_frame, height=5, selectmode=tk.SINGLE)
+        self.data_listbox.configure(background="#2B2B2B", foreground="white",
+                                    selectbackground="#3A9FBF", highlightthickness=0)
+        self.data_listbox.grid(row=0, column=0, columnspan=3, sticky="ew", padx=5, pady=5)
+        # Buttons for adding/removing data files
+        ctk.CTkButton(data_frame, text="Add File", command=self.add_data_file).grid(row=1, column=0, padx=5, pady=5)
+        ctk.CTkButton(data_frame, text="Add Folder", command=self.add_data_folder).grid(row=1, column=1, padx=5, pady=5)
+        ctk.CTkButton(data_frame, text="Remove Selected",
+                      command=self.remove_data_file).grid(row=1, column=2, padx=5, pady=5)
+        self.stage_data_check = ctk.CTkCheckBox(data_frame, text="Stage data folders", variable=self.stage_data)
+        self.stage_data_check.grid(row=2, column=0, columnspan=3, sticky="w", padx=5, pady=(0, 5))
+
+        # Hidden Imports Section
+        selectable_title(6, "Hidden Imports (comma-separated)")
+        place_help(main_frame, row=6, column=1,
+                        text="Specify modules not auto-detected (package_a.submodule, mypkg.utils, etc.).")
+        hidden_frame = ctk.CTkFrame(main_frame)
+        hidden_frame.grid(row=7, column=0, sticky="ew", padx=5, pady=5)
+        hidden_frame.grid_columnconfigure(0, weight=1)
+        self.hidden_imports_entry = ctk.CTkEntry(hidden_frame, textvariable=self.hidden_imports)
+        self.hidden_imports_entry.grid(row=0, column=0, sticky="ew", padx=5)
+
+        # Icon Selection Section
+        selectable_title(8, "Icon")
+        place_help(main_frame, row=8, column=1, text="Path to a .ico file to embed in your executable.")
+        icon_frame = ctk.CTkFrame(main_frame)
+        icon_frame.grid(row=9, column=0, sticky="ew", padx=5, pady=5)
+        icon_frame.grid_columnconfigure(1, weight=1)
+        ctk.CTkLabel(icon_frame, text="Icon File:", font=label_font).grid(row=0, column=0, sticky="w")
+        self.icon_entry = ctk.CTkEntry(icon_frame, textvariable=self.icon)
+        self.icon_entry.grid(row=0, column=1, sticky="ew", padx=5)
+        ctk.CTkButton(icon_frame, text="Browse", command=self.browse_icon).grid(row=0, column=2, padx=5)
+
+        # Output Directory Section
+        selectable_title(10, "Output Directory")
+        place_help(main_frame, row=10, column=1, text="Destination folder for build output. A build replaces "
+                                                           "the executable (or app folder) of the same name and writes "
+                                                           "its reports (<name>.size-report.json, ...) next to it; "
+                                                           "other files are left alone. The .spec file and work files "
+                                                           "go to a temporary folder, or to the user cache for "
+                                                           "incremental builds, never here.")
+        out_frame = ctk.CTkFrame(main_frame)
+        out_frame.grid(row=11, column=0, sticky="ew", padx=5, pady=5)
+        out_frame.grid_columnconfigure(1, weight=1)
+        ctk.CTkLabel(out_frame, text="Directory:", font=label_font).grid(row=0, column=0, sticky="w")
+        self.output_directory_entry = ctk.CTkEntry(out_frame, textvariable=self.output_directory)
+        self.output_directory_entry.grid(row=0, column=1, sticky="ew", padx=5)
+        ctk.CTkButton(out_frame, text="Browse", command=self.browse_output_directory).grid(row=0, column=2, padx=5)
+
+        # Options Section (One-file and incremental toggles)
+        options_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        options_frame.grid(row=12, column=0, sticky="w", padx=5, pady=5)
+        self.onefile_check = ctk.CTkCheckBox(options_frame, text="Build one-file executable",
+                                             variable=self.onefile_mode)
+        self.onefile_check.grid(row=0, column=0, sticky="w", padx=(0, 15))
+        self.incremental_check = ctk.CTkCheckBox(options_frame, text="Incremental build",
+                                                 variable=self.incremental_mode)
+        self.incremental_check.grid(row=0, column=1, sticky="w", padx=(0, 15))
+        self.skip_up_to_date_check = ctk.CTkCheckBox(options_frame, text="Skip if up to date",
+                                                     variable=self.skip_up_to_date)
+        self.skip_up_to_date_check.grid(row=0, column=2, sticky="w", padx=(0, 15))
+        self.warm_worker_check = ctk.CTkCheckBox(options_frame, text="Warm worker", variable=self.warm_worker)
+        self.warm_worker_check.grid(row=0, column=3, sticky="w")
+        ctk.CTkLabel(options_frame, text="Auto-exclude:").grid(row=1, column=0, sticky="w", pady=(5, 0))
+        self.exclude_mode_menu = ctk.CTkOptionMenu(options_frame, values=list(EXCLUDE_MODES), width=110,
+                                                   variable=self.exclude_mode)
+        self.exclude_mode_menu.grid(row=1, column=0, sticky="e", padx=(0, 15), pady=(5, 0))
+        self.benchmark_check = ctk.CTkCheckBox(options_frame, text="Benchmark startup",
+                                               variable=self.benchmark_startup)
+        self.benchmark_check.grid(row=1, column=1, sticky="w", padx=(0, 15), pady=(5, 0))
+        ctk.CTkLabel(options_frame, text="UPX:").grid(row=1, column=2, sticky="w", pady=(5, 0))
+        self.upx_mode_menu = ctk.CTkOptionMenu(options_frame, values=["off", *UPX_POLICIES], width=110,
+                                               variable=self.upx_mode)
+        self.upx_mode_menu.grid(row=1, column=2, sticky="e", padx=(0, 15), pady=(5, 0))
+        self.fast_start_check = ctk.CTkCheckBox(options_frame, text="Extraction folder (one-file)",
+                                                variable=self.fast_start)
+        self.fast_start_check.grid(row=1, column=3, sticky="w", pady=(5, 0))
+        ctk.CTkLabel(options_frame, text="Bytecode:").grid(row=2, column=0, sticky="w", pady=(5, 0))
+        self.optimization_menu = ctk.CTkOptionMenu(options_frame, values=list(OPTIMIZATION_LEVELS), width=110,
+                                                   variable=self.optimization)
+        self.optimization_menu.grid(row=2, column=0, sticky="e", padx=(0, 15), pady=(5, 0))
+        limits_frame = ctk.CTkFrame(options_frame, fg_color="transparent")
+        limits_frame.grid(row=2, column=1, columnspan=3, sticky="w", pady=(5, 0))
+        self.limit_entries = []
+        for column, (text, variable) in enumerate((("Memory limit (MB):", self.memory_limit),
+                                                   ("CPU limit (s):", self.cpu_limit),
+                                                   ("Time limit (s):", self.time_limit))):
+            ctk.CTkLabel(limits_frame, text=text).grid(row=0, column=2 * column, sticky="w", padx=(0, 5))
+            entry = ctk.CTkEntry(limits_frame, textvariable=variable, width=60)
+            entry.grid(row=0, column=2 * column + 1, sticky="w", padx=(0, 15))
+            self.limit_entries.append(entry)
+        self.analysis_cache_check = ctk.CTkCheckBox(options_frame, text="Analysis cache", variable=self.analysis_cache)
+        self.analysis_cache_check.grid(row=3, column=0, sticky="w", pady=(5, 0))
+        self.compact_check = ctk.CTkCheckBox(options_frame, text="Compact (one-dir)", variable=self.compact)
+        self.compact_check.grid(row=3, column=1, sticky="w", pady=(5, 0))
+        ctk.CTkLabel(options_frame, text="Package:").grid(row=3, column=2, sticky="w", pady=(5, 0))
+        self.package_menu = ctk.CTkOptionMenu(options_frame, values=["none", *PACKAGE_FORMATS], width=110,
+                                              variable=self.package_format)
+        self.package_menu.grid(row=3, column=2, sticky="e", padx=(0, 15), pady=(5, 0))
+        benchmark_frame = ctk.CTkFrame(options_frame, fg_color="transparent")
+        benchmark_frame.grid(row=4, column=0, columnspan=4, sticky="w", pady=(5, 0))
+        ctk.CTkLabel(benchmark_frame, text="Benchmark ready marker:").grid(row=0, column=0, sticky="w", padx=(0, 5))
+        self.ready_marker_entry = ctk.CTkEntry(benchmark_frame, textvariable=self.ready_marker, width=160)
+        self.ready_marker_entry.grid(row=0, column=1, sticky="w", padx=(0, 15))
+        ctk.CTkLabel(benchmark_frame, text="Launch timeout (s):").grid(row=0, column=2, sticky="w", padx=(0, 5))
+        self.benchmark_timeout_entry = ctk.CTkEntry(benchmark_frame, textvariable=self.benchmark_timeout, width=60)
+        self.benchmark_timeout_entry.grid(row=0, column=3, sticky="w")
+        place_help(main_frame, row=12, column=1, text="Choose single-file or folder build. Incremental builds keep "
+                                                           "PyInstaller's work folder per target in your user cache "
+                                                           "so unchanged steps are skipped next time. \"Skip if up to "
+                                                           "date\" does not build at all when the sources, data, icon, "
+                                                           "options and environment match the existing output. "
+                                                           "Auto-exclude compares the modules the last build bundled "
+                                                           "with the imports that run on every start and reports (or "
+                                                           "applies) --exclude-module for the rest. "
+                                                           "Benchmark startup launches the new executable several "
+                                                           "times and records its startup time and memory; each "
+                                                           "launch must be ready within the launch timeout: the app "
+                                                           "exits, prints the ready marker (not possible for windowed "
+                                                           "apps on Windows) or creates the file named by the "
+                                                           "UPB_BENCHMARK_READY_FILE environment variable. A first "
+                                                           "launch that times out stops the benchmark. UPX "
+                                                           "\"selective\" compresses only binaries where it measurably "
+                                                           "pays off and skips libraries known to break. Warm worker "
+                                                           "keeps PyInstaller loaded between builds, so rebuilds "
+                                                           "start faster. Extraction folder gives a one-file app its "
+                                                           "own extraction folder (in %LOCALAPPDATA% on Windows) and "
+                                                           "removes folders left behind by crashed runs; the app still "
+                                                           "extracts on every launch, so it starts no faster. "
+                                                           "Bytecode -O drops asserts, -OO also "
+                                                           "docstrings (breaks code that reads them); the log compares "
+                                                           "archive size and load time with the other levels. "
+                                                           "Memory, CPU and time limits (empty: none) stop a runaway "
+                                                           "PyInstaller with every process it started; memory and "
+                                                           "CPU are measured on Linux only. Analysis cache reuses "
+                                                           "hook results and binary dependency scans of earlier "
+                                                           "builds from the same environment until a package is "
+                                                           "installed or removed. Compact strips debug symbols from a "
+                                                           "one-dir app's libraries and hard-links identical copies. "
+                                                           "Package writes the finished app into a zip (or tar.zst, "
+                                                           "with the zstandard package) next to it, with a SHA-256 "
+                                                           "manifest of its files.")
+
+        # Build Button (adds a job to the queue) and queue settings
+        build_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        build_frame.grid(row=13, column=0, pady=10)
+        self.build_button = ctk.CTkButton(build_frame, text="Build Executable", command=self.build_executable)
+        self.build_button.grid(row=0, column=0, padx=(0, 25))
+        ctk.CTkLabel(build_frame, text="Parallel builds:").grid(row=0, column=1, padx=(0, 5))
+        self.parallel_builds_menu = ctk.CTkOptionMenu(build_frame, width=70, variable=self.parallel_builds,
+                                                      values=[str(count) for count in range(1, (os.cpu_count() or 1) + 1)],
+                                                      command=self.set_parallel_builds)
+        self.parallel_builds_menu.grid(row=0, column=2)
+        self.watch_button = ctk.CTkButton(build_frame, text="Watch", width=110, command=self.toggle_watch)
+        self.watch_button.grid(row=0, column=3, padx=(25, 0))
+        self.watch_status_label = ctk.CTkLabel(build_frame, text="")
+        self.watch_status_label.grid(row=1, column=0, columnspan=4)
+
+        # Build Queue
+        selectable_title(14, "Build Queue")
+        place_help(main_frame, row=14, column=1, text="Every click on Build Executable adds a job with the current "
+                                                           "settings. Jobs run side by side up to the parallel build "
+                                                           "limit, each in its own temporary work folder. Click a job "
+                                                           "to show its log; Cancel stops it together with every "
+                                                           "process it started. Watch rebuilds the current settings "
+                                                           "whenever the entry script, a local module it imports or a "
+                                                           "data file changes, cancelling a build made obsolete.")
+        ctk.CTkButton(main_frame, text="Clear finished", width=110,
+                      command=self.clear_finished_jobs).grid(row=14, column=0, padx=(6, 25), pady=(5, 0), sticky="e")
+        self.queue_frame = ctk.CTkScrollableFrame(main_frame, height=90)
+        self.queue_frame.grid(row=15, column=0, sticky="ew", padx=5, pady=5)
+        self.queue_frame.grid_columnconfigure(0, weight=1)
+
+        # Build Log Output
+        selectable_title(16, "Build Log")
+        place_help(main_frame, row=16, column=1, text="Displays real-time output from PyInstaller for the selected "
+                                                           "job. Size report shows which packages and binaries make up "
+                                                           "the last build.")
+        # Copy log and size report buttons on the same row, right side
+        ctk.CTkButton(main_frame, text="Copy log", width=110, command=self.copy_log).grid(row=16, column=0, padx=(6, 25),
+                                                                                          pady=(5, 0), sticky="e")
+        ctk.CTkButton(main_frame, text="Size report", width=110,
+                      command=self.show_size_report).grid(row=16, column=0, padx=(6, 145), pady=(5, 0), sticky="e")
+        # Text box for log output. CTkTextbox provides a scrollbar automatically in customtkinter >=5
+        self.log_text = ctk.CTkTextbox(main_frame, height=180)
+        self.log_text.grid(row=17, column=0, sticky="nsew", padx=5, pady=5)
+        self.log_text.configure(state="disabled")  # Start as read-only
+
+    def browse_entry_point(self):
+        """
+            Browse and select the main Python entry point file.
+        """
+        file_path = filedialog.askopenfilename(filetypes=[("Python Files", "*.py")])
+        if file_path:
+            self.entry_point.set(file_path)
+
+    def add_data_file(self):
+        """
+            Add a data file to include in the build.
+        """
+        file_path = filedialog.askopenfilename()
+        if file_path:
+            destination = simpledialog.askstring("Destination",
+                                                 f"Enter destination folder for {os.path.basename(file_path)} (relative to executable):",
+                                                 initialvalue=".")
+            if destination is None:
+                destination = "."
+            specification = f"{file_path};{destination}"
+            self.data_files.append(specification)
+            self.data_listbox.insert(tk.END, specification)
+
+    def add_data_folder(self):
+        """
+            Add a data folder to include in the build.
+        """
+        folder_path = filedialog.askdirectory()
+        if folder_path:
+            destination = simpledialog.askstring("Destination",
+                                                 f"Enter destination folder for {os.path.basename(folder_path)} (relative to executable):",
+                                                 initialvalue=os.path.basename(folder_path))
+            if destination is None:
+                destination = os.path.basename(folder_path)
+
+            include = simpledialog.askstring("Include", "Include only files matching (comma-separated globs such as "
+                                                        "*.png, levels/*; empty for all files):", initialvalue="")
+            exclude = simpledialog.askstring("Exclude", "Exclude files matching (comma-separated globs such as *.psd, "
+                                                        "raw/*; version-control folders and caches are always left "
+                                                        "out of filtered folders):", initialvalue="")
+            entry = DataEntry(source=f"{folder_path}{os.sep}", destination=destination,  # os.sep indicates a folder
+                              include=_globs(include), exclude=_globs(exclude))
+            specification = entry.specification()
+            self.data_files.append(specification)
+            self.data_listbox.insert(tk.END, specification)
+
+    def remove_data_file(self):
+        """
+            Remove the selected data file or folder from the list.
+        """
+        selected = self.data_listbox.curselection()
+        if selected:
+            index = selected[0]
+            self.data_listbox.delete(index)
+            del self.data_files[index]
+
+    def browse_icon(self):
+        """
+            Browse and select an icon file.
+        """
+        file_path = filedialog.askopenfilename(filetypes=[("Icon Files", "*.ico"), ("All Files", "*.*")])
+        if file_path:
+            self.icon.set(file_path)
+
+    def browse_output_directory(self):
+        """
+            Browse and select an output directory.
+        """
+        directory = filedialog.askdirectory()
+        if directory:
+            self.output_directory.set(directory)
+
+    def append_log(self, text: str):
+        """
+            Insert into the read-only log, dropping the oldest lines beyond ``LOG_MAX_LINES``.
+        """
+        self.log_text.configure(state=tk.NORMAL)
+        self.log_text.insert(tk.END, text)
+        self._log_line_count += text.count("\n")
+        if self._log_line_count > LOG_MAX_LINES:
+            excess = self._log_line_count - LOG_MAX_LINES
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self._log_line_count = LOG_MAX_LINES
+            self._log_truncated = True
+        self.log_text.see(tk.END)
+        self.log_text.configure(state=tk.DISABLED)
+
+    def clear_log(self):
+        """
+            Empty the log widget.
+        """
+        self.log_text.configure(state=tk.NORMAL)
+        self.log_text.delete("1.0", tk.END)
+        self.log_text.configure(state=tk.DISABLED)
+        self._log_line_count = 0
+        self._log_truncated = False
+
+    def _flush_log(self):
+        """
+            Move queued build output into the log widget in one batch, refresh the queue, then reschedule itself.
+
+            Draining is time-sliced by each job's sink so a very chatty build cannot starve the event loop.
+            Output of jobs that are not selected is dropped here; it is in their log files.
+        """
+        for job in list(self.build_queue.jobs):
+            text = job.log.drain()
+            if text and job is self.selected_job:
+                self.append_log(text)
+        if self.watcher is not None:
+            if self.watcher.job is not None and self.watcher.job is not self.selected_job \
+                    and self.watcher.job in self.build_queue.jobs:
+                self.select_job(self.watcher.job)   # Follow the latest watch build
+            self.watch_status_label.configure(text=f"Watching {self.watcher.target.name}: {self.watcher.status}")
+        self._refresh_queue()
+        self.after(LOG_FLUSH_INTERVAL_MS, self._flush_log)
+
+    def select_job(self, job: BuildJob):
+        """
+            Show *job*'s log in the log widget: what it has written so far (from its log file), then live output.
+        """
+        self.selected_job = job
+        self.clear_log()
+        size = job.log.snapshot()   # Queued text up to here is in the file; later text is only queued
+        log_path = job.log.log_path
+        if log_path and log_path.is_file():
+            with open(log_path, "rb") as file:
+                text = file.read(size).decode("utf-8", errors="replace")
+            lines = text.splitlines(keepends=True)
+            self._log_truncated = len(lines) > LOG_MAX_LINES
+            self.append_log("".join(lines[-LOG_MAX_LINES:]))
+        else:
+            self.append_log("Waiting for a free build slot...\n")
+        self._refresh_queue()
+
+    def _refresh_queue(self):
+        """
+            Keep one row per job (state, progress, elapsed time, CPU and memory use and a Cancel button) in the
+            queue list.
+        """
+        jobs = {job.number: job for job in self.build_queue.jobs}
+        for number in [number for number in self._job_rows if number not in jobs]:
+            self._job_rows.pop(number)[0].destroy()
+
+        for job in jobs.values():
+            if job.number not in self._job_rows:
+                row = ctk.CTkFrame(self.queue_frame)
+                row.grid(row=job.number, column=0, sticky="ew", pady=1)
+                row.grid_columnconfigure(0, weight=1)
+                label = ctk.CTkLabel(row, anchor="w", cursor="hand2")
+                label.grid(row=0, column=0, sticky="ew", padx=5)
+                label.bind("<Button-1>", lambda _event, selected=job: self.select_job(selected))
+                cancel = ctk.CTkButton(row, text="Cancel", width=70, command=lambda chosen=job: self.cancel_job(chosen))
+                cancel.grid(row=0, column=1, padx=5)
+                self._job_rows[job.number] = (row, label, cancel)
+
+            row, label, cancel = self._job_rows[job.number]
+            elapsed = f" - {job.seconds:.0f} s" if job.started is not None else ""
+            resources = f" - {job.resources.describe()}" if job.resources is not None and not job.done else ""
+            label.configure(text=f"#{job.number}  {job.target.name}  [{job.state}]  {job.progress}{elapsed}{resources}")
+            row.configure(fg_color="#3A3A3A" if job is self.selected_job else "transparent")
+            if job.done and cancel.cget("state") != "disabled":
+                cancel.configure(state="disabled")
+
+            if job.error and job.number not in self._reported_errors:
+                self._reported_errors.add(job.number)
+                messagebox.showerror("Build Error", f"{job.target.name}: {job.error}")
+
+    def cancel_job(self, job: BuildJob):
+        """
+            Cancel a queued or running job (a running build is killed together with all of its processes).
+        """
+        self.build_queue.cancel(job)
+        self._refresh_queue()
+
+    def clear_finished_jobs(self):
+        """
+            Remove finished jobs from the queue list.
+        """
+        self.build_queue.clear_finished()
+        if self.selected_job is not None and self.selected_job.done:
+            self.selected_job = None
+            self.clear_log()
+        self._refresh_queue()
+
+    def set_parallel_builds(self, value: str):
+        """
+            Change how many queued builds may run at the same time.
+        """
+        self.build_queue.concurrency = int(value)
+
+    def _pyinstaller_invoker(self) -> list[str]:
+        """
+            Resolve the exact command used to invoke PyInstaller for the current entry point.
+
+            See :func:`build_engine.pyinstaller_invoker` for the search order.
+        """
+        return pyinstaller_invoker(self.entry_point.get())
+
+    def build_target(self) -> BuildTarget:
+        """
+            Collect the current GUI settings into a :class:`build_engine.BuildTarget`.
+        """
+        return BuildTarget(entry_point=self.entry_point.get(), executable_name=self.executable_name.get(),
+                           hidden_imports=split_hidden_imports(self.hidden_imports.get()), icon=self.icon.get(),
+                           output_directory=self.output_directory.get(), onefile=self.onefile_mode.get(),
+                           data_files=list(self.data_files), exclude_mode=self.exclude_mode.get(),
+                           fast_start=self.fast_start.get(), stage_data=self.stage_data.get(),
+                           compact=self.compact.get(),
+                           package=self.package_format.get() if self.package_format.get() != "none" else "",
+                           optimize=OPTIMIZATION_LEVELS.index(self.optimization.get()),
+                           upx=self.upx_mode.get() != "off",
+                           upx_policy=self.upx_mode.get() if self.upx_mode.get() != "off" else "all")
+
+    def assemble_commands(self) -> list[str] | None:
+        """
+            Build the full PyInstaller command list based on the current GUI settings.
+
+            This method collects the user-specified build options from the GUI
+            (entry point, build mode, output directory, hidden imports, data files, icon, etc.)
+            and assembles them with :func:`build_engine.assemble_command`.
+
+            If no entry point or output directory is set, an error dialog is scheduled on
+            the main thread and the method returns ``None``.
+
+            Returns
+            -------
+            list[str] | None
+                A list of strings representing the PyInstaller command-line arguments,
+                or ``None`` if the settings are incomplete.
+        """
+        try:
+            return assemble_command(self.build_target())
+        except ValueError as error:
+            self.after(0, messagebox.showerror, "Error", str(error))
+            return None
+
+    def resource_limits(self) -> dict | None:
+        """
+            Return the resource limits as :class:`build_pipeline.BuildOptions` fields, or ``None`` after showing an
+            error if one is not a positive number.
+        """
+        limits = {}
+        for field_name, label, variable in (("memory_limit_mb", "Memory limit", self.memory_limit),
+                                            ("cpu_limit_seconds", "CPU limit", self.cpu_limit),
+                                            ("time_limit_seconds", "Time limit", self.time_limit)):
+            text = variable.get().strip()
+            try:
+                value = float(text) if text else 0
+            except ValueError:
+                value = -1
+            if value < 0:
+                messagebox.showerror("Error", f"{label} must be a positive number (or empty for no limit).")
+                return None
+            limits[field_name] = int(value) if field_name == "memory_limit_mb" else value
+        return limits
+
+    def benchmark_options(self) -> dict | None:
+        """
+            Return the startup benchmark settings as :class:`build_pipeline.BuildOptions` fields, or ``None`` after
+            showing an error if the launch timeout is not a positive number.
+        """
+        if not self.benchmark_startup.get():
+            return {"benchmark_runs": 0}
+        try:
+            timeout = float(self.benchmark_timeout.get().strip())
+        except ValueError:
+            timeout = 0
+        if timeout <= 0:
+            messagebox.showerror("Error", "Launch timeout must be a positive number of seconds.")
+            return None
+        return {"benchmark_runs": BENCHMARK_RUNS, "ready_marker": self.ready_marker.get().strip(),
+                "benchmark_timeout": timeout}
+
+    def build_executable(self):
+        """
+            Queue a build of the current settings and show its log.
+
+            The settings are copied into the job, so they can be changed (and more builds queued) right away.
+        """
+        if not self.entry_point.get():
+            messagebox.showerror("Error", "Please select an entry point file.")
+            return
+        if self.assemble_commands() is None:
+            return  # The error dialog is already scheduled
+        limits, benchmark = self.resource_limits(), self.benchmark_options()
+        if limits is None or benchmark is None:
+            return
+
+        options = BuildOptions(incremental=self.incremental_mode.get(), skip_up_to_date=self.skip_up_to_date.get(),
+                               warm_worker=self.warm_worker.get(), analysis_cache=self.analysis_cache.get(),
+                               **limits, **benchmark)
+        self.select_job(self.build_queue.submit(self.build_target(), options))
+
+    def toggle_watch(self):
+        """
+            Start watch mode with the current settings, or stop it.
+
+            While watching, every change to the entry script, the project modules it imports, the data files or
+            the icon queues an incremental build (see :class:`watch_mode.BuildWatcher`). Settings changed in the
+            window only take effect when watching is restarted.
+        """
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.watch_button.configure(text="Watch")
+            self.watch_status_label.configure(text="")
+            return
+        if not self.entry_point.get():
+            messagebox.showerror("Error", "Please select an entry point file.")
+            return
+        if self.assemble_commands() is None:
+            return
+        limits, benchmark = self.resource_limits(), self.benchmark_options()
+        if limits is None or benchmark is None:
+            return
+
+        from watch_mode import BuildWatcher
+
+        options = BuildOptions(warm_worker=self.warm_worker.get(), analysis_cache=self.analysis_cache.get(),
+                               **limits, **benchmark)
+        self.watcher = BuildWatcher(self.build_queue, self.build_target(), options)
+        self.watcher.start()
+        self.watch_button.configure(text="Stop watching")
+
+    def copy_log(self):
+        """
+            Copy the build log text to the clipboard.
+
+            If the widget has dropped old lines, the complete log of the selected build is copied from disk instead.
+        """
+        try:
+            log_path = self.selected_job.log.log_path if self.selected_job else None
+            if self._log_truncated and log_path and log_path.is_file():
+                self.selected_job.log.flush()
+                text = log_path.read_text(encoding="utf-8", errors="replace")
+            else:
+                text = self.log_text.get("1.0", "end-1c")
+            self.clipboard_clear()
+            self.clipboard_append(text)
+            self.update_idletasks() # Ensure the clipboard is actually updated on Windows
+            self._show_success_message("Build log copied to clipboard.")    # Confirmation message
+
+        except Exception as e:
+            messagebox.showerror("Copy failed", str(e))
+
+    def show_size_report(self):
+        """
+            Open a window with the ranked package and binary sizes of the last build of the current target.
+        """
+        target = self.build_target()
+        report = load_report(target) if self.entry_point.get() else None
+        if report is None:
+            messagebox.showinfo("Size report", f"No size report for {target.name} yet. Build it first.")
+            return
+
+        window = ctk.CTkToplevel(self)
+        window.title(f"Bundle size - {report.target}")
+        window.geometry("760x520")
+        text = ctk.CTkTextbox(window, font=("Consolas", 12), wrap="none")
+        text.pack(fill="both", expand=True, padx=10, pady=10)
+        text.insert("1.0", f"{report.artifact} ({report.timestamp})\n\n" + format_size_report(report, SIZE_REPORT_ROWS))
+        text.configure(state="disabled")
+        window.after(100, window.lift)  # CTkToplevel may open behind the main window on Windows
+
+    def _show_success_message(self, text: str, duration_ms: int = 10000):
+        """
+            Small fade-out popup near the bottom-right of the window.
+        """
+        success = ctk.CTkToplevel(self)
+        success.overrideredirect(True)
+        success.attributes("-topmost", True)
+        success.configure(fg_color="#2B2B2B")
+        message_label = ctk.CTkLabel(success, text=text, font=("Segoe UI", 12), text_color="white")
+        message_label.pack(padx=12, pady=8)
+
+        self.update_idletasks()
+        x = self.winfo_rootx() + self.winfo_width() - success.winfo_reqwidth() - 20
+        y = self.winfo_rooty() + self.winfo_height() - success.winfo_reqheight() - 20
+        success.geometry(f"+{x}+{y}")
+
+        steps = 25
+        interval = max(1, duration_ms // steps)
+        try:
+            success.attributes("-alpha", 0.95)
+        except tk.TclError:
+            # If the window vanished early, just stop.
+            return
+
+        def fade(step: int = steps) -> None:
+            """
+                Gradually fade out and destroy the `success` popup window.
+
+                This function reduces the window's alpha (opacity) in equal increments
+                until it becomes fully transparent, then destroys the window. It is
+                designed to be scheduled repeatedly using Tkinter's ``after`` method
+                until the fade-out animation completes.
+
+                Parameters
+                ----------
+                step : int, optional
+                    The number of remaining fade steps. Defaults to ``steps``, a preset
+                    total step count in the enclosing scope. Each call reduces this
+                    counter by 1.
+
+                Notes
+                -----
+                - The function first checks whether the window still exists and whether
+                  the fade should stop (``step <= 0``). If so, it destroys the window
+                  safely.
+                - Any ``tk.TclError`` exceptions (such as when the window is destroyed
+                  prematurely) are caught and ignored to avoid interrupting the GUI loop.
+                - Uses ``success.attributes("-alpha", value)`` to set opacity and
+                  schedules the next fade step with ``after(interval, fade, step - 1)``.
+            """
+            if step <= 0 or not success.winfo_exists():
+                try:
+                    success.destroy()
+                except tk.TclError:
+                    pass
+                return
+
+            try:
+                success.attributes("-alpha", step / steps)
+                success.after(interval, fade, step - 1)  # Supply *args explicitly
+            except tk.TclError:
+                # Widget was likely destroyed or unavailable; ignore quietly.
+                pass
+
+        fade()
+
+    def on_close(self):
+        """
+            Called when a window is closed—cancels running builds, quits, destroys, and exits.
+        """
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.build_queue.cancel_all()
+        self.quit()
+        self.destroy()
+        exit(0)
+
+
+if __name__ == "__main__":
+    app = PyInstallerGUI()
+    app.mainloop()
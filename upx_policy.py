@@ -0,0 +1,324 @@
+import json, os, shutil, subprocess, sys
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from threading import Lock
+
+from build_cache import cache_directory
+from build_engine import BuildTarget
+from build_fingerprint import file_digest
+from size_report import BundleEntry
+
+
+UPX_POLICIES = ("all", "selective")
+UPX_PROFILES_FILE = "upx-profiles.json"
+UPX_CACHE_DIRECTORY = "upx"
+UPX_REPORT_SUFFIX = ".upx.json"
+MINIMUM_BYTES = 256 * 1024  # Smaller binaries are never worth a decompression stub
+MINIMUM_SAVING = 0.10   # Compress only when UPX removes at least this fraction of the file
+MAXIMUM_MS_PER_MB = 2.0     # Accept at most this much extra load time per megabyte saved
+LOAD_ROUNDS = 3     # Fresh probe processes per variant; the fastest load of each binary counts
+
+# Libraries that are commonly reported to break, lose their code signature/CFG protection or slow every start
+# when UPX-compressed. Matched against the file name, like PyInstaller's --upx-exclude.
+KNOWN_BAD = (
+    "vcruntime*.dll", "msvcp*.dll", "ucrtbase.dll", "api-ms-win-*.dll", "python3*.dll", "libpython3*",
+    "Qt*.dll", "libQt*", "libcrypto*", "libssl*", "cv2*", "libopenblas*", "libgfortran*", "mkl_*", "cudart*",
+    "libcuda*", "torch_*",
+)
+
+# Loads each binary given on the command line with ctypes and prints the load time in milliseconds (or null)
+_LOAD_PROBE = (
+    "import ctypes, json, sys, time\n"
+    "times = []\n"
+    "for path in sys.argv[1:]:\n"
+    "    started = time.perf_counter()\n"
+    "    try:\n"
+    "        ctypes.CDLL(path); times.append((time.perf_counter() - started) * 1000)\n"
+    "    except OSError:\n"
+    "        times.append(None)\n"
+    "print(json.dumps(times))\n"
+)
+
+_lock = Lock()
+
+
+@dataclass
+class BinaryProfile:
+    """
+        Measured UPX trade-off of one binary (cached per file content and UPX build).
+    """
+    name: str
+    bytes: int
+    compressed_bytes: int | None    # None when UPX refused the file
+    load_ms: float | None   # Time to load the original on its own; None if it cannot be loaded standalone
+    compressed_load_ms: float | None
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.bytes - self.compressed_bytes if self.compressed_bytes is not None else 0
+
+    @property
+    def extra_load_ms(self) -> float | None:
+        if self.load_ms is None or self.compressed_load_ms is None:
+            return None
+        return self.compressed_load_ms - self.load_ms
+
+
+@dataclass
+class UpxDecision:
+    """
+        Whether one binary is compressed, and why.
+    """
+    name: str   # Destination inside the bundle
+    compress: bool
+    reason: str
+    bytes: int
+    saved_bytes: int = 0
+    extra_load_ms: float | None = None
+
+
+def is_known_bad(name: str) -> bool:
+    """
+        Return whether a binary matches :data:`KNOWN_BAD`.
+    """
+    file_name = Path(name).name
+    return any(fnmatch(file_name, pattern) for pattern in KNOWN_BAD)
+
+
+def _upx_command(upx: str, path: Path) -> list[str]:
+    """
+        The UPX invocation PyInstaller itself uses, so measurements match what a build would produce.
+    """
+    return [upx, "--compress-icons=0", "--lzma", "-q", *(["--strip-loadconf"] if os.name == "nt" else []), str(path)]
+
+
+def _profiles_file() -> Path:
+    return cache_directory() / UPX_PROFILES_FILE
+
+
+def _load_profiles() -> dict[str, dict]:
+    try:
+        return json.loads(_profiles_file().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_profiles(profiles: dict[str, dict]) -> None:
+    path = _profiles_file()
+    temporary = path.with_name(path.name + f".{os.getpid()}.tmp")
+    try:
+        temporary.write_text(json.dumps(profiles, indent=2), encoding="utf-8")
+        os.replace(temporary, path)
+    except OSError:
+        temporary.unlink(missing_ok=True)
+
+
+def _profile_key(source: Path, upx: str) -> str:
+    """
+        Identify a binary by its contents and the UPX build that compresses it.
+    """
+    stat = os.stat(upx)
+    return f"{file_digest(source)[:32]}-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def _compressed_copy(key: str, source: Path) -> Path:
+    """
+        Where the UPX-compressed copy of a binary is kept (the original file name, so loaders see the same name).
+    """
+    return cache_directory() / UPX_CACHE_DIRECTORY / key / source.name
+
+
+def _compress(upx: str, key: str, source: Path) -> int | None:
+    """
+        Compress a copy of *source* into the cache and return its size, or ``None`` if UPX refuses it.
+    """
+    copy = _compressed_copy(key, source)
+    copy.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, copy)
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    result = subprocess.run(_upx_command(upx, copy), stdin=subprocess.DEVNULL, capture_output=True,
+                            creationflags=creationflags)
+    if result.returncode != 0:
+        shutil.rmtree(copy.parent, ignore_errors=True)
+        return None
+    return copy.stat().st_size
+
+
+def _load_times(python: str, paths: list[Path]) -> list[float | None]:
+    """
+        Load every binary in fresh probe processes and return the fastest load time of each.
+    """
+    if not paths:
+        return []
+    best: list[float | None] = [None] * len(paths)
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    for _ in range(LOAD_ROUNDS):
+        try:
+            output = subprocess.run([python, "-c", _LOAD_PROBE, *map(str, paths)], capture_output=True, text=True,
+                                    timeout=120, creationflags=creationflags).stdout
+            times = json.loads(output)
+        except (OSError, subprocess.SubprocessError, ValueError):
+            break
+        for index, milliseconds in enumerate(times):
+            if milliseconds is not None and (best[index] is None or milliseconds < best[index]):
+                best[index] = milliseconds
+    return best
+
+
+def profile_binaries(binaries: list[BundleEntry], upx: str, python: str | None = None,
+                     jobs: int | None = None) -> dict[str, BinaryProfile]:
+    """
+        Measure what UPX saves and costs for every binary, compressing the new ones in parallel.
+
+        Each binary is compressed once per content and UPX build; the compressed copy and the profile are
+        kept in the user cache, so later builds (and :func:`apply_plan`) reuse them. Load times are
+        measured by loading the original and the compressed file with ``ctypes`` in fresh processes of
+        *python* (the build interpreter), which is how the bundled app will load them.
+
+        Parameters
+        ----------
+        binaries : list[BundleEntry]
+            Extensions and shared libraries of a bundle (see :mod:`size_report`).
+        upx : str
+            Path of the ``upx`` executable.
+        python : str | None
+            Interpreter for the load probes; this interpreter when ``None``.
+        jobs : int | None
+            Parallel UPX processes; one per CPU core by default.
+
+        Returns
+        -------
+        dict[str, BinaryProfile]
+            Profiles by bundle destination name.
+    """
+    with _lock:
+        cached = _load_profiles()
+
+    keys = {entry.name: _profile_key(Path(entry.source), upx) for entry in binaries}
+
+    def is_missing(entry: BundleEntry) -> bool:
+        """
+            Return whether a binary needs profiling (never seen, or its compressed copy was deleted).
+        """
+        known = cached.get(keys[entry.name])
+        return known is None or known["compressed_bytes"] is not None and \
+            not _compressed_copy(keys[entry.name], Path(entry.source)).is_file()
+
+    missing = [entry for entry in binaries if is_missing(entry)]
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+            sizes = list(pool.map(lambda entry: _compress(upx, keys[entry.name], Path(entry.source)), missing))
+        compressed = [_compressed_copy(keys[entry.name], Path(entry.source))
+                      for entry, size in zip(missing, sizes) if size is not None]
+        original_times = _load_times(python or sys.executable, [Path(entry.source) for entry in missing])
+        compressed_times = iter(_load_times(python or sys.executable, compressed))
+        for entry, size, load_ms in zip(missing, sizes, original_times):
+            profile = BinaryProfile(name=entry.name, bytes=entry.bytes, compressed_bytes=size, load_ms=load_ms,
+                                    compressed_load_ms=next(compressed_times) if size is not None else None)
+            cached[keys[entry.name]] = asdict(profile)
+        with _lock:
+            _save_profiles({**_load_profiles(), **cached})
+
+    return {entry.name: BinaryProfile(**{**cached[keys[entry.name]], "name": entry.name}) for entry in binaries}
+
+
+def decide(entry: BundleEntry, profile: BinaryProfile | None) -> UpxDecision:
+    """
+        Apply the selective policy to one binary.
+    """
+    decision = lambda compress, reason: UpxDecision(
+        name=entry.name, compress=compress, reason=reason, bytes=entry.bytes,
+        saved_bytes=profile.saved_bytes if profile else 0, extra_load_ms=profile.extra_load_ms if profile else None)
+
+    if is_known_bad(entry.name):
+        return decision(False, "known to break or slow down when compressed")
+    if entry.bytes < MINIMUM_BYTES:
+        return decision(False, f"smaller than {MINIMUM_BYTES // 1024} KB")
+    if profile is None:
+        return decision(True, "not measured")
+    if profile.compressed_bytes is None:
+        return decision(False, "UPX cannot compress it")
+    if profile.load_ms is not None and profile.compressed_load_ms is None:
+        return decision(False, "fails to load when compressed")
+    if profile.saved_bytes < MINIMUM_SAVING * entry.bytes:
+        return decision(False, f"saves less than {MINIMUM_SAVING:.0%}")
+    saved_megabytes = profile.saved_bytes / (1024 * 1024)
+    if profile.extra_load_ms is not None and profile.extra_load_ms > MAXIMUM_MS_PER_MB * saved_megabytes:
+        return decision(False, f"+{profile.extra_load_ms:.1f} ms load time for {saved_megabytes:.2f} MB saved")
+    return decision(True, f"saves {saved_megabytes:.2f} MB")
+
+
+def plan_compression(binaries: list[BundleEntry], upx: str, python: str | None = None) -> list[UpxDecision]:
+    """
+        Decide, binary by binary, whether UPX compression pays off; largest binaries first.
+
+        Known-bad libraries and files below :data:`MINIMUM_BYTES` are never compressed. The rest are
+        profiled (see :func:`profile_binaries`) and compressed only when UPX removes at least
+        :data:`MINIMUM_SAVING` of the file, the compressed file still loads, and the extra load time
+        stays within :data:`MAXIMUM_MS_PER_MB` per megabyte saved.
+    """
+    candidates = [entry for entry in binaries if not is_known_bad(entry.name) and entry.bytes >= MINIMUM_BYTES]
+    profiles = profile_binaries(candidates, upx, python)
+    return sorted((decide(entry, profiles.get(entry.name)) for entry in binaries), key=lambda item: -item.bytes)
+
+
+def upx_exclude_names(decisions: list[UpxDecision]) -> list[str]:
+    """
+        Return ``--upx-exclude`` patterns for PyInstaller: the known-bad list plus every binary not to compress.
+    """
+    names = [Path(decision.name).name for decision in decisions if not decision.compress]
+    return sorted({*KNOWN_BAD, *names})
+
+
+def apply_plan(target: BuildTarget, binaries: list[BundleEntry], decisions: list[UpxDecision], upx: str) -> int:
+    """
+        Replace the chosen binaries of a finished one-dir build by their compressed copies; return the bytes saved.
+
+        The copies were made (in parallel) by :func:`profile_binaries`, so this step only copies files.
+    """
+    sources = {entry.name: entry for entry in binaries}
+    saved = 0
+    for decision in decisions:
+        entry = sources.get(decision.name)
+        if not decision.compress or entry is None:
+            continue
+        copy = _compressed_copy(_profile_key(Path(entry.source), upx), Path(entry.source))
+        destination = next((path for path in (target.artifact / "_internal" / entry.name, target.artifact / entry.name)
+                            if path.is_file()), None)
+        if destination is None or not copy.is_file():
+            continue
+        before = destination.stat().st_size
+        shutil.copyfile(copy, destination)
+        saved += before - destination.stat().st_size
+    return saved
+
+
+def write_decisions(target: BuildTarget, decisions: list[UpxDecision]) -> Path:
+    """
+        Store the per-binary decisions next to the artifact (``<output>/<name>.upx.json``).
+    """
+    path = Path(target.output_directory) / f"{target.name}{UPX_REPORT_SUFFIX}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps([asdict(decision) for decision in decisions], indent=2), encoding="utf-8")
+    return path
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.2f} MB"
+
+
+def format_decisions(decisions: list[UpxDecision], limit: int = 15) -> str:
+    """
+        Render the largest decisions for the build log.
+    """
+    chosen = [decision for decision in decisions if decision.compress]
+    lines = [f"Selective UPX: compressing {len(chosen)} of {len(decisions)} binaries, saving "
+             f"{_megabytes(sum(decision.saved_bytes for decision in chosen))}."]
+    for decision in decisions[:limit]:
+        lines.append(f"  {'upx ' if decision.compress else 'skip'}  {_megabytes(decision.bytes):>10}  "
+                     f"{decision.name}: {decision.reason}")
+    return "\n".join(lines) + "\n"
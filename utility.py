@@ -1,19 +1,37 @@
-import customtkinter as ctk
+from functools import cache
+from typing import TYPE_CHECKING
 
-from pathlib import Path
-from shutil import rmtree
+if TYPE_CHECKING:
+    from tkinter import Misc
 
-from tkinter import Misc
-from CTkToolTip import CTkToolTip
 
+@cache
+def _tooltip_class() -> type:
+    """
+        Return the tooltip class, importing CTkToolTip on first use so that importing this module stays cheap.
+
+        The subclass adds no-op handlers for the scaling tracker's calls, which CTkToolTip lacks:
+          block_update_dimensions_event(self)
+          unblock_update_dimensions_event(self)
+    """
+    from CTkToolTip import CTkToolTip
 
-BUILD_DIRECTORY = "build"
-SPECIFICATION_EXTENSION = ".spec"
+    class ToolTip(CTkToolTip):
+        def block_update_dimensions_event(self, *args, **kwargs):
+            return None
 
-def place_help(parent: Misc, row: int, column: int, text: str) -> None:
+        def unblock_update_dimensions_event(self, *args, **kwargs):
+            return None
+
+    return ToolTip
+
+
+def place_help(parent: "Misc", row: int, column: int, text: str) -> None:
     """
         Place a small "?" button at (row, col) that shows "text" when clicked.
     """
+    import customtkinter as ctk
+
     # Create a CTkButton with equal width/height and corner_radius to make it a circle
     size = 24
     button = ctk.CTkButton(parent, text="❓", width=size, height=size, corner_radius=size // 2, fg_color="#3A3A3A",
@@ -22,28 +40,6 @@ def place_help(parent: Misc, row: int, column: int, text: str) -> None:
     button.grid(row=row, column=column, sticky="n", padx=(2, 10))
 
     # Attach a tooltip that appears on hover
-    CTkToolTip(widget=button, message=text, delay=0.3, follow=True,  x_offset=10, y_offset=10, alpha=0.9,
-               bg_color="#2B2B2B", text_color="white", corner_radius=6, border_width=0,  border_color="#4A4A4A",
-               wraplength=200, padding=(8, 4), font=("Segoe UI", 15),justify="left",)
-
-def cleanup_build_artifacts():
-    """
-        Clean previous PyInstaller build artifacts.
-    """
-    if Path(BUILD_DIRECTORY).is_dir():
-        rmtree(BUILD_DIRECTORY)
-    for specification in Path(".").glob(f"*{SPECIFICATION_EXTENSION}"):
-        specification.unlink()
-
-def no_operation(self, *args, **kwargs):    # Monkey-patch CTkToolTip so it satisfies the scaling tracker’s calls:
-
-    """
-        A no-op handler that matches the expected signature of:
-          block_update_dimensions_event(self)
-          unblock_update_dimensions_event(self)
-    """
-    return None
-
-
-CTkToolTip.block_update_dimensions_event = no_operation
-CTkToolTip.unblock_update_dimensions_event = no_operation
+    _tooltip_class()(widget=button, message=text, delay=0.3, follow=True,  x_offset=10, y_offset=10, alpha=0.9,
+                     bg_color="#2B2B2B", text_color="white", corner_radius=6, border_width=0,  border_color="#4A4A4A",
+                     wraplength=200, padding=(8, 4), font=("Segoe UI", 15),justify="left",)
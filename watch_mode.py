@@ -0,0 +1,298 @@
+import os, select, struct, sys, time
+
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from threading import Event, Thread
+from typing import Callable
+
+from build_engine import BuildTarget, split_data_specification
+from build_pipeline import BuildOptions
+from build_queue import BuildJob, BuildQueue
+from import_graph import import_closure
+
+
+DEBOUNCE_SECONDS = 0.3  # A rebuild starts once the watched files have been quiet this long
+POLL_INTERVAL = 0.5     # Seconds between scans of the polling watcher
+
+# inotify(7)
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x002, 0x004, 0x008
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x040, 0x080, 0x100, 0x200
+IN_DELETE_SELF, IN_MOVE_SELF, IN_Q_OVERFLOW, IN_IGNORED = 0x400, 0x800, 0x4000, 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | \
+             IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, length of the name that follows
+
+
+@dataclass
+class WatchSet:
+    """
+        The inputs of a build that are watched: single files and whole folders (data folders).
+    """
+    files: set[Path] = field(default_factory=set)
+    trees: set[Path] = field(default_factory=set)
+
+
+def watch_set(target: BuildTarget) -> WatchSet:
+    """
+        Return what a rebuild of *target* depends on: the entry script and the project-local modules it imports,
+        every data file and folder, and the icon.
+    """
+    watch = WatchSet(files=set(import_closure(target.entry_point, target.hidden_imports)))
+    for specification in target.data_files:
+        source = Path(split_data_specification(specification)[0]).resolve()
+        (watch.trees if source.is_dir() else watch.files).add(source)
+    if target.icon.strip():
+        watch.files.add(Path(target.icon.strip()).resolve())
+    return watch
+
+
+class PollingWatcher:
+    """
+        Notice changes by comparing modification times and sizes every :data:`POLL_INTERVAL` seconds.
+    """
+
+    def __init__(self, watch: WatchSet):
+        self.watch = watch
+        self._state = self._snapshot()
+
+    def _snapshot(self) -> dict[Path, tuple[int, int] | None]:
+        state = {}
+        files = set(self.watch.files)
+        for tree in self.watch.trees:
+            files.update(path for path in tree.rglob("*") if path.is_file())
+            state[tree] = None
+        for path in files:
+            try:
+                status = path.stat()
+                state[path] = (status.st_mtime_ns, status.st_size)
+            except OSError:
+                state[path] = None
+        return state
+
+    def wait(self, timeout: float) -> set[Path]:
+        """
+            Return the paths that changed within *timeout* seconds (empty if none did).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            state = self._snapshot()
+            changed = {path for path in state.keys() | self._state.keys() if state.get(path) != self._state.get(path)}
+            self._state = state
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """
+        Notice changes through Linux inotify (via ``ctypes``), watching the folders of the watched files.
+
+        Folders are watched rather than files because editors often save by writing a new file and
+        renaming it over the old one. Events for other files in those folders are ignored. Folders created
+        (or moved) inside a watched data folder are watched from then on.
+
+        Raises
+        ------
+        OSError
+            If inotify is not available or the watch limit is reached.
+    """
+
+    def __init__(self, watch: WatchSet):
+        import ctypes, ctypes.util
+
+        self.watch = watch
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        folders: dict[Path, set[str] | None] = {}   # Folder -> watched names, or None for "everything"
+        for path in watch.files:
+            names = folders.setdefault(path.parent, set())
+            if names is not None:
+                names.add(path.name)
+        for tree in watch.trees:
+            for folder in (tree, *(path for path in tree.rglob("*") if path.is_dir())):
+                folders[folder] = None
+
+        self._watches: dict[int, tuple[Path, set[str] | None]] = {}
+        try:
+            for folder, names in folders.items():
+                self._add(folder, names)
+        except OSError:
+            self.close()
+            raise
+
+    def _add(self, folder: Path, names: set[str] | None) -> None:
+        import ctypes
+
+        descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), WATCH_MASK)
+        if descriptor < 0:
+            error = ctypes.get_errno()
+            if folder.exists():
+                raise OSError(error, f"inotify_add_watch failed for {folder}")
+            return  # Missing folder (for example a data folder not created yet); the build will report it
+        self._watches[descriptor] = (folder, names)
+
+    def wait(self, timeout: float) -> set[Path]:
+        """
+            Return the paths that changed within *timeout* seconds (empty if none did).
+        """
+        ready, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            descriptor, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0"))
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self.watch.files | self.watch.trees)     # Events were lost: assume everything changed
+                continue
+            folder, names = self._watches.get(descriptor, (None, None))
+            if folder is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                changed.add(folder)
+                if mask & IN_IGNORED:
+                    del self._watches[descriptor]   # The kernel dropped the watch
+            elif names is None or name in names:
+                changed.add(folder / name if name else folder)
+                if names is None and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_new_tree(folder / name)
+        return changed
+
+    def _watch_new_tree(self, tree: Path) -> None:
+        """
+            Watch a folder that appeared inside a watched data folder, with any subfolders it already has.
+
+            Files written into it before its watch was added are covered by the folder's own creation event.
+        """
+        try:
+            for folder in (tree, *(path for path in tree.rglob("*") if path.is_dir())):
+                self._add(folder, None)
+        except OSError:
+            pass    # Gone again, or the watch limit is reached: only its creation counts as a change
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(watch: WatchSet, polling: bool = False) -> InotifyWatcher | PollingWatcher:
+    """
+        Return an inotify watcher on Linux, or the polling watcher elsewhere, when inotify fails or if *polling*.
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(watch)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(watch)
+
+
+class BuildWatcher:
+    """
+        Rebuild a target through a :class:`build_queue.BuildQueue` whenever one of its inputs changes.
+
+        Builds are incremental and skipped when the fingerprint shows nothing relevant changed. Changes
+        are debounced; a build that is still queued or running when another change arrives is obsolete
+        and is cancelled before the next one is queued. The watched files are worked out again after
+        every build, so newly imported modules are picked up.
+
+        ``status`` is a one-line description of what the watcher is doing, for display; *on_event*, if
+        given, receives the same text whenever it changes (from the watcher's thread).
+    """
+
+    def __init__(self, queue: BuildQueue, target: BuildTarget, options: BuildOptions,
+                 on_event: Callable[[str], object] | None = None, polling: bool = False,
+                 debounce: float = DEBOUNCE_SECONDS):
+        self.queue = queue
+        self.target = target
+        self.options = replace(options, incremental=True, skip_up_to_date=True)
+        self.polling = polling
+        self.debounce = debounce
+        self.on_event = on_event
+        self.job: BuildJob | None = None
+        self.status = "starting"
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True, name=f"watch-{target.name}")
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+            Stop watching and cancel the build in progress, if any.
+        """
+        self._stop.set()
+        self._thread.join()
+        if self.job is not None and not self.job.done:
+            self.queue.cancel(self.job)
+
+    def _report(self, status: str) -> None:
+        self.status = status
+        if self.on_event is not None:
+            self.on_event(status)
+
+    def _rebuild(self, reason: str) -> None:
+        if self.job is not None and not self.job.done:
+            self.queue.cancel(self.job)     # Its inputs changed, so its result would be out of date
+            self._report(f"{reason}; cancelled build #{self.job.number}, rebuilding")
+        else:
+            self._report(f"{reason}; rebuilding")
+        self.job = self.queue.submit(self.target, self.options)
+
+    def _watch(self) -> tuple[WatchSet, InotifyWatcher | PollingWatcher]:
+        try:
+            watch = watch_set(self.target)
+        except OSError as e:
+            self._report(f"cannot read the entry script ({e}); watching it only")
+            watch = WatchSet(files={Path(self.target.entry_point).resolve()})
+        return watch, make_watcher(watch, self.polling)
+
+    def _run(self) -> None:
+        self._rebuild("watching")
+        watch, watcher = self._watch()
+        watched_build = self.job
+        try:
+            while not self._stop.is_set():
+                # Once a build has finished, follow changes of its import closure
+                if self.job is not None and self.job.done and watched_build is self.job:
+                    watched_build = None
+                    refreshed = watch_set(self.target) if Path(self.target.entry_point).is_file() else watch
+                    if refreshed != watch:
+                        watcher.close()
+                        watch, watcher = refreshed, make_watcher(refreshed, self.polling)
+                    self._report(f"build #{self.job.number} {self.job.state}; watching {len(watch.files)} file(s) "
+                                 f"and {len(watch.trees)} folder(s)")
+
+                changed = watcher.wait(0.5)
+                if not changed:
+                    continue
+                quiet_since = time.monotonic()
+                while time.monotonic() - quiet_since < self.debounce and not self._stop.is_set():
+                    more = watcher.wait(self.debounce - (time.monotonic() - quiet_since))
+                    if more:
+                        changed |= more
+                        quiet_since = time.monotonic()
+                if self._stop.is_set():
+                    break
+
+                names = sorted(path.name for path in changed)
+                self._rebuild(f"{', '.join(names[:3])}{' and more' if len(names) > 3 else ''} changed")
+                watched_build = self.job
+        finally:
+            watcher.close()